@@ -0,0 +1,216 @@
+import os
+import threading
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.path.join(ROOT_DIR, "embeddings", "video_embeddings.ivf.npz")
+
+# "exact" scans every row; "ivf" scans only the nprobe closest k-means cells
+ENGINE = os.environ.get("VECTOR_ENGINE", "exact")
+NPROBE = int(os.environ.get("IVF_NPROBE", "8"))
+# Below this many vectors a brute-force scan is already fast; don't bother training
+MIN_TRAIN_SIZE = int(os.environ.get("IVF_MIN_TRAIN_SIZE", "4096"))
+# Retrain the coarse quantizer once the corpus has grown this much since training
+RETRAIN_GROWTH = 4.0
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+# Vectors read and assigned at a time when (re)building or catching up
+ADD_BATCH_ROWS = 16384
+
+
+def _nlist_for(n):
+    # Usual IVF rule of thumb: about sqrt(N) cells
+    return max(16, int(np.sqrt(n)))
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """
+    Spherical k-means on L2-normalized rows. Returns normalized centroids.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Re-seed empty cells with random points so every cell stays useful
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over the embeddings table's row ids.
+
+    A k-means coarse quantizer splits the vectors into cells; each cell keeps
+    the DB ids assigned to it. A query scores the centroids, then only the
+    rows in the nprobe best cells are rescored exactly by the caller.
+    Vectors themselves stay in VectorIndex; this only stores centroids + ids,
+    persisted next to the SQLite file.
+    """
+
+    def __init__(self, path=INDEX_PATH, nprobe=NPROBE):
+        self.path = path
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self.centroids = None       # (nlist, dim) float32, None until trained
+        self.lists = []             # per cell: list of numpy id arrays, appended to incrementally
+        self.trained_size = 0
+        self._known = set()
+        self.dirty = False
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def __len__(self):
+        return len(self._known)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        try:
+            data = np.load(self.path)
+            centroids, ids, offsets = data["centroids"], data["ids"], data["offsets"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"IVF index at {self.path} unreadable, will rebuild: {e}")
+            return self
+        with self._lock:
+            self.centroids = centroids
+            self.lists = [[ids[offsets[i]:offsets[i + 1]]] for i in range(len(centroids))]
+            self.trained_size = int(data["trained_size"])
+            self._known = set(ids.tolist())
+        return self
+
+    def save(self):
+        with self._lock:
+            if not self.trained or not self.dirty:
+                return
+            cells = [np.concatenate(cell) if cell else np.zeros(0, dtype=np.int64) for cell in self.lists]
+            offsets = np.cumsum([0] + [len(c) for c in cells])
+            ids = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+            centroids = self.centroids
+            trained_size = self.trained_size
+            self.dirty = False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, centroids=centroids, ids=ids, offsets=offsets,
+                 trained_size=np.array(trained_size))
+        os.replace(tmp_path, self.path)
+
+    def train(self, ids, vectors_at):
+        """
+        (Re)builds the quantizer from normalized vectors and assigns all ids.
+        vectors_at(positions) returns the vectors of ids[positions].
+        """
+        n = len(ids)
+        nlist = min(_nlist_for(n), n)
+        rng = np.random.default_rng(0)
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = vectors_at(np.sort(rng.choice(n, size=sample_size, replace=False)))
+        centroids = kmeans(sample, nlist)
+        with self._lock:
+            self.centroids = centroids
+            self.lists = [[] for _ in range(nlist)]
+            self._known = set()
+            self.trained_size = n
+        self._add_positions(ids, vectors_at, np.arange(n))
+        print(f"IVF index trained: {nlist} cells over {n} vectors")
+
+    def _add_positions(self, ids, vectors_at, positions):
+        # Only ADD_BATCH_ROWS vectors are read at a time
+        for start in range(0, len(positions), ADD_BATCH_ROWS):
+            part = positions[start:start + ADD_BATCH_ROWS]
+            self.add(ids[part], vectors_at(part))
+
+    def assign(self, vectors):
+        """
+        Nearest cell per normalized vector, or None until trained.
+        """
+        if not self.trained:
+            return None
+        return np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1)
+
+    def add(self, ids, vectors):
+        """
+        Assigns new rows to their nearest cell. No-op until trained.
+        """
+        self.add_assigned(ids, self.assign(vectors))
+
+    def add_assigned(self, ids, assign):
+        """
+        Adds ids whose cells were computed earlier with assign(); lets a writer
+        do the math per batch but only publish the ids once its transaction commits.
+        """
+        if assign is None or len(ids) == 0:
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            order = np.argsort(assign, kind="stable")
+            cells, starts = np.unique(assign[order], return_index=True)
+            for cell, chunk in zip(cells, np.split(ids[order], starts[1:])):
+                self.lists[cell].append(chunk)
+            self._known.update(ids.tolist())
+            self.dirty = True
+
+    def sync(self, ids, vectors_at):
+        """
+        Reconciles the index with the rows currently in the table: trains or
+        retrains when needed, assigns rows that were never added, and drops
+        ids that were deleted. vectors_at(positions) returns the normalized
+        vectors of ids[positions]; only the rows needed are asked for.
+        """
+        n = len(ids)
+        if n < MIN_TRAIN_SIZE:
+            return
+        if not self.trained or n > self.trained_size * RETRAIN_GROWTH:
+            self.train(ids, vectors_at)
+            return
+
+        id_set = set(ids.tolist())
+        with self._lock:
+            stale = self._known - id_set
+            if stale:
+                stale_arr = np.fromiter(stale, dtype=np.int64)
+                for i, cell in enumerate(self.lists):
+                    if cell:
+                        merged = np.concatenate(cell)
+                        self.lists[i] = [merged[~np.isin(merged, stale_arr)]]
+                self._known -= stale
+                self.dirty = True
+            missing = np.fromiter((i for i in id_set if i not in self._known), dtype=np.int64)
+
+        if len(missing):
+            order = np.argsort(ids)
+            positions = np.sort(order[np.searchsorted(ids[order], missing)])
+            self._add_positions(ids, vectors_at, positions)
+
+    def candidates(self, query, nprobe=None):
+        """
+        DB ids in the nprobe cells closest to the normalized query.
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        cell_scores = self.centroids @ query
+        probe = np.argpartition(-cell_scores, nprobe - 1)[:nprobe]
+        with self._lock:
+            parts = [part for cell in probe for part in self.lists[cell]]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+
+# Global variable for lazy loading, one index per process
+ann_index = None
+
+
+def get_ann():
+    global ann_index
+    if ann_index is None:
+        ann_index = IVFIndex().load()
+    return ann_index
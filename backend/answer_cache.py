@@ -0,0 +1,136 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from backend import metrics
+
+# A cached answer is reused when the new question's embedding is at least this similar
+SIMILARITY_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_SIZE", "1000"))
+TTL_SECONDS = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+
+# Scope used when /ask searches the whole library
+ALL_VIDEOS = "*"
+
+
+def scope_key(video_ids):
+    """
+    Normalizes /ask's video_id field (None, one id or a list) to a hashable scope.
+    """
+    if video_ids is None:
+        return ALL_VIDEOS
+    if isinstance(video_ids, str):
+        video_ids = [video_ids]
+    return tuple(sorted(set(video_ids)))
+
+
+class AnswerCache:
+    """
+    Semantic cache of /ask answers. Entries are keyed by (video scope, query
+    embedding); a lookup hits when a cached question in the same scope has
+    cosine similarity >= threshold. Least recently used entries are evicted
+    past max_entries and entries older than ttl are ignored.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # entry id -> entry dict, oldest use first
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0        # seconds of answer generation not repeated
+
+    def _normalize(self, query_vec):
+        vec = np.asarray(query_vec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, video_ids, query_vec):
+        """
+        Returns {"answer", "sources"} cached for a similar question, or None.
+        """
+        scope = scope_key(video_ids)
+        vec = self._normalize(query_vec)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry["created"] > self.ttl:
+                    del self._entries[entry_id]
+                    continue
+                if entry["scope"] != scope:
+                    continue
+                score = float(np.dot(entry["vector"], vec))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                metrics.cache_result("answer", False)
+                return None
+
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self.latency_saved += entry["latency"]
+            metrics.cache_result("answer", True)
+            return {"answer": entry["answer"], "sources": entry["sources"]}
+
+    def store(self, video_ids, question, query_vec, answer, latency, sources=None):
+        """
+        latency is how long the answer took to produce (search + LLM), in seconds.
+        sources are the timestamps returned alongside the answer.
+        """
+        with self._lock:
+            self._entries[self._next_id] = {
+                "scope": scope_key(video_ids),
+                "question": question,
+                "vector": self._normalize(query_vec),
+                "answer": answer,
+                "sources": sources or [],
+                "latency": latency,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, video_id=None):
+        """
+        Drops answers that may depend on video_id's chunks (any scope containing
+        it, plus whole-library answers). video_id=None clears everything.
+        """
+        with self._lock:
+            if video_id is None:
+                self._entries.clear()
+                return
+            for entry_id, entry in list(self._entries.items()):
+                if entry["scope"] == ALL_VIDEOS or video_id in entry["scope"]:
+                    del self._entries[entry_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+            }
+
+
+# Global variable for lazy loading, one cache per process
+answer_cache = None
+
+
+def get_answer_cache():
+    global answer_cache
+    if answer_cache is None:
+        answer_cache = AnswerCache()
+    return answer_cache
@@ -9,25 +9,108 @@ import io
 # sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
+from typing import List, Optional, Union
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import contextvars
+import json
+import time
+import threading
 import logging
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+from backend import metrics
+if metrics.ENABLED:
+    metrics.install_log_trace_ids()
+
 # import your existing logic
-from backend.search_and_qa import search
-from backend.llm_answer import generate_answer
-from backend.video_processing import process_youtube_video
+from backend.search_and_qa import search_hits, embed_query, query_cache
+from backend.llm_answer import agenerate_answer, astream_answer, ERROR_PREFIX
+from backend.context_builder import build_context
+from backend.groq_clients import close_async_client
+from backend.answer_cache import get_answer_cache
+from backend.shared_model import warm_up, model_ready, model_status
+from backend.vector_index import get_index
+from backend import storage
+from backend import jobs
+from backend import batch_ingest
 
 
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-app = FastAPI()
+# Load the embedding model and the vector index at startup instead of on the first request
+MODEL_PRELOAD = os.environ.get("MODEL_PRELOAD", "1") != "0"
+
+# Embedding and search are CPU-bound; they run here so the event loop stays free.
+# Sized to the cores, not to the number of open requests.
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", str(os.cpu_count() or 1)))
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+
+async def run_cpu(fn, *args):
+    # Run in a copy of the request's context so the trace id follows the call
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, call)
+
+
+def preload():
+    warm_up()
+    try:
+        print(f"Vector index loaded: {len(get_index())} chunks")
+    except Exception as e:
+        print(f"Vector index preload failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Opens the SQLite pool and runs schema migrations once, before any request
+    storage.get_pool()
+    if MODEL_PRELOAD:
+        # In a thread so the port opens (and /health answers) while the model loads
+        threading.Thread(target=preload, daemon=True).start()
+    yield
+    await close_async_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class TraceIdMiddleware:
+    """
+    Gives every HTTP request a trace id (the client's X-Request-ID if sent)
+    for its log lines, and echoes it back in the X-Request-ID header.
+    Plain ASGI rather than @app.middleware, which adds a task per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        trace = metrics.new_trace_id(incoming.decode("latin-1") if incoming else None)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", trace.encode("latin-1")))
+            await send(message)
+
+        await self.app(scope, receive, send_with_trace)
+
+
+if metrics.ENABLED:
+    app.add_middleware(TraceIdMiddleware)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -47,12 +130,42 @@ app.add_middleware(
 )
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok", "message": "Backend is running"}
+async def health_check():
+    # Always 200 so the platform doesn't restart us mid-load; "ready" says
+    # whether the first /ask will have to wait for the model
+    return {"status": "ok", "message": "Backend is running", "ready": model_ready(), "model": model_status}
 
 
 class AskRequest(BaseModel):
     question: str
+    # One video id, a list of ids, or None to search every ingested video
+    video_id: Optional[Union[str, List[str]]] = None
+
+
+def retrieve(question, video_id):
+    """
+    CPU part of /ask, run on cpu_executor: embed the question, then either a
+    cached answer or the context to answer from (see build_context).
+    Returns (query_vec, cached, context).
+    """
+    query_vec = embed_query(question)
+
+    # Near-identical question about the same videos: reuse the answer
+    cached = get_answer_cache().lookup(video_id, query_vec)
+    if cached is not None:
+        return query_vec, cached, None
+
+    # Step 5: retrieve relevant chunks, packed into the prompt's token budget
+    hits = search_hits(question, video_ids=video_id, query_vec=query_vec)
+    return query_vec, None, build_context(hits)
+
+
+def hit_sources(hits):
+    # Jump-to timestamps for the chunks an answer was built from
+    return [
+        {"video_id": hit["video_id"], "start": hit["start"], "end": hit["end"], "score": hit["score"]}
+        for hit in hits
+    ]
 
 
 class ProcessRequest(BaseModel):
@@ -60,40 +173,147 @@ class ProcessRequest(BaseModel):
     language_mode: str = "original"
 
 
-@app.post("/process_video")
-def process_video_endpoint(data: ProcessRequest):
+@app.post("/process_video", status_code=202)
+async def process_video_endpoint(data: ProcessRequest):
+    """
+    Queues the video and returns immediately; poll GET /jobs/{job_id} for
+    per-stage progress and the final result.
+    """
     logger.info(f"Processing URL: {data.url} | Mode: {data.language_mode}")
-    try:
-        result = process_youtube_video(data.url, language_mode=data.language_mode)
-        if "error" in result:
-             logger.error(f"Processing failed logic: {result['error']}")
-        return result
-    except Exception as e:
-        logger.error(f"Processing Error: {e}", exc_info=True)
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    job = jobs.submit(data.url, language_mode=data.language_mode)
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "video_id": job["video_id"],
+    }
+
+
+class BatchRequest(BaseModel):
+    # Video, playlist or channel URLs; playlists are expanded server-side
+    urls: List[str]
+    language_mode: str = "original"
+
+
+@app.post("/batch_ingest", status_code=202)
+async def batch_ingest_endpoint(data: BatchRequest):
+    """
+    Starts ingesting every video of the given URLs/playlists in the
+    background; poll GET /batch_ingest/{batch_id}. Posting the same list
+    again resumes it from its checkpoint.
+    """
+    logger.info(f"Batch ingest: {len(data.urls)} URL(s) | Mode: {data.language_mode}")
+    return batch_ingest.submit(data.urls, language_mode=data.language_mode)
+
+
+@app.get("/batch_ingest/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = batch_ingest.get_batch(batch_id)
+    if batch is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown batch: {batch_id}"})
+    return batch
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown job: {job_id}"})
+    return job
 
 
 @app.post("/ask")
-def ask(data: AskRequest):
+async def ask(data: AskRequest):
     logger.info(f"Asking: {data.question}")
     try:
-        # Step 5: retrieve relevant chunks
-        results = search(data.question)
-    
-        # extract only text from results
-        context = [text for _, text in results]
+        start = time.time()
+        query_vec, cached, context = await run_cpu(retrieve, data.question, data.video_id)
+        if cached is not None:
+            return {
+                "question": data.question,
+                "video_id": data.video_id,
+                "answer": cached["answer"],
+                "sources": cached["sources"],
+                "cached": True
+            }
+
+        sources = hit_sources(context["hits"])
     
         # Step 6: generate final answer
-        answer = generate_answer(data.question, context)
+        answer = await agenerate_answer(data.question, context["chunks"])
+
+        if not answer.startswith(ERROR_PREFIX):
+            get_answer_cache().store(data.video_id, data.question, query_vec, answer, time.time() - start, sources)
     
         return {
             "question": data.question,
-            "answer": answer
+            "video_id": data.video_id,
+            "answer": answer,
+            "sources": sources,
+            "cached": False,
+            "context_tokens": context["tokens"]
         }
     except Exception as e:
         logger.error(f"QA Error: {e}", exc_info=True)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.post("/ask/stream")
+async def ask_stream(data: AskRequest):
+    """
+    Server-sent events version of /ask: one `data: {"token": ...}` event per
+    piece of the answer as the LLM produces it, then `data: {"done": true}`
+    carrying the answer's timestamp sources.
+    """
+    logger.info(f"Asking (stream): {data.question}")
+
+    def sse(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        try:
+            start = time.time()
+            query_vec, cached, context = await run_cpu(retrieve, data.question, data.video_id)
+            if cached is not None:
+                yield sse({"token": cached["answer"]})
+                yield sse({"done": True, "cached": True, "sources": cached["sources"]})
+                return
+
+            sources = hit_sources(context["hits"])
+            pieces = []
+            async for token in astream_answer(data.question, context["chunks"]):
+                pieces.append(token)
+                yield sse({"token": token})
+
+            answer = "".join(pieces)
+            if not answer.startswith(ERROR_PREFIX):
+                get_answer_cache().store(data.video_id, data.question, query_vec, answer, time.time() - start, sources)
+            yield sse({"done": True, "cached": False, "sources": sources, "context_tokens": context["tokens"]})
+        except Exception as e:
+            # Headers are already sent, so errors travel as an event
+            logger.error(f"QA Stream Error: {e}", exc_info=True)
+            yield sse({"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/answer_cache/stats")
+async def answer_cache_stats():
+    return get_answer_cache().stats()
+
+@app.get("/query_cache/stats")
+async def query_cache_stats():
+    return query_cache.stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus scrape target: stage timings, cache hits, upstream errors
+    if not metrics.ENABLED:
+        return PlainTextResponse("# metrics disabled (METRICS_ENABLED=0)\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Mount Frontend Static Files (Last to avoid blocking API)
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
 if os.path.exists(static_dir):
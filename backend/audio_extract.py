@@ -1,24 +1,69 @@
 import os
 import sys
 import shutil
-import subprocess
+import time
+import asyncio
 import glob
+import re
+from backend.metrics import timed
 
-def extract_audio(youtube_url: str):
+# "stream": smallest audio-only format piped through ffmpeg into 16 kHz mono
+#           speech audio, no intermediate file (default)
+# "mp3":    yt-dlp downloads and re-encodes to 192K MP3 (the original path)
+EXTRACT_MODE = os.environ.get("AUDIO_EXTRACT_MODE", "stream")
+# Output of stream mode: "opus" (small, ~11 MB/hour) or "flac" (lossless, larger)
+STREAM_CODEC = os.environ.get("AUDIO_STREAM_CODEC", "opus")
+
+# Whisper resamples everything to 16 kHz mono, so nothing above that is sent
+# (libopus complexity 0: ~2x faster to encode, output within a few % in size)
+STREAM_CODECS = {
+    "opus": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-compression_level", "0"], ".ogg"),
+    "flac": (["-c:a", "flac"], ".flac"),
+}
+RELAY_CHUNK_BYTES = 64 * 1024
+
+# 11-char id in watch?v=, youtu.be/, shorts/, embed/ and live/ URLs
+VIDEO_ID_PATTERN = re.compile(
+    r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([0-9A-Za-z_-]{11})"
+)
+
+def get_video_id(youtube_url: str):
     """
-    Extracts audio from a YouTube video using the standalone yt-dlp.exe via subprocess.
-    Ensures Node.js is used for signature decryption.
+    Returns the YouTube video id for a URL, or None if it can't be parsed.
     """
-    # Ensure output directory exists
-    output_dir = "audio"
-    os.makedirs(output_dir, exist_ok=True)
+    match = VIDEO_ID_PATTERN.search(youtube_url)
+    return match.group(1) if match else None
 
-    # Determine project root and paths
-    current_file = os.path.abspath(__file__)
-    backend_dir = os.path.dirname(current_file)
-    project_root = os.path.dirname(backend_dir)
+def find_ffmpeg():
+    """
+    Returns the ffmpeg binary to use, or None if none was found.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    ffmpeg_binary = None
+    try:
+        import imageio_ffmpeg
+        # imageio_ffmpeg works on Linux too, but on Render we might use the one from build.sh
+        ffmpeg_binary = imageio_ffmpeg.get_ffmpeg_exe()
+        print(f"DEBUG: Imageio-FFmpeg found binary at: {ffmpeg_binary}")
+    except Exception as e:
+        print(f"WARNING: Could not find ffmpeg via imageio: {e}")
     
-    # Paths
+    # On Render, we installed ffmpeg to project_root/ffmpeg/ffmpeg in build.sh
+    # We should check for that if imageio failed or preferred
+    render_ffmpeg = os.path.join(project_root, "ffmpeg", "ffmpeg")
+    if os.path.exists(render_ffmpeg):
+        print("DEBUG: Found Render static build ffmpeg.")
+        ffmpeg_binary = render_ffmpeg
+
+    return ffmpeg_binary
+
+def find_ytdlp():
+    """
+    Returns the yt-dlp executable to run.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
     # Detect Environment
     if sys.platform == "win32" and os.path.exists(os.path.join(project_root, "yt-dlp.exe")):
         yt_dlp_exe = os.path.join(project_root, "yt-dlp.exe")
@@ -34,11 +79,29 @@ def extract_audio(youtube_url: str):
              yt_dlp_exe = "yt-dlp" 
         print(f"DEBUG: Using system yt-dlp: {yt_dlp_exe}")
 
-    cookie_file = os.path.join(project_root, "cookies.txt")
-    
-    # 1. Verify yt-dlp executable availability (Skip strict check for system command to allow PATH resolution)
+    # Verify yt-dlp executable availability (Skip strict check for system command to allow PATH resolution)
     if sys.platform == "win32" and not os.path.exists(yt_dlp_exe):
          raise Exception(f"Critical Error: yt-dlp.exe not found at {yt_dlp_exe}")
+    return yt_dlp_exe
+
+def build_command(youtube_url: str, to_stdout=False):
+    """
+    The yt-dlp command line for youtube_url (audio to audio/VIDEO_ID.mp3).
+    With to_stdout, the smallest audio-only format is written as-is to
+    stdout instead, for stream_audio_async to transcode.
+    Ensures Node.js is used for signature decryption.
+    """
+    # Ensure output directory exists
+    output_dir = "audio"
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Determine project root and paths
+    current_file = os.path.abspath(__file__)
+    backend_dir = os.path.dirname(current_file)
+    project_root = os.path.dirname(backend_dir)
+
+    yt_dlp_exe = find_ytdlp()
+    cookie_file = os.path.join(project_root, "cookies.txt")
 
     # 2. Cookie Handling (Write ENV to file if needed)
     if os.environ.get("YOUTUBE_COOKIES"):
@@ -47,21 +110,7 @@ def extract_audio(youtube_url: str):
             f.write(os.environ.get("YOUTUBE_COOKIES"))
     
     # 3. Locate FFmpeg
-    ffmpeg_binary = None
-    import imageio_ffmpeg
-    try:
-        # imageio_ffmpeg works on Linux too, but on Render we might use the one from build.sh
-        ffmpeg_binary = imageio_ffmpeg.get_ffmpeg_exe()
-        print(f"DEBUG: Imageio-FFmpeg found binary at: {ffmpeg_binary}")
-    except Exception as e:
-        print(f"WARNING: Could not find ffmpeg via imageio: {e}")
-    
-    # On Render, we installed ffmpeg to project_root/ffmpeg/ffmpeg in build.sh
-    # We should check for that if imageio failed or preferred
-    render_ffmpeg = os.path.join(project_root, "ffmpeg", "ffmpeg")
-    if os.path.exists(render_ffmpeg):
-        print("DEBUG: Found Render static build ffmpeg.")
-        ffmpeg_binary = render_ffmpeg
+    ffmpeg_binary = find_ffmpeg()
     
     # 4. Construct Command
     # output template: audio/VIDEO_ID.mp3 (yt-dlp handles the extension switch during conversion)
@@ -82,16 +131,25 @@ def extract_audio(youtube_url: str):
     else:
         print("WARNING: Node.js not found in PATH. Skipping --js-runtimes node force.")
 
-    cmd.extend([
-        "-x",                          # Extract audio
-        "--audio-format", "mp3",       # Convert to mp3
-        "--audio-quality", "192K",     # Quality
-        "--output", output_template,   # Output filename template
-        "--no-playlist",               # Single video only
-        "--force-overwrites",          # Overwrite if exists
-        "--no-check-certificate",      # Skip SSL checks (optional, but requested in previous steps)
-        "--verbose",                   # Debug output
-    ])
+    if to_stdout:
+        cmd.extend([
+            "-f", "wa/w",                  # Smallest audio-only format (any format as a last resort)
+            "--output", "-",               # Raw stream to stdout, no file, no post-processing
+            "--no-playlist",               # Single video only
+            "--no-part",
+            "--no-check-certificate",      # Skip SSL checks (optional, but requested in previous steps)
+        ])
+    else:
+        cmd.extend([
+            "-x",                          # Extract audio
+            "--audio-format", "mp3",       # Convert to mp3
+            "--audio-quality", "192K",     # Quality
+            "--output", output_template,   # Output filename template
+            "--no-playlist",               # Single video only
+            "--force-overwrites",          # Overwrite if exists
+            "--no-check-certificate",      # Skip SSL checks (optional, but requested in previous steps)
+            "--verbose",                   # Debug output
+        ])
 
     # Add Cookies if present
     if os.path.exists(cookie_file):
@@ -99,100 +157,184 @@ def extract_audio(youtube_url: str):
         cmd.extend(["--cookies", cookie_file])
     
     # Add FFmpeg location
-    if ffmpeg_binary:
+    if ffmpeg_binary and not to_stdout:
         cmd.extend(["--ffmpeg-location", ffmpeg_binary])
 
     # Add URL
     cmd.append(youtube_url)
 
-    print(f"DEBUG: Running Command: {' '.join(cmd)}")
+    return cmd
+
+def raise_for_ytdlp(returncode, stderr):
+    if returncode != 0:
+        # Parse error
+        err_msg = stderr
+        if "Sign in" in err_msg or "confirm you're not a bot" in err_msg:
+             raise Exception("YouTube requires sign-in. Please export fresh 'cookies.txt' to the project root.")
+        elif "Video unavailable" in err_msg:
+             raise Exception("Video is unavailable (private, deleted, or region locked).")
+        else:
+             raise Exception(f"yt-dlp failed (Code {returncode}): {err_msg[:200]}...")
+
+def locate_output(returncode, stdout, stderr):
+    """
+    Checks a finished yt-dlp run and returns the path of the audio it wrote.
+    Raises with a user-facing message if the download failed.
+    """
+    # Log Output
+    if stdout:
+        print(f"STDOUT:\n{stdout}")
+    if stderr:
+        print(f"STDERR:\n{stderr}")
+
+    raise_for_ytdlp(returncode, stderr)
+
+    # Find the generated file
+    # yt-dlp prints "[ffmpeg] Destination: audio\VIDEO_ID.mp3"
+    expected_filename = None
+    for line in stdout.splitlines():
+         if "Destination:" in line and ".mp3" in line:
+             expected_filename = line.split("Destination:")[1].strip()
+         elif "Merging formats into" in line:
+             expected_filename = line.split("Merging formats into")[1].strip().strip('"')
+         elif "has been downloaded" in line and ".mp3" in line:
+             # "audio\ID.mp3 has already been downloaded"
+             expected_filename = line.split(" ")[1].strip()
+
+    if not expected_filename or not os.path.exists(expected_filename):
+         raise Exception("Download appeared successful but couldn't locate output file. Check logs.")
+
+    print(f"DEBUG: Successfully extracted audio to: {expected_filename}")
+    return expected_filename
+
+async def pipe_to_ffmpeg(source_cmd, out_path, codec=None, ffmpeg_binary=None):
+    """
+    Runs source_cmd (anything writing media to stdout) and pipes it through
+    ffmpeg into 16 kHz mono audio at out_path. Returns
+    (bytes read from the source, source returncode, source stderr).
+    """
+    codec_args, _ = STREAM_CODECS[codec or STREAM_CODEC]
+    ffmpeg_binary = ffmpeg_binary or find_ffmpeg()
+    if not ffmpeg_binary:
+        raise Exception("ffmpeg not found for audio streaming")
+
+    source = await asyncio.create_subprocess_exec(
+        *source_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    ffmpeg = await asyncio.create_subprocess_exec(
+        ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", "pipe:0", "-vn", "-ac", "1", "-ar", "16000", *codec_args, out_path,
+        stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def relay():
+        # Copied through here (not an OS pipe) so the downloaded bytes can be counted
+        total = 0
+        try:
+            while True:
+                chunk = await source.stdout.read(RELAY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                total += len(chunk)
+                ffmpeg.stdin.write(chunk)
+                await ffmpeg.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            source.kill()       # ffmpeg gave up; its stderr says why
+        finally:
+            ffmpeg.stdin.close()
+        return total
+
+    total, source_err, ffmpeg_err = await asyncio.gather(
+        relay(), source.stderr.read(), ffmpeg.stderr.read()
+    )
+    await source.wait()
+    await ffmpeg.wait()
 
+    if ffmpeg.returncode != 0 and source.returncode == 0:
+        raise Exception(f"ffmpeg failed (Code {ffmpeg.returncode}): {ffmpeg_err.decode(errors='replace')[:200]}")
+    return total, source.returncode, source_err.decode(errors="replace")
+
+async def stream_audio_async(youtube_url: str, stats=None):
+    """
+    Stream mode: yt-dlp's smallest audio-only format goes straight from its
+    stdout through ffmpeg to audio/VIDEO_ID.ogg (or .flac), without the MP3
+    re-encode or a full-size intermediate file.
+    """
+    video_id = get_video_id(youtube_url)
+    output_dir = "audio"
+    os.makedirs(output_dir, exist_ok=True)
+    out_path = os.path.join(output_dir, video_id + STREAM_CODECS[STREAM_CODEC][1])
+
+    cmd = build_command(youtube_url, to_stdout=True)
+    print(f"DEBUG: Streaming: {' '.join(cmd)} | ffmpeg -> {out_path}")
+
+    start = time.perf_counter()
     try:
-        # Run the command
-        # Capture stdout and stderr for logging
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False # We check return code manually to parse errors
-        )
+        downloaded, returncode, stderr = await pipe_to_ffmpeg(cmd, out_path)
+        raise_for_ytdlp(returncode, stderr)
+    except Exception:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
 
-        # Log Output
-        if result.stdout:
-            print(f"STDOUT:\n{result.stdout}")
-        if result.stderr:
-            print(f"STDERR:\n{result.stderr}")
-
-        if result.returncode != 0:
-            # Parse error
-            err_msg = result.stderr
-            if "Sign in" in err_msg or "confirm you're not a bot" in err_msg:
-                 raise Exception("YouTube requires sign-in. Please export fresh 'cookies.txt' to the project root.")
-            elif "Video unavailable" in err_msg:
-                 raise Exception("Video is unavailable (private, deleted, or region locked).")
-            else:
-                 raise Exception(f"yt-dlp failed (Code {result.returncode}): {err_msg[:200]}...")
-
-        # Find the generated file
-        # yt-dlp might have saved it as VIDEO_ID.mp3
-        # Use simple ID extraction or glob to find the latest file if needed, 
-        # but with --output %(id)s.%(ext)s, it should be predictable if we know the ID.
-        # But we don't know the ID easily without parsing.
-        # However, yt-dlp prints "[ffmpeg] Destination: audio\VIDEO_ID.mp3"
-        
-        # Simple hack: Look for the most recent mp3 in 'audio' folder? 
-        # Or parse the STDOUT for "Destination: " or "Merging formats into"
-        
-        expected_filename = None
-        for line in result.stdout.splitlines():
-             if "Destination:" in line and ".mp3" in line:
-                 expected_filename = line.split("Destination:")[1].strip()
-             elif "Merging formats into" in line:
-                 expected_filename = line.split("Merging formats into")[1].strip().strip('"')
-             elif "has been downloaded" in line and ".mp3" in line:
-                 # "audio\ID.mp3 has already been downloaded"
-                 expected_filename = line.split(" ")[1].strip()
-
-        # If we couldn't parse it, try to find by globbing the audio dir?
-        # Actually, let's assume it succeeded if returncode 0.
-        # But returning the filename is required for the pipeline.
-        
-        if not expected_filename:
-             # Fallback: List files in audio dir and pick the newest one? 
-             # Risky if multiple requests. 
-             # Let's try to get ID from URL to predict filename?
-             # Extract ID from URL is hard to do perfectly with just string manip.
-             
-             # Better: Use --print filename first? No that's another call.
-             # Subprocess output usually contains the filename.
-             pass
-
-        if expected_filename:
-            # Output from yt-dlp might be relative or absolute.
-            # If it's relative to CWD, we are good.
-            if not os.path.exists(expected_filename):
-                # Try relative to audio dir?
-                pass
-            
-            # Sanity check
-            if os.path.exists(expected_filename):
-                print(f"DEBUG: Successfully extracted audio to: {expected_filename}")
-                return expected_filename
-        
-        # If we missed the filename parse, try to find it via Python glob?
-        # Creating a wrapper that returns the path.
-        # For now, searching standard pattern output.
-        # If parsing fails, we raise.
-        
-        if not expected_filename or not os.path.exists(expected_filename):
-             raise Exception("Download appeared successful but couldn't locate output file. Check logs.")
-
-        return expected_filename
+    if stats is not None:
+        stats.update({
+            "mode": "stream",
+            "codec": STREAM_CODEC,
+            "bytes_downloaded": downloaded,
+            "audio_bytes": os.path.getsize(out_path),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+    print(f"DEBUG: Streamed {downloaded} bytes into {os.path.getsize(out_path)} bytes of audio: {out_path}")
+    return out_path
 
+async def extract_audio_async(youtube_url: str, stats=None):
+    """
+    Downloads youtube_url's audio with yt-dlp as an asyncio subprocess, so
+    the calling event loop keeps serving other work while it runs.
+    Uses stream mode when EXTRACT_MODE is "stream" and the URL has a video
+    id to name the file after. stats, if given, is filled with the mode,
+    bytes and seconds taken.
+    """
+    if EXTRACT_MODE == "stream" and get_video_id(youtube_url):
+        return await stream_audio_async(youtube_url, stats)
+
+    cmd = build_command(youtube_url)
+    print(f"DEBUG: Running Command: {' '.join(cmd)}")
+
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        path = locate_output(
+            process.returncode,
+            stdout.decode(errors="replace"),
+            stderr.decode(errors="replace"),
+        )
     except Exception as e:
         print(f"Process Error: {e}")
         raise e
 
+    if stats is not None:
+        stats.update({
+            "mode": "mp3",
+            "audio_bytes": os.path.getsize(path),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+    return path
+
+@timed("extract_audio")
+def extract_audio(youtube_url: str, stats=None):
+    """
+    Extracts audio from a YouTube video using the standalone yt-dlp.exe via subprocess.
+    Blocking wrapper around extract_audio_async for worker threads and scripts.
+    """
+    return asyncio.run(extract_audio_async(youtube_url, stats))
+
 if __name__ == "__main__":
     url = input("Enter YouTube URL: ").strip()
     try:
@@ -0,0 +1,293 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.audio_extract import get_video_id, find_ytdlp
+from backend.video_processing import process_youtube_video
+from backend import metrics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_DIR = os.environ.get("BATCH_INGEST_DIR", os.path.join(ROOT_DIR, "cache", "batches"))
+
+# How many videos of a batch may be in each stage at once. Downloads and
+# Groq calls are network-bound; embedding is CPU-bound, so it gets the fewest.
+DOWNLOAD_CONCURRENCY = int(os.environ.get("BATCH_DOWNLOAD_CONCURRENCY", "4"))
+TRANSCRIBE_CONCURRENCY = int(os.environ.get("BATCH_TRANSCRIBE_CONCURRENCY", "3"))
+SUMMARY_CONCURRENCY = int(os.environ.get("BATCH_SUMMARY_CONCURRENCY", "3"))
+EMBED_CONCURRENCY = int(os.environ.get("BATCH_EMBED_CONCURRENCY", "1"))
+
+MAX_ATTEMPTS = int(os.environ.get("BATCH_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF = float(os.environ.get("BATCH_RETRY_BACKOFF", "5"))   # seconds, doubled per attempt
+
+# Failures another attempt can't fix (matches process_youtube_video's messages)
+PERMANENT_ERRORS = ("unavailable", "age-restricted", "requires sign-in")
+
+# Playlist, channel and user pages; a watch?v=...&list=... URL is one video
+PLAYLIST_PATTERN = re.compile(r"[?&]list=|/playlist\b|/@|/channel/|/c/|/user/")
+
+
+def is_playlist(url):
+    return bool(PLAYLIST_PATTERN.search(url)) and not get_video_id(url)
+
+
+def expand_playlist(url):
+    """
+    Video URLs of a playlist or channel, in order, from a single flat yt-dlp
+    metadata request (nothing is downloaded).
+    """
+    cmd = [find_ytdlp(), "--flat-playlist", "--dump-single-json", "--no-warnings", url]
+    print(f"DEBUG: Expanding playlist: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"yt-dlp could not list {url} (Code {result.returncode}): {result.stderr[:200]}")
+
+    urls = []
+
+    def collect(entries):
+        for entry in entries or []:
+            if entry.get("entries"):
+                # Channels list their tabs (Videos, Shorts, ...) as nested playlists
+                collect(entry["entries"])
+            elif entry.get("_type") == "playlist" or (entry.get("url") and is_playlist(entry["url"])):
+                urls.extend(expand_playlist(entry["url"]))
+            elif entry.get("id"):
+                urls.append(f"https://www.youtube.com/watch?v={entry['id']}")
+
+    collect(json.loads(result.stdout).get("entries"))
+    return urls
+
+
+def expand_urls(urls):
+    """
+    Expands playlists/channels and drops repeated videos, keeping the order.
+    """
+    expanded, seen = [], set()
+    for url in urls:
+        for video_url in (expand_playlist(url) if is_playlist(url) else [url]):
+            key = get_video_id(video_url) or video_url
+            if key not in seen:
+                seen.add(key)
+                expanded.append(video_url)
+    return expanded
+
+
+def batch_id_for(urls, language_mode):
+    return hashlib.sha1(json.dumps([list(urls), language_mode]).encode("utf-8")).hexdigest()[:16]
+
+
+class BatchIngest:
+    """
+    One batch of videos. The expanded video list and each item's state are
+    checkpointed to BATCH_DIR/<batch_id>.json after every change, so a
+    batch that is started again (same URLs and mode, or the same batch_id)
+    skips the videos already done and retries the rest.
+    """
+
+    def __init__(self, urls, language_mode="original", batch_id=None, restart=False):
+        self.sources = list(urls)
+        self.language_mode = language_mode
+        self.batch_id = batch_id or batch_id_for(self.sources, language_mode)
+        self.path = os.path.join(BATCH_DIR, f"{self.batch_id}.json")
+        self._lock = threading.Lock()
+        self.items = None           # expanded on first run, then read from the checkpoint
+        self.status = "queued"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.done_this_run = 0
+
+        if not restart and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.sources = state["sources"]
+            self.language_mode = state["language_mode"]
+            self.items = state["items"]
+            print(f"Batch {self.batch_id}: resuming from checkpoint "
+                  f"({sum(i['status'] == 'done' for i in self.items)}/{len(self.items)} done)")
+
+    def _save(self):
+        # Caller holds _lock. Write-then-rename so a crash never leaves half a file.
+        os.makedirs(BATCH_DIR, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "batch_id": self.batch_id,
+                "sources": self.sources,
+                "language_mode": self.language_mode,
+                "items": self.items,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def _update(self, item, **changes):
+        with self._lock:
+            item.update(changes)
+            if "status" in changes:
+                self._save()
+
+    def _ingest(self, item, gates, progress):
+        def stage_progress(stage, status, **info):
+            if status == "running":
+                self._update(item, stage=stage)
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._update(item, status="running", attempts=attempt, error=None)
+            start = time.time()
+            try:
+                result = process_youtube_video(item["url"], language_mode=self.language_mode,
+                                               progress=stage_progress, gates=gates)
+                error = result.get("error")
+            except Exception as e:
+                result, error = None, str(e)
+
+            if not error:
+                self._update(item, status="done", stage=None, seconds=round(time.time() - start, 1),
+                             video_id=result.get("video_id", item["video_id"]))
+                with self._lock:
+                    self.done_this_run += 1
+                break
+
+            permanent = any(p in error.lower() for p in PERMANENT_ERRORS)
+            last = permanent or attempt == MAX_ATTEMPTS
+            print(f"Batch {self.batch_id}: {item['url']} attempt {attempt} failed: {error}"
+                  + ("" if last else ", retrying"))
+            self._update(item, status="failed" if last else "retrying", error=error)
+            if last:
+                break
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+
+        if progress:
+            progress(item, self.snapshot())
+
+    def run(self, progress=None):
+        """
+        Ingests every item not done yet and blocks until the batch is
+        finished. progress(item, snapshot) is called as each video finishes.
+        """
+        self.status = "running"
+        self.started_at = time.time()
+        self.done_this_run = 0
+        try:
+            if self.items is None:
+                print(f"Batch {self.batch_id}: expanding {len(self.sources)} URL(s)...")
+                self.items = [
+                    {"url": url, "video_id": get_video_id(url), "status": "pending", "attempts": 0,
+                     "stage": None, "error": None, "seconds": None}
+                    for url in expand_urls(self.sources)
+                ]
+                with self._lock:
+                    self._save()
+
+            # Resumed items (failed or interrupted) get a fresh set of attempts
+            todo = [item for item in self.items if item["status"] != "done"]
+
+            gates = {
+                "download": threading.Semaphore(DOWNLOAD_CONCURRENCY),
+                "transcribe": threading.Semaphore(TRANSCRIBE_CONCURRENCY),
+                "summarize": threading.Semaphore(SUMMARY_CONCURRENCY),
+                "embed": threading.Semaphore(EMBED_CONCURRENCY),
+            }
+            # Enough videos in flight to keep every stage's slots busy
+            workers = DOWNLOAD_CONCURRENCY + TRANSCRIBE_CONCURRENCY + EMBED_CONCURRENCY
+            print(f"Batch {self.batch_id}: {len(todo)} of {len(self.items)} video(s) to ingest, {workers} in flight")
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))), thread_name_prefix="batch") as pool:
+                list(pool.map(metrics.traced(lambda item: self._ingest(item, gates, progress)), todo))
+
+            self.status = "failed" if any(i["status"] == "failed" for i in self.items) else "done"
+        except Exception as e:
+            print(f"Batch {self.batch_id} crashed: {e}")
+            self.status, self.error = "failed", str(e)
+        finally:
+            self.finished_at = time.time()
+        return self.snapshot()
+
+    def snapshot(self):
+        with self._lock:
+            items = [dict(item) for item in self.items or []]
+        counts = {}
+        for item in items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "error": self.error,
+            "language_mode": self.language_mode,
+            "total": len(items),
+            "counts": counts,
+            "elapsed_seconds": round(elapsed, 1),
+            # Only videos ingested by this run; resumed ones were done earlier
+            "videos_per_hour": round(self.done_this_run / elapsed * 3600, 1) if elapsed else 0.0,
+            "items": items,
+        }
+
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+
+def submit(urls, language_mode="original"):
+    """
+    Starts a batch in a background thread and returns its snapshot. The same
+    URLs + mode while that batch is still running return the running batch.
+    """
+    batch_id = batch_id_for(urls, language_mode)
+    with _batches_lock:
+        batch = _batches.get(batch_id)
+        if batch is None or batch.status in ("done", "failed"):
+            batch = _batches[batch_id] = BatchIngest(urls, language_mode, batch_id=batch_id)
+            batch.status = "running"
+            threading.Thread(target=metrics.traced(batch.run), daemon=True, name=f"batch-{batch_id}").start()
+    return batch.snapshot()
+
+
+def get_batch(batch_id):
+    with _batches_lock:
+        batch = _batches.get(batch_id)
+    return batch.snapshot() if batch else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest many videos, playlists or channels.")
+    parser.add_argument("urls", nargs="*", help="Video, playlist or channel URLs")
+    parser.add_argument("--file", help="Text file with one URL per line")
+    parser.add_argument("--language-mode", default="original", choices=["original", "english"])
+    parser.add_argument("--batch-id", help="Resume this batch's checkpoint instead of deriving the id from the URLs")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not urls and not args.batch_id:
+        parser.error("give at least one URL, --file or --batch-id")
+
+    batch = BatchIngest(urls, args.language_mode, batch_id=args.batch_id, restart=args.restart)
+    if not urls and batch.items is None:
+        parser.error(f"no checkpoint for batch {args.batch_id} in {BATCH_DIR}")
+
+    def progress(item, snap):
+        done = snap["counts"].get("done", 0)
+        print(f"[{done}/{snap['total']}] {item['status']:>6} {item['url']} "
+              f"({snap['videos_per_hour']:.1f} videos/hour)")
+
+    snap = batch.run(progress=progress)
+    print(f"Batch {snap['batch_id']} {snap['status']}: {snap['counts']} in {snap['elapsed_seconds']:.0f}s, "
+          f"{snap['videos_per_hour']:.1f} videos/hour")
+    for item in snap["items"]:
+        if item["status"] == "failed":
+            print(f"  failed: {item['url']}: {item['error']}")
+    return 0 if snap["status"] == "done" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import os
+import json
+import shutil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKPOINT_DIR = os.environ.get("PIPELINE_CHECKPOINT_DIR", os.path.join(ROOT_DIR, "transcripts"))
+
+# Set PIPELINE_CHECKPOINTS=0 to always run every stage from scratch
+ENABLED = os.environ.get("PIPELINE_CHECKPOINTS", "1") != "0"
+
+
+class Checkpoint:
+    """
+    Outputs of one ingest's finished stages, written to
+    CHECKPOINT_DIR/<video_id>.<key>/<stage>.json as each stage finishes.
+    key is the ingest cache key (video, language mode, models and chunking
+    settings), so a retry of the same ingest resumes at the first stage
+    without a checkpoint and a changed setting starts over. Cleared once
+    the ingest is complete and in the ingest cache.
+    """
+
+    def __init__(self, video_id, key, root=None):
+        self.path = os.path.join(root or CHECKPOINT_DIR, f"{video_id}.{key[:16]}")
+
+    def file(self, name):
+        return os.path.join(self.path, f"{name}.json")
+
+    def load(self, name):
+        """
+        The saved output of a stage (or part of one), or None.
+        """
+        try:
+            with open(self.file(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Checkpoint {self.file(name)} unreadable, redoing that stage: {e}")
+            return None
+
+    def save(self, name, data):
+        # Write-then-rename: a crash mid-write leaves the previous state, never half a file
+        os.makedirs(self.path, exist_ok=True)
+        path = self.file(name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def for_video(video_id, key):
+    return Checkpoint(video_id, key) if ENABLED and video_id else None
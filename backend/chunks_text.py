@@ -1,5 +1,7 @@
 import os
 import json
+from backend.shared_model import count_tokens
+from backend.metrics import timed
 
 TRANSCRIPTS_DIR = "transcripts"
 CHUNKS_DIR = "chunks"
@@ -7,7 +9,13 @@ CHUNKS_DIR = "chunks"
 CHUNK_SIZE = 500      # words per chunk
 OVERLAP = 100         # words overlap between chunks
 
+# Segment-aware chunking: budget in embedding-model tokens, well under the
+# model's 512-token window so nothing is truncated away
+CHUNK_TOKENS = 256
+OVERLAP_SEGMENTS = 1  # trailing segments repeated at the start of the next chunk
 
+
+@timed("chunk_text")
 def chunk_text(text, chunk_size, overlap):
     words = text.split()
     chunks = []
@@ -22,6 +30,69 @@ def chunk_text(text, chunk_size, overlap):
     return chunks
 
 
+def _split_long_segment(segment, tokens, max_tokens):
+    # A single segment over budget is cut by words, spreading its time span evenly
+    words = segment["text"].split()
+    parts = max(1, -(-tokens // max_tokens))
+    per_part = -(-len(words) // parts)
+    start, end = segment.get("start", 0), segment.get("end", segment.get("start", 0))
+    step = (end - start) / parts
+    pieces = []
+    for i in range(parts):
+        piece_words = words[i * per_part:(i + 1) * per_part]
+        if piece_words:
+            pieces.append({
+                "text": " ".join(piece_words),
+                "start": start + i * step,
+                "end": start + (i + 1) * step,
+            })
+    return pieces
+
+
+@timed("chunk_segments")
+def chunk_segments(segments, max_tokens=CHUNK_TOKENS, overlap_segments=OVERLAP_SEGMENTS):
+    """
+    Packs consecutive transcript segments into chunks of at most max_tokens
+    (measured with the embedding model's tokenizer) without cutting a segment.
+    Returns [{"text", "start", "end"}], start/end in seconds.
+    """
+    segments = [s for s in segments if s.get("text", "").strip()]
+    token_counts = count_tokens([s["text"] for s in segments])
+
+    units = []
+    for segment, tokens in zip(segments, token_counts):
+        if tokens > max_tokens:
+            pieces = _split_long_segment(segment, tokens, max_tokens)
+            units.extend(zip(pieces, count_tokens([p["text"] for p in pieces])))
+        else:
+            units.append((segment, tokens))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            # Carry the tail over so a thought spanning the boundary stays searchable
+            current = current[-overlap_segments:] if overlap_segments else []
+            current_tokens = sum(t for _, t in current)
+            while current and current_tokens + tokens > max_tokens:
+                current_tokens -= current.pop(0)[1]
+        current.append((unit, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+
+    return [
+        {
+            "text": " ".join(unit["text"].strip() for unit, _ in chunk),
+            "start": chunk[0][0].get("start", 0),
+            "end": chunk[-1][0].get("end", chunk[-1][0].get("start", 0)),
+        }
+        for chunk in chunks
+    ]
+
+
 def process_transcripts():
     os.makedirs(CHUNKS_DIR, exist_ok=True)
 
@@ -0,0 +1,152 @@
+import os
+from backend import metrics
+from backend.shared_model import get_tokenizer, count_tokens
+
+# Token budget for the retrieved context of one answer prompt, counted the
+# way chunking counts (the embedding model's WordPiece tokenizer, which runs
+# a little high on English next to Llama 3's, so the budget stays on the safe side)
+CONTEXT_TOKENS = int(os.environ.get("ANSWER_CONTEXT_TOKENS", "1024"))
+
+# Chunks of one video at most this many seconds apart are merged into one passage
+MERGE_GAP_SECONDS = float(os.environ.get("CONTEXT_MERGE_GAP", "1.0"))
+
+# Shortest run of words shared by two neighbouring chunks that counts as
+# their overlap; below it a match is more likely a coincidence ("and the")
+MIN_OVERLAP_WORDS = 3
+
+# Smallest piece of a hit worth adding to fill the end of the budget
+MIN_PART_TOKENS = 32
+
+
+def truncate(text, max_tokens):
+    """
+    The longest prefix of text within max_tokens, cut at a word boundary.
+    """
+    if max_tokens <= 0:
+        return ""
+    tok = get_tokenizer()
+    if tok is None:
+        return " ".join(text.split()[:int(max_tokens / 1.3)])
+    enc = tok.encode(text, add_special_tokens=False)
+    if len(enc.ids) <= max_tokens:
+        return text
+    cut = enc.offsets[max_tokens - 1][1]
+    if cut < len(text) and not text[cut].isspace():
+        cut = text.rfind(" ", 0, cut)
+    return text[:max(cut, 0)].rstrip()
+
+
+def _overlap(before, after):
+    # Length of the longest run of words that ends `before` and starts
+    # `after` (the KMP failure function of after + sentinel + tail of before)
+    if not after:
+        return 0
+    seq = after + [None] + before[-len(after):]
+    fail = [0] * len(seq)
+    for i in range(1, len(seq)):
+        k = fail[i - 1]
+        while k and seq[i] != seq[k]:
+            k = fail[k - 1]
+        if seq[i] == seq[k]:
+            k += 1
+        fail[i] = k
+    return fail[-1]
+
+
+def _position(hit):
+    start = hit.get("start")
+    return (start is None, start or 0, hit.get("chunk_id") or 0)
+
+
+def _adjacent(passage, hit):
+    end, start = passage["end"], hit.get("start")
+    if end is not None and start is not None:
+        return start <= end + MERGE_GAP_SECONDS
+    # Chunks without timestamps (word-window chunks): neighbours by chunk id
+    last_id, chunk_id = passage["chunk_id"], hit.get("chunk_id")
+    return last_id is not None and chunk_id is not None and chunk_id == last_id + 1
+
+
+def passages(hits):
+    """
+    Retrieved hits as passages in video order: per video (best-ranked video
+    first) the hits sorted by position, the words a chunk repeats from the
+    previous one dropped, and touching or overlapping chunks merged into one.
+    """
+    by_video = {}
+    for hit in hits:
+        by_video.setdefault(hit.get("video_id"), []).append(hit)
+
+    merged = []
+    for video_id, video_hits in by_video.items():
+        current = None
+        for hit in sorted(video_hits, key=_position):
+            words = hit["text"].split()
+            if current is not None and _adjacent(current, hit):
+                shared = _overlap(current["words"], words)
+                if shared < MIN_OVERLAP_WORDS:
+                    shared = 0
+                current["words"].extend(words[shared:])
+                if hit.get("end") is not None:
+                    current["end"] = max(current["end"] or 0, hit["end"])
+                current["chunk_id"] = hit.get("chunk_id")
+                current["hits"].append(hit)
+                continue
+            current = {
+                "video_id": video_id,
+                "start": hit.get("start"),
+                "end": hit.get("end"),
+                "chunk_id": hit.get("chunk_id"),
+                "words": list(words),
+                "hits": [hit],
+            }
+            merged.append(current)
+
+    return [
+        {"video_id": p["video_id"], "start": p["start"], "end": p["end"],
+         "text": " ".join(p["words"]), "hits": p["hits"]}
+        for p in merged
+    ]
+
+
+@metrics.timed("build_context")
+def build_context(hits, max_tokens=None):
+    """
+    Packs ranked search hits into the context of an answer prompt: de-duplicated,
+    merged passages in video order, within max_tokens (CONTEXT_TOKENS).
+    Hits are taken best-first while they fit; the first one that doesn't is
+    cut down to the room left (if at least MIN_PART_TOKENS) and ends the context.
+    Returns {"chunks": [passage text], "hits": [hits used], "tokens": n}.
+    """
+    max_tokens = CONTEXT_TOKENS if max_tokens is None else max_tokens
+    counted = {}
+
+    def measure(candidate):
+        texts = [p["text"] for p in candidate]
+        missing = [t for t in texts if t not in counted]
+        counted.update(zip(missing, count_tokens(missing)))
+        return sum(counted[t] for t in texts)
+
+    selected, used, packed, tokens = [], [], [], 0
+    for hit in hits:
+        candidate = passages(selected + [hit])
+        candidate_tokens = measure(candidate)
+        if candidate_tokens <= max_tokens:
+            selected, used, packed, tokens = selected + [hit], used + [hit], candidate, candidate_tokens
+            continue
+
+        # Over budget: keep the head of this hit in the room that's left.
+        # Merging shifts token boundaries a little, so shrink and re-measure.
+        room = max_tokens - tokens
+        while room >= MIN_PART_TOKENS:
+            part = dict(hit, text=truncate(hit["text"], room))
+            candidate = passages(selected + [part])
+            candidate_tokens = measure(candidate)
+            if candidate_tokens <= max_tokens:
+                selected, used, packed, tokens = selected + [part], used + [hit], candidate, candidate_tokens
+                break
+            room -= candidate_tokens - max_tokens
+        break
+
+    metrics.incr("answer_context_tokens_total", tokens)
+    return {"chunks": [p["text"] for p in packed], "hits": used, "tokens": tokens}
@@ -1,78 +1,211 @@
 import os
 import json
-import sqlite3
+import queue
+import threading
+import logging
+from itertools import islice
 import numpy as np
 from backend.shared_model import get_model
+from backend.vector_index import get_index
+from backend.answer_cache import get_answer_cache
+from backend import ann_index
+from backend import quantize
+from backend import vector_segments
+from backend.storage import connection, segments_dir
+from backend.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 CHUNKS_DIR = "chunks"
-ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-EMBED_DIR = os.path.join(ROOT_DIR, "embeddings")
-DB_PATH = os.path.join(EMBED_DIR, "video_embeddings.sqlite")
-
-
-def init_db():
-    os.makedirs(EMBED_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS embeddings (
-            id INTEGER PRIMARY KEY,
-            source TEXT,
-            chunk_id INTEGER,
-            text TEXT,
-            vector BLOB
-        )
-    """)
 
-    conn.commit()
-    return conn
+# Vectors pulled from the FastEmbed generator and written per executemany
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+
+
+def _sweep():
+    # Segments shared with other videos stay; only ones nothing points at go
+    with connection() as conn:
+        vector_segments.sweep(conn, segments_dir())
 
 def reset_db():
-    conn = init_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM embeddings")
-    conn.commit()
-    conn.close()
-    print("Database reset: All embeddings cleared.")
-
-def embed_chunks(chunks_data=None, source_name="unknown"):
-    conn = init_db()
-    cur = conn.cursor()
+    with connection() as conn:
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+    _sweep()
+    get_index().invalidate()
+    get_answer_cache().invalidate()
+    logger.info("Database reset: All embeddings cleared.")
+
+def delete_source(source_name):
+    with connection() as conn:
+        conn.execute("DELETE FROM embeddings WHERE source = ?", (source_name,))
+        conn.commit()
+    _sweep()
+    get_index().invalidate()
+    get_answer_cache().invalidate(source_name)
+    logger.info(f"Removed embeddings for {source_name}")
+
+def _insert_rows(cur, source_name, chunks_data, segment, offset):
+    # Only metadata goes into SQLite; the vectors are rows offset.. of the segment
+    cur.executemany(
+        "INSERT INTO embeddings (source, chunk_id, text, start_sec, end_sec, segment, segment_row) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (source_name, item["chunk_id"], item["text"], item.get("start"), item.get("end"),
+             segment, offset + i)
+            for i, item in enumerate(chunks_data)
+        )
+    )
+
+def load_source(source_name):
+    """
+    Returns (chunks_data, vectors) for one video, as written by embed_chunks.
+    vectors is a float32 matrix (L2-normalized) with one row per chunk.
+    """
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT chunk_id, text, start_sec, end_sec, segment, segment_row FROM embeddings WHERE source = ? ORDER BY id",
+            (source_name,)
+        ).fetchall()
+        dims = dict(conn.execute(
+            "SELECT name, dim FROM vector_segments WHERE name IN (SELECT segment FROM embeddings WHERE source = ?)",
+            (source_name,)
+        ))
+
+    chunks_data = [
+        {"chunk_id": chunk_id, "text": text, "start": start, "end": end}
+        for chunk_id, text, start, end, _, _ in rows
+    ]
+    if not rows:
+        return chunks_data, np.zeros((0, 0), dtype=np.float32)
+    exact = {name: vector_segments.open_segment(segments_dir(), name, vector_segments.EXACT, dim)
+             for name, dim in dims.items()}
+    vectors = np.array([exact[row[4]][row[5]] for row in rows], dtype=np.float32)
+    return chunks_data, vectors
+
+def count_source(source_name):
+    with connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM embeddings WHERE source = ?", (source_name,)).fetchone()[0]
+
+def store_embeddings(chunks_data, vectors, source_name):
+    """
+    Writes already-computed vectors (e.g. from the ingest cache) without running the model.
+    """
+    segment, offset = vector_segments.write_segment(segments_dir(), np.asarray(vectors, dtype=np.float32), connection)
+    with connection() as conn:
+        # Re-ingesting a video replaces its rows; other videos are untouched.
+        # Its old vectors are dead rows in their segment until compaction.
+        conn.execute("DELETE FROM embeddings WHERE source = ?", (source_name,))
+        _insert_rows(conn.cursor(), source_name, chunks_data, segment, offset)
+        conn.commit()
+    _sweep()
+    get_index().invalidate()
+    get_answer_cache().invalidate(source_name)
+    logger.info(f"Restored {len(chunks_data)} cached chunks for {source_name}")
+
+_ABORT = object()
+
+def _write_batches(batches, source_name, rows, errors):
+    # Writer thread: streams each batch's vectors into a range reserved in
+    # the open segment while the next batch is embedded. The rows are only
+    # written once the producer is done: one short transaction replaces them, so
+    # other writers aren't locked out for the length of the model run, and
+    # readers see either the old rows or all of the new ones.
+    ann = ann_index.get_ann() if ann_index.ENGINE == "ivf" else None
+    written = []                        # chunk metadata, in segment row order
+    cells = []                          # ANN cell of each row, published after commit
+    segment = vector_segments.SegmentWriter(segments_dir(), rows, connection)
+    finished = False
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:           # producer finished
+                finished = True
+                break
+            if batch is _ABORT:         # producer failed
+                segment.discard()
+                return
+            chunks, vectors = batch
+            segment.write(vectors)
+            written.extend(chunks)
+            if ann is not None and ann.trained:
+                cells.append(ann.assign(quantize.normalize(vectors)))
+        segment.finish()
+
+        with connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                cur.execute("DELETE FROM embeddings WHERE source = ?", (source_name,))
+                _insert_rows(cur, source_name, written, segment.name, segment.offset)
+                # Rows inserted in one transaction get consecutive rowids
+                last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    except Exception as e:
+        segment.discard()
+        errors.append(e)
+        # Keep draining so the producer never blocks on a full queue
+        while not finished and batches.get() not in (None, _ABORT):
+            pass
+        return
+
+    _sweep()
+    if cells and sum(len(c) for c in cells) == len(written):
+        ann.add_assigned(np.arange(last_id - len(written) + 1, last_id + 1), np.concatenate(cells))
+        ann.save()
+
+@timed("embed_chunks")
+def embed_chunks(chunks_data=None, source_name="unknown", batch_size=None):
+    """
+    Embeds chunks_data and replaces source_name's rows with them.
+
+    Vectors are consumed from the FastEmbed generator batch_size at a time and
+    handed to a writer thread, so batch N is inserted (executemany) while batch
+    N+1 is being embedded, and only ~2 batches of vectors are held in memory.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
     
+    if not chunks_data:
+        # Legacy file mode (cleanup if needed, but keeping for compatibility)
+        # ... (omitted for brevity as we mainly use the new flow)
+        return
+
     model = get_model()
     
-    # FastEmbed takes list of strings
-    texts = []
-    ids = []
+    # Extract texts
+    texts = [item["text"] for item in chunks_data]
     
-    if chunks_data:
-        # Extract texts
-        texts = [item["text"] for item in chunks_data]
-        ids = [item["chunk_id"] for item in chunks_data]
-        
-        # Batch embed
-        print(f"Embedding {len(texts)} chunks via FastEmbed...")
-        embeddings_generator = model.embed(texts) # Returns generator
-        embeddings_list = list(embeddings_generator)
-        
-        for i, vector in enumerate(embeddings_list):
-            # vector is numpy array
-            vector_blob = vector.astype(np.float32).tobytes()
-            cur.execute(
-                "INSERT INTO embeddings (source, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
-                (source_name, ids[i], texts[i], vector_blob)
-            )
-        
-        print(f"Embedded {len(texts)} chunks for {source_name}")
-        conn.commit()
-        conn.close()
-        return
+    logger.info(f"Embedding {len(texts)} chunks via FastEmbed (batches of {batch_size})...")
+    embeddings_generator = model.embed(texts, batch_size=batch_size) # Returns generator
+
+    batches = queue.Queue(maxsize=2)    # bounded: embedding can't run far ahead of the writer
+    errors = []
+    writer = threading.Thread(target=_write_batches, args=(batches, source_name, len(texts), errors), daemon=True)
+    writer.start()
+
+    done = 0
+    try:
+        while not errors:
+            vectors = list(islice(embeddings_generator, batch_size))
+            if not vectors:
+                break
+            batches.put((chunks_data[done:done + len(vectors)], vectors))
+            done += len(vectors)
+    except BaseException:
+        batches.put(_ABORT)
+        writer.join()
+        raise
+
+    batches.put(None)
+    writer.join()
+    if errors:
+        raise errors[0]
 
-    # Legacy file mode (cleanup if needed, but keeping for compatibility)
-    # ... (omitted for brevity as we mainly use the new flow)
-    conn.commit()
-    conn.close()
+    logger.info(f"Embedded {len(texts)} chunks for {source_name}")
+    get_index().invalidate()
+    get_answer_cache().invalidate(source_name)
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,136 @@
+"""
+Standalone embedding worker: one process owns the FastEmbed model and serves
+embeddings to every web worker over a local socket, so N uvicorn/gunicorn
+workers share one ~200MB model instead of loading N copies.
+
+Run it next to the web server and point the web workers at it, with the
+same secret on both sides:
+    export EMBED_WORKER_KEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python -m backend.embed_worker                  # listens on EMBED_WORKER_ADDRESS or 127.0.0.1:8765
+    EMBED_WORKER_ADDRESS=127.0.0.1:8765 uvicorn backend.app:app
+
+The socket unpickles what it receives, so the worker only listens on a
+loopback address unless EMBED_WORKER_ALLOW_REMOTE=1.
+"""
+import os
+import ipaddress
+import queue
+import threading
+from multiprocessing.connection import Listener, Client
+import numpy as np
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+# Shared secret for the socket; both sides read the same env var. There is
+# no default: a key everyone knows would let anyone who reaches the port in.
+AUTH_KEY = os.environ.get("EMBED_WORKER_KEY", "").encode()
+# Listen on a non-loopback address (only behind a firewall / private network)
+ALLOW_REMOTE = os.environ.get("EMBED_WORKER_ALLOW_REMOTE", "0") == "1"
+# Idle connections kept per client process
+POOL_SIZE = int(os.environ.get("EMBED_WORKER_POOL", "4"))
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def auth_key():
+    if not AUTH_KEY:
+        raise RuntimeError("EMBED_WORKER_KEY is not set; the embedding worker and its clients need a shared secret")
+    return AUTH_KEY
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class RemoteEmbedding:
+    """
+    Client with the same embed(texts, batch_size) generator interface as
+    fastembed's TextEmbedding, so callers don't know where the model runs.
+    Each batch is one request; connections are pooled and reused.
+    """
+
+    def __init__(self, address):
+        auth_key()
+        self.address = parse_address(address)
+        self._pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+    def _connect(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return Client(self.address, authkey=auth_key())
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(self, texts):
+        conn = self._connect()
+        try:
+            conn.send(("embed", texts))
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            raise
+        self._release(conn)
+        if status != "ok":
+            raise RuntimeError(f"Embedding worker failed: {payload}")
+        return payload
+
+    def embed(self, texts, batch_size=256):
+        texts = list(texts)
+        for i in range(0, len(texts), batch_size):
+            # float32 matrix back over the socket, one row per text
+            yield from self._request(texts[i:i + batch_size])
+
+
+def _serve_connection(conn, model):
+    with conn:
+        while True:
+            try:
+                command, texts = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if command != "embed":
+                    raise ValueError(f"unknown command {command!r}")
+                vectors = np.array(list(model.embed(texts, batch_size=len(texts) or 1)), dtype=np.float32)
+                conn.send(("ok", vectors))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+
+def serve(address=None):
+    from backend.shared_model import load_model
+
+    address = address or os.environ.get("EMBED_WORKER_ADDRESS") or DEFAULT_ADDRESS
+    key = auth_key()
+    host, port = parse_address(address)
+    if not is_loopback(host) and not ALLOW_REMOTE:
+        raise RuntimeError(f"Refusing to listen on {host}: not a loopback address (set EMBED_WORKER_ALLOW_REMOTE=1 to allow)")
+    model = load_model()
+    list(model.embed(["warm up"]))
+
+    with Listener((host, port), authkey=key) as listener:
+        print(f"Embedding worker listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:  # failed handshake, e.g. wrong key
+                print(f"Embedding worker rejected a connection: {e}")
+                continue
+            # ONNX Runtime sessions are safe to run from several threads
+            threading.Thread(target=_serve_connection, args=(conn, model), daemon=True).start()
+
+
+if __name__ == "__main__":
+    serve()
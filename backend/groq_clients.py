@@ -0,0 +1,357 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+import httpx
+import groq
+from groq import Groq, AsyncGroq
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# One HTTP connection pool per process, shared by every Groq call (transcribe,
+# summary, answers), so TLS connections to the API are reused across requests
+MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.environ.get("GROQ_MAX_KEEPALIVE", "20"))
+TIMEOUT_SECONDS = float(os.environ.get("GROQ_TIMEOUT", "120"))
+
+# Requests per minute allowed per model, as "model=rpm,model=rpm" (defaults:
+# Groq's free-tier limits). Calls beyond it wait for a slot instead of
+# drawing a 429; models not listed aren't throttled.
+RATE_LIMITS = {
+    model.strip(): float(rpm)
+    for model, _, rpm in (
+        item.partition("=") for item in
+        os.environ.get("GROQ_RATE_LIMITS", "whisper-large-v3=20,llama-3.3-70b-versatile=30").split(",")
+    )
+    if model.strip() and float(rpm or 0) > 0
+}
+# A model's bucket holds this many seconds' worth of requests, so a burst
+# goes out at once and the rest are spread over the minute
+RATE_BURST_SECONDS = float(os.environ.get("GROQ_RATE_BURST_SECONDS", "10"))
+
+# Retries of 429s, 5xx and dropped connections: exponential backoff from
+# BACKOFF_BASE up to BACKOFF_MAX seconds, unless the response says how long
+# to wait (retry-after / retry-after-ms, honoured up to RETRY_AFTER_MAX)
+MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.environ.get("GROQ_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("GROQ_BACKOFF_MAX", "30"))
+RETRY_AFTER_MAX = float(os.environ.get("GROQ_RETRY_AFTER_MAX", "60"))
+RETRY_STATUSES = (408, 409, 429)
+
+# Identical requests already in flight share one upstream call
+COALESCE = os.environ.get("GROQ_COALESCE", "1") != "0"
+
+
+def _limits():
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE)
+
+
+class TokenBucket:
+    """
+    Allows per_minute requests a minute in bursts of up to burst (default:
+    RATE_BURST_SECONDS' worth). reserve() books the next slot and returns how long
+    the caller has to wait for it, so sync and async callers share one
+    bucket. pause() holds every slot back, e.g. for a 429's retry-after,
+    which applies to the whole model and not just the request that got it.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.interval = 60.0 / per_minute
+        self.burst = burst or max(1, int(per_minute * RATE_BURST_SECONDS / 60))
+        self._lock = threading.Lock()
+        self._next = 0.0            # time the bucket is empty until (GCRA theoretical arrival time)
+        self._paused_until = 0.0
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+            ready = max(start - (self.burst - 1) * self.interval, self._paused_until)
+            return max(0.0, ready - now)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(model):
+    if model not in RATE_LIMITS:
+        return None
+    with _buckets_lock:
+        if model not in _buckets:
+            _buckets[model] = TokenBucket(RATE_LIMITS[model])
+        return _buckets[model]
+
+
+def _status(error):
+    return getattr(error, "status_code", None)
+
+
+def _retryable(error):
+    if isinstance(error, groq.APIConnectionError):     # includes timeouts
+        return True
+    status = _status(error)
+    return status is not None and (status in RETRY_STATUSES or status >= 500)
+
+
+def _retry_after(error):
+    # Seconds the API asked us to wait, or None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def retry_delay(error, attempt):
+    """
+    Seconds to wait before retry number attempt + 1: the server's
+    retry-after when it gives a sensible one, else jittered exponential backoff.
+    """
+    retry_after = _retry_after(error)
+    if retry_after is not None and 0 < retry_after <= RETRY_AFTER_MAX:
+        return retry_after
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.75, 1.25)
+
+
+def _before_retry(error, attempt, model, bucket):
+    """
+    Re-raises error if it can't or shouldn't be retried; otherwise returns
+    how long to back off.
+    """
+    if attempt >= MAX_RETRIES or not _retryable(error):
+        raise error
+    delay = retry_delay(error, attempt)
+    if _status(error) == 429 and bucket:
+        bucket.pause(delay)
+    metrics.incr("upstream_retries_total", service="groq", model=model, status=str(_status(error) or "connection"))
+    logger.warning(f"Groq {model}: {type(error).__name__} ({_status(error) or 'no response'}), "
+          f"retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+    return delay
+
+
+def _rewind(kwargs):
+    # Uploads are read by the first attempt; start each retry from the top
+    file = kwargs.get("file")
+    handle = file[1] if isinstance(file, tuple) else file
+    if hasattr(handle, "seek"):
+        handle.seek(0)
+
+
+def _flight_key(endpoint, kwargs):
+    """
+    Identity of a request for coalescing, or None if it can't be shared
+    (streams, uploads that aren't plain files).
+    """
+    if not COALESCE or kwargs.get("stream"):
+        return None
+    key = dict(kwargs)
+    if "file" in key:
+        file = key["file"]
+        handle = file[1] if isinstance(file, tuple) else file
+        try:
+            stat = os.fstat(handle.fileno())
+        except (AttributeError, OSError, ValueError):
+            return None
+        key["file"] = [getattr(handle, "name", None), stat.st_size, stat.st_mtime_ns]
+    try:
+        return endpoint + json.dumps(key, sort_keys=True)
+    except TypeError:
+        return None
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _single_flight(key, call):
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        metrics.incr("upstream_coalesced_total", service="groq")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = call()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+_async_flights = {}
+
+
+async def _async_single_flight(key, call):
+    flight = _async_flights.get(key)
+    if flight is not None:
+        metrics.incr("upstream_coalesced_total", service="groq")
+        return await asyncio.shield(flight)
+
+    flight = _async_flights[key] = asyncio.get_running_loop().create_future()
+    # Nobody may be waiting on it; don't log "exception was never retrieved"
+    flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+    try:
+        result = await call()
+        flight.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except Exception as e:
+        flight.set_exception(e)
+        raise
+    finally:
+        del _async_flights[key]
+
+
+class _Endpoint:
+    def __init__(self, endpoint, name):
+        self._endpoint = endpoint
+        self._name = name
+
+    def _call(self, kwargs):
+        model = kwargs.get("model")
+        bucket = get_bucket(model)
+        attempt = 0
+        while True:
+            if bucket:
+                wait = bucket.reserve()
+                if wait > 0:
+                    metrics.observe("upstream_throttle_seconds", wait, service="groq", model=model)
+                    time.sleep(wait)
+            _rewind(kwargs)
+            try:
+                return self._endpoint.create(**kwargs)
+            except Exception as e:
+                time.sleep(_before_retry(e, attempt, model, bucket))
+                attempt += 1
+
+    def create(self, **kwargs):
+        key = _flight_key(self._name, kwargs)
+        if key is None:
+            return self._call(kwargs)
+        return _single_flight(key, lambda: self._call(kwargs))
+
+
+class _AsyncEndpoint(_Endpoint):
+    async def _call(self, kwargs):
+        model = kwargs.get("model")
+        bucket = get_bucket(model)
+        attempt = 0
+        while True:
+            if bucket:
+                wait = bucket.reserve()
+                if wait > 0:
+                    metrics.observe("upstream_throttle_seconds", wait, service="groq", model=model)
+                    await asyncio.sleep(wait)
+            _rewind(kwargs)
+            try:
+                return await self._endpoint.create(**kwargs)
+            except Exception as e:
+                await asyncio.sleep(_before_retry(e, attempt, model, bucket))
+                attempt += 1
+
+    async def create(self, **kwargs):
+        key = _flight_key(self._name, kwargs)
+        if key is None:
+            return await self._call(kwargs)
+        return await _async_single_flight(key, lambda: self._call(kwargs))
+
+
+class UpstreamClient:
+    """
+    A Groq / AsyncGroq client with the calls this app makes
+    (chat.completions, audio.transcriptions, audio.translations) routed
+    through the per-model rate limiter, retries with backoff and
+    single-flight coalescing. The wrapped client is built with
+    max_retries=0 so retries happen only here.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        endpoint = _AsyncEndpoint if isinstance(raw, AsyncGroq) else _Endpoint
+        self.chat = SimpleNamespace(completions=endpoint(raw.chat.completions, "chat"))
+        self.audio = SimpleNamespace(
+            transcriptions=endpoint(raw.audio.transcriptions, "transcriptions"),
+            translations=endpoint(raw.audio.translations, "translations"),
+        )
+
+    def close(self):
+        return self.raw.close()
+
+
+# Global variables for lazy loading
+client = None
+async_client = None
+
+
+def get_client():
+    """
+    Synchronous Groq client, for the ingest pipeline's worker threads.
+    """
+    global client
+    if client is None:
+        http_client = httpx.Client(limits=_limits(), timeout=TIMEOUT_SECONDS)
+        client = UpstreamClient(Groq(api_key=os.environ.get("GROQ_API_KEY"), http_client=http_client,
+                                     max_retries=0))
+    return client
+
+
+def get_async_client():
+    """
+    AsyncGroq client for request handlers. Create and use it from the
+    server's event loop only.
+    """
+    global async_client
+    if async_client is None:
+        http_client = httpx.AsyncClient(limits=_limits(), timeout=TIMEOUT_SECONDS)
+        async_client = UpstreamClient(AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"), http_client=http_client,
+                                                max_retries=0))
+    return async_client
+
+
+async def close_async_client():
+    global async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get("INGEST_CACHE_DIR", os.path.join(ROOT_DIR, "cache", "ingest"))
+
+# Size budget for the whole cache directory; least recently used entries go first
+MAX_BYTES = int(float(os.environ.get("INGEST_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Bump when the stored layout or the pipeline output changes
+CACHE_VERSION = 1
+
+_lock = threading.Lock()
+
+
+def cache_key(video_id, language_mode, versions):
+    """
+    Content address of one ingest: video, language mode and every model /
+    parameter that shapes the output (passed in versions). Changing any of
+    them is a cache miss.
+    """
+    payload = {
+        "cache_version": CACHE_VERSION,
+        "video_id": video_id,
+        "language_mode": language_mode,
+        **versions,
+    }
+    raw = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _paths(key):
+    return (
+        os.path.join(CACHE_DIR, f"{key}.json"),
+        os.path.join(CACHE_DIR, f"{key}.npy"),
+    )
+
+
+def get(key):
+    """
+    Returns the cached entry dict (with a "vectors" matrix) or None.
+    """
+    json_path, npy_path = _paths(key)
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["vectors"] = np.load(npy_path)
+    except (OSError, ValueError) as e:
+        if os.path.exists(json_path):
+            print(f"Ingest cache entry {key[:12]} unreadable, ignoring: {e}")
+        return None
+
+    # Touch so eviction sees this entry as recently used
+    for path in (json_path, npy_path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return entry
+
+
+def put(key, entry, vectors):
+    """
+    Stores entry (JSON-serializable dict) and its vectors, then enforces MAX_BYTES.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    json_path, npy_path = _paths(key)
+
+    # Write to temp names and rename so readers never see half an entry.
+    # The .npy goes first: get() only trusts entries whose .json exists.
+    tmp_npy = npy_path + ".tmp.npy"
+    np.save(tmp_npy, np.asarray(vectors, dtype=np.float32))
+    os.replace(tmp_npy, npy_path)
+
+    tmp_json = json_path + ".tmp"
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_json, json_path)
+
+    evict()
+
+
+def evict(max_bytes=None):
+    """
+    Deletes least recently used entries until the cache fits in max_bytes.
+    """
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    with _lock:
+        entries = {}
+        for name in os.listdir(CACHE_DIR):
+            key, ext = os.path.splitext(name)
+            if ext not in (".json", ".npy"):
+                continue
+            try:
+                stat = os.stat(os.path.join(CACHE_DIR, name))
+            except OSError:
+                continue
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= max_bytes:
+                break
+            for path in _paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            print(f"Ingest cache evicted {key[:12]} ({size} bytes)")
@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+import threading
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.audio_extract import get_video_id
+from backend.video_processing import process_youtube_video, STAGES
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool: at most JOB_WORKERS videos ingest at once, the rest wait queued
+MAX_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Finished jobs kept around for polling before the oldest are dropped
+MAX_FINISHED_JOBS = int(os.environ.get("JOB_HISTORY", "200"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+_lock = threading.Lock()
+_jobs = {}      # job_id -> job dict
+_active = {}    # (video key, language_mode) -> job_id of a queued/running job
+
+
+def _snapshot(job):
+    # Copy under the lock so callers never see a half-updated job
+    snap = dict(job)
+    snap["stages"] = {name: dict(stage) for name, stage in job["stages"].items()}
+    return snap
+
+
+def submit(url, language_mode="original"):
+    """
+    Queues an ingest and returns its job. If the same video is already
+    queued or running in the same language mode, that job is returned instead.
+    """
+    video_id = get_video_id(url)
+    dedupe_key = (video_id or url, language_mode)
+
+    with _lock:
+        existing = _active.get(dedupe_key)
+        if existing:
+            return _snapshot(_jobs[existing])
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "url": url,
+            "video_id": video_id,
+            "language_mode": language_mode,
+            "trace_id": metrics.trace_id.get(),
+            "status": "queued",
+            "stages": {name: {"status": "pending"} for name in STAGES},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        _jobs[job_id] = job
+        _active[dedupe_key] = job_id
+        _prune()
+
+    # The worker thread keeps the submitting request's trace id for its logs
+    _executor.submit(contextvars.copy_context().run, _run, job_id, dedupe_key)
+    return _snapshot(job)
+
+
+def get_job(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+
+def _progress(job_id):
+    def report(stage, status, **info):
+        with _lock:
+            entry = _jobs[job_id]["stages"][stage]
+            entry["status"] = status
+            entry.update(info)
+            if status == "running":
+                entry["started_at"] = time.time()
+            else:
+                entry["finished_at"] = time.time()
+    return report
+
+
+def _run(job_id, dedupe_key):
+    with _lock:
+        job = _jobs[job_id]
+        job["status"] = "running"
+        url, language_mode = job["url"], job["language_mode"]
+
+    try:
+        result = process_youtube_video(url, language_mode=language_mode, progress=_progress(job_id))
+        error = result.get("error")
+    except Exception as e:
+        logger.error(f"Job {job_id} crashed: {e}")
+        result, error = None, str(e)
+
+    with _lock:
+        job = _jobs[job_id]
+        job["finished_at"] = time.time()
+        if error:
+            job["status"] = "failed"
+            job["error"] = error
+        else:
+            job["status"] = "done"
+            job["result"] = result
+            job["video_id"] = result.get("video_id", job["video_id"])
+        _active.pop(dedupe_key, None)
+
+
+def _prune():
+    # Caller holds _lock. Drops the oldest finished jobs beyond MAX_FINISHED_JOBS.
+    finished = [j for j in _jobs.values() if j["finished_at"] is not None]
+    if len(finished) <= MAX_FINISHED_JOBS:
+        return
+    finished.sort(key=lambda j: j["finished_at"])
+    for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+        del _jobs[job["job_id"]]
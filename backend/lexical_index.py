@@ -0,0 +1,56 @@
+import re
+import sqlite3
+
+from backend.storage import connection, FTS_TABLE
+
+# Longer questions are cut to this many terms before they reach MATCH
+MAX_QUERY_TERMS = 32
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(query):
+    """
+    Turns a free-text question into an FTS5 OR-query of quoted terms, so
+    punctuation or words like NOT/NEAR in the question can't break MATCH.
+    """
+    terms = list(dict.fromkeys(t.lower() for t in TOKEN_PATTERN.findall(query)))
+    return " OR ".join(f'"{t}"' for t in terms[:MAX_QUERY_TERMS])
+
+
+def search_lexical(query, k, sources=None, db_path=None):
+    """
+    Returns up to k (embeddings id, bm25 score) pairs, best first.
+    bm25() is negated so that higher is better, like cosine scores.
+    """
+    expression = match_expression(query)
+    if not expression or k <= 0:
+        return []
+
+    with connection(db_path) as conn:
+        sql = f"SELECT rowid, -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+        params = [expression]
+        if sources is not None:
+            sources = list(dict.fromkeys(sources))
+            placeholders = ", ".join("?" * len(sources))
+            sql += f" AND rowid IN (SELECT id FROM embeddings WHERE source IN ({placeholders}))"
+            params += sources
+        sql += f" ORDER BY bm25({FTS_TABLE}) LIMIT ?"
+        params.append(k)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:   # e.g. no FTS5 in this SQLite build
+            print(f"Lexical search failed: {e}")
+            return []
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses ranked id lists: each id scores sum(1 / (k + rank)) over the lists
+    it appears in. Returns (id, score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
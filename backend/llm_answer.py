@@ -1,38 +1,135 @@
-import os
-from groq import Groq
+from backend.groq_clients import get_client, get_async_client
+from backend import metrics
 
 # Configure Groq
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
-
-def generate_answer(question, context_chunks):
-    context = "\n\n".join(context_chunks)
-
-    prompt = f"""
-    You are a helpful and conversational AI assistant. 
-    Your primary source of information is the provided Context from a YouTube video.
-    Always prioritize the Context.
-    
-    If the answer is found in the Context, answer using that information.
-    If the answer is NOT found in the Context, use your general knowledge to provide a helpful answer, but briefly mention that this information comes from outside the video.
-    
-    Do not say "I don't know" unless the question is completely nonsensical.
-    
-    Context:
-    {context}
-    
-    Question:
-    {question}
+client = get_client()
+
+ANSWER_MODEL = "llama-3.3-70b-versatile" # Strong reasoning model
+ERROR_PREFIX = "Error gathering answer"
+
+
+# Kept short: every /ask pays for these tokens in input cost and prefill time
+PROMPT = """Answer the question from the Context, taken from a YouTube video. \
+If the Context doesn't cover it, answer from general knowledge and briefly say \
+that this comes from outside the video. Only say you don't know if the question makes no sense.
+
+Context:
+{context}
+
+Question:
+{question}"""
+
+
+def build_prompt(question, context_chunks):
+    return PROMPT.format(context="\n\n".join(context_chunks), question=question)
+
+
+def record_usage(usage):
+    # Prompt tokens as billed, counted by the answer model's own tokenizer
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if prompt_tokens is not None:
+        metrics.incr("answer_prompt_tokens_total", prompt_tokens, model=ANSWER_MODEL)
+
+
+def _stream_usage(chunk):
+    # Groq sends the usage of a streamed completion on its last chunk
+    return getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+
+
+@metrics.timed("generate_answer")
+def generate_answer(question, context_chunks, groq_client=None):
+    groq_client = groq_client or client
+    prompt = build_prompt(question, context_chunks)
+
+    try:
+        response = groq_client.chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1
+        )
+
+        record_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content
+    except Exception as e:
+        metrics.upstream_error("groq_chat", e)
+        return f"{ERROR_PREFIX}: {e}"
+
+
+@metrics.timed("generate_answer")
+def stream_answer(question, context_chunks, groq_client=None):
+    """
+    Same as generate_answer, but yields the answer text piece by piece as the
+    chat completion streams in.
+    """
+    groq_client = groq_client or client
+    prompt = build_prompt(question, context_chunks)
+
+    try:
+        stream = groq_client.chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            stream=True
+        )
+
+        for chunk in stream:
+            record_usage(_stream_usage(chunk))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except Exception as e:
+        metrics.upstream_error("groq_chat", e)
+        yield f"{ERROR_PREFIX}: {e}"
+
+
+@metrics.timed("generate_answer")
+async def agenerate_answer(question, context_chunks, groq_client=None):
     """
+    generate_answer for async request handlers: awaits the AsyncGroq call
+    instead of holding a worker thread for the whole completion.
+    """
+    groq_client = groq_client or get_async_client()
+    prompt = build_prompt(question, context_chunks)
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile", # Strong reasoning model
+        response = await groq_client.chat.completions.create(
+            model=ANSWER_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1
         )
 
+        record_usage(getattr(response, "usage", None))
         return response.choices[0].message.content
     except Exception as e:
-        return f"Error gathering answer: {e}"
+        metrics.upstream_error("groq_chat", e)
+        return f"{ERROR_PREFIX}: {e}"
+
+
+@metrics.timed("generate_answer")
+async def astream_answer(question, context_chunks, groq_client=None):
+    """
+    Async generator version of stream_answer.
+    """
+    groq_client = groq_client or get_async_client()
+    prompt = build_prompt(question, context_chunks)
+
+    try:
+        stream = await groq_client.chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            stream=True
+        )
+
+        async for chunk in stream:
+            record_usage(_stream_usage(chunk))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except Exception as e:
+        metrics.upstream_error("groq_chat", e)
+        yield f"{ERROR_PREFIX}: {e}"
@@ -0,0 +1,217 @@
+import os
+import time
+import uuid
+import bisect
+import inspect
+import logging
+import threading
+import functools
+import contextvars
+
+# METRICS_ENABLED=0 turns the whole layer off: timed() hands back the
+# undecorated function, incr() returns at once and no trace ids are made
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Seconds; spans a cached search (ms) up to a long video's transcription (min)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_METRIC = "stage_duration_seconds"
+
+HELP = {
+    STAGE_METRIC: "Time spent in each pipeline / request stage.",
+    "stage_errors_total": "Stage calls that raised.",
+    "cache_requests_total": "Cache lookups by cache and result (hit/miss).",
+    "upstream_errors_total": "Failed calls to external services.",
+    "upstream_retries_total": "Retried calls to external services, by status.",
+    "upstream_coalesced_total": "Calls answered by an identical request already in flight.",
+    "upstream_throttle_seconds": "Time calls waited for the per-model rate limiter.",
+    "answer_context_tokens_total": "Context tokens packed into answer prompts (context builder's count).",
+    "answer_prompt_tokens_total": "Prompt tokens of answer completions, as reported by the API.",
+}
+
+_lock = threading.Lock()
+_counters = {}      # (name, labels) -> value
+_histograms = {}    # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+
+# Current request / job; "-" outside of one
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def incr(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        # One slot per call; render() makes the counts cumulative
+        hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+
+
+def cache_result(cache, hit):
+    if not ENABLED:
+        return
+    incr("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def upstream_error(service, error=None):
+    if not ENABLED:
+        return
+    incr("upstream_errors_total", service=service, error=type(error).__name__ if error else "unknown")
+
+
+def _record(stage, start, failed):
+    observe(STAGE_METRIC, time.perf_counter() - start, stage=stage)
+    if failed:
+        incr("stage_errors_total", stage=stage)
+
+
+def timed(stage):
+    """
+    Decorator: records each call's duration in stage_duration_seconds{stage=...}
+    and counts calls that raise. Works on plain functions, coroutines and
+    (async) generators; a generator is timed until it is exhausted or closed.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter(), True
+                try:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                    failed = False
+                finally:
+                    _record(stage, start, failed)
+        elif inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter(), True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    _record(stage, start, failed)
+        elif inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter(), True
+                try:
+                    yield from fn(*args, **kwargs)
+                    failed = False
+                finally:
+                    _record(stage, start, failed)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter(), True
+                try:
+                    result = fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    _record(stage, start, failed)
+        return wrapper
+    return decorate
+
+
+def new_trace_id(incoming=None):
+    """
+    Sets the trace id for the current context (incoming, e.g. a client's
+    X-Request-ID, or a fresh one) and returns it.
+    """
+    if not ENABLED:
+        return None
+    value = (incoming or uuid.uuid4().hex[:16])[:64]
+    trace_id.set(value)
+    return value
+
+
+def traced(fn):
+    """
+    fn bound to a copy of the caller's context, for handing to a thread or
+    pool: the work it does is logged under the caller's trace id.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
+
+class TraceIdFilter(logging.Filter):
+    # Adds %(trace_id)s to every record so log lines can be grouped per request
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def install_log_trace_ids():
+    """
+    Prefixes root log output with the trace id of the request or job that
+    produced it.
+    """
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, TraceIdFilter) for f in handler.filters):
+            handler.addFilter(TraceIdFilter())
+            handler.setFormatter(logging.Formatter("%(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(hist) for key, hist in _histograms.items()}
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), hist in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), hist):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
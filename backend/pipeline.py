@@ -0,0 +1,90 @@
+import os
+from backend import metrics
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Stages of one video that may run at the same time (1 = strictly in order)
+STAGE_WORKERS = int(os.environ.get("PIPELINE_STAGE_WORKERS", "4"))
+
+
+class Stage:
+    """
+    One step of the ingest DAG: fn is called with the results of the stages
+    (or inputs) named in after, in that order, once they have all finished.
+    """
+
+    def __init__(self, name, fn, after=()):
+        self.name = name
+        self.fn = fn
+        self.after = list(after)
+
+
+def run_stages(stages, inputs=None, progress=None, max_workers=None, gates=None):
+    """
+    Runs stages on a thread pool, each as soon as everything it depends on
+    is done, so independent stages (e.g. the network-bound summary and the
+    CPU-bound embedding) overlap. progress(name, status) is called with
+    "running", then "done" or "failed". gates optionally maps stage names
+    to semaphores shared with other runs; a stage holds its slot while fn
+    runs.
+
+    Returns (results, errors), both keyed by stage name. A stage that
+    raised has its exception in errors; stages depending on it are not run
+    and get the same exception.
+    """
+    results = dict(inputs or {})
+    errors = {}
+    pending = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.after if dep not in pending and dep not in results]
+        if unknown:
+            raise ValueError(f"Stage {stage.name!r} depends on unknown stage(s) {unknown}")
+
+    def report(name, status):
+        if progress:
+            progress(name, status)
+
+    gates = gates or {}
+
+    def call(stage):
+        gate = gates.get(stage.name)
+        if gate:
+            gate.acquire()
+        try:
+            report(stage.name, "running")
+            return stage.fn(*(results[dep] for dep in stage.after))
+        finally:
+            if gate:
+                gate.release()
+
+    max_workers = max_workers or STAGE_WORKERS
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as pool:
+        while pending or running:
+            # Skip stages whose dependencies failed; start the ready ones
+            for name, stage in list(pending.items()):
+                failed = next((dep for dep in stage.after if dep in errors), None)
+                if failed:
+                    errors[name] = errors[failed]
+                    del pending[name]
+                elif all(dep in results for dep in stage.after):
+                    # With one worker, keep the declared order instead of queueing everything
+                    if max_workers == 1 and running:
+                        break
+                    running[pool.submit(metrics.traced(call), stage)] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Stages {list(pending)} can never run (dependency cycle)")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    report(name, "done")
+                except Exception as e:
+                    errors[name] = e
+                    report(name, "failed")
+    return results, errors
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+
+# Compact copy of each embedding that the vector index scans:
+#   "int8"    per-vector scaled int8 codes, ~1/4 of float32 (default)
+#   "none"    scan the float32 vectors themselves (the old path)
+# The float32 vectors stay in their segment file; only the top candidates
+# of a scan are read back from it and re-scored exactly.
+QUANTIZATION = os.environ.get("VECTOR_QUANTIZATION", "int8")
+# Candidates re-scored in float32 per search (at least k)
+RERANK_CANDIDATES = int(os.environ.get("VECTOR_RERANK_CANDIDATES", "64"))
+
+KINDS = ("int8",)
+
+if QUANTIZATION not in KINDS + ("none",):
+    raise ValueError(f"VECTOR_QUANTIZATION must be one of {KINDS + ('none',)}, got {QUANTIZATION!r}")
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def encode(vectors, kind):
+    """
+    Fixed-stride rows for a batch of normalized float32 vectors: uint8 rows
+    of a float32 scale followed by the int8 codes.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if kind == "int8":
+        # Symmetric per-vector scale: the largest component maps to +-127
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        rows = np.empty((len(vectors), 4 + vectors.shape[1]), dtype=np.uint8)
+        rows[:, :4] = scales.astype(np.float32).view(np.uint8).reshape(-1, 4)
+        rows[:, 4:] = np.rint(vectors / scales[:, None]).astype(np.int8).view(np.uint8)
+        return rows
+    raise ValueError(f"Unknown quantization {kind!r}")
+
+
+def decode(rows, kind):
+    """
+    (codes, scales) for rows written by encode(): int8 codes (a view, so a
+    memory-mapped file stays mapped) with float32 scales.
+    """
+    if kind == "int8":
+        scales = np.ascontiguousarray(rows[:, :4]).view(np.float32).ravel()
+        return rows[:, 4:].view(np.int8), scales
+    raise ValueError(f"Unknown quantization {kind!r}")
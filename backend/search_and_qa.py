@@ -1,57 +1,168 @@
-import sqlite3
 import numpy as np
 import os
+import logging
+import threading
+from collections import OrderedDict
 from backend.shared_model import get_model
+from backend.vector_index import get_index
+from backend.lexical_index import search_lexical, reciprocal_rank_fusion
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
 
-ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_PATH = os.path.join(ROOT_DIR, "embeddings", "video_embeddings.sqlite")
 TOP_K = 3
 
+# Dense cosine fused with BM25 by reciprocal-rank fusion; "0" for dense only
+HYBRID_SEARCH = os.environ.get("HYBRID_SEARCH", "1") != "0"
+# Candidates taken from each ranking before fusing down to TOP_K
+FUSION_CANDIDATES = int(os.environ.get("FUSION_CANDIDATES", "30"))
+RRF_K = 60
+
+# Query text -> embedding, so retries and repeated questions skip ONNX
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "1024"))
+
 
 def cosine_similarity(a, b):
     # Ensure standard numpy float 32
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 
-def search(query):
-    model = get_model()
-    
-    # FastEmbed returns a generator of length 1 for single query
-    print(f"Embedding query: {query}")
-    query_generator = model.embed([query])
-    query_vec = list(query_generator)[0].astype(np.float32)
-
-    # Ensure DB directory exists
-    if not os.path.exists(os.path.dirname(DB_PATH)):
-        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Safety: Ensure table exists (if new DB created by connect)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS embeddings (
-            id INTEGER PRIMARY KEY,
-            source TEXT,
-            chunk_id INTEGER,
-            text TEXT,
-            vector BLOB
-        )
-    """)
-
-    cur.execute("SELECT text, vector FROM embeddings")
-    rows = cur.fetchall()
-
-    scored = []
-    for text, blob in rows:
-        vec = np.frombuffer(blob, dtype=np.float32)
-        score = cosine_similarity(query_vec, vec)
-        scored.append((score, text))
-
-    conn.close()
-
-    scored.sort(reverse=True, key=lambda x: x[0])
-    return scored[:TOP_K]
+def normalize_query(query):
+    # bge's tokenizer lowercases and ignores runs of whitespace, so these
+    # variants embed to the same vector and can share a cache entry
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of normalized query text -> float32 embedding.
+    Cached vectors are read-only; callers that need to modify one copy it.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.cache_result("query", vec is not None)
+        return vec
+
+    def put(self, key, vec):
+        vec = np.asarray(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vec
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+query_cache = QueryEmbeddingCache()
+
+
+@metrics.timed("embed_query")
+def embed_queries(queries):
+    """
+    Embeddings for a list of queries, in order. Cache misses are embedded
+    together in one model call; duplicates in the list are embedded once.
+    """
+    keys = [normalize_query(q) for q in queries]
+    vectors = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        vec = query_cache.get(key)
+        if vec is None:
+            missing.append(key)
+        else:
+            vectors[key] = vec
+
+    if missing:
+        model = get_model()
+        logger.debug(f"Embedding {len(missing)} uncached queries")
+        for key, vec in zip(missing, model.embed(missing, batch_size=len(missing))):
+            vectors[key] = query_cache.put(key, vec)
+    return [vectors[key] for key in keys]
+
+
+def embed_query(query):
+    return embed_queries([query])[0]
+
+
+def search(query, video_ids=None, query_vec=None):
+    """
+    Returns the TOP_K (score, text) chunks for query.
+    video_ids (a video id or list of ids) restricts the search to those videos;
+    None searches the whole library. Pass query_vec if the query is already embedded.
+    """
+    return [(hit["score"], hit["text"]) for hit in search_hits(query, video_ids, query_vec)]
+
+
+@metrics.timed("search")
+def search_hits(query, video_ids=None, query_vec=None):
+    """
+    Same as search(), but returns hit dicts with video_id and start/end seconds
+    so answers can link back to the moment in the video.
+
+    With HYBRID_SEARCH the dense ranking is fused with BM25 over chunk text,
+    so exact names, numbers and jargon rank without raising TOP_K.
+    """
+    if isinstance(video_ids, str):
+        video_ids = [video_ids]
+
+    if query_vec is None:
+        query_vec = embed_query(query)
+
+    index = get_index()
+    if not HYBRID_SEARCH:
+        return index.search_hits(query_vec, TOP_K, sources=video_ids)
+
+    dense = index.search_hits(query_vec, FUSION_CANDIDATES, sources=video_ids)
+    lexical = search_lexical(query, FUSION_CANDIDATES, sources=video_ids, db_path=index.db_path)
+    if not lexical:
+        return dense[:TOP_K]
+
+    fused = reciprocal_rank_fusion(
+        [[hit["id"] for hit in dense], [row_id for row_id, _ in lexical]], k=RRF_K
+    )[:TOP_K]
+
+    # Exact-term matches outside the dense candidates still need their text and cosine score
+    by_id = {hit["id"]: hit for hit in dense}
+    missing = [row_id for row_id, _ in fused if row_id not in by_id]
+    for hit in index.hits_for_ids(missing, query_vec):
+        by_id[hit["id"]] = hit
+    return [by_id[row_id] for row_id, _ in fused if row_id in by_id]
+
+
+def search_many(queries, video_ids=None):
+    """
+    search() for several queries, with all uncached queries embedded in a
+    single model call. Returns one (score, text) list per query.
+    """
+    vectors = embed_queries(queries)
+    return [search(query, video_ids, query_vec=vec) for query, vec in zip(queries, vectors)]
 
 
 def main():
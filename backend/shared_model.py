@@ -1,10 +1,16 @@
 import os
 import sys
+import glob
+import time
+import threading
 
-# Limit threads to reduce memory usage on Render free tier
-os.environ["OMP_NUM_THREADS"] = "1"
-os.environ["MKL_NUM_THREADS"] = "1"
-os.environ["OPENBLAS_NUM_THREADS"] = "1"
+# ONNX intra-op threads for the embedding model. Defaults to 1 to keep memory
+# low on Render free tier; raise it on machines with spare cores.
+EMBED_THREADS = int(os.environ.get("EMBED_THREADS", "1"))
+
+# Thread pools of the native libraries, unless the environment already sets them
+for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(_var, str(EMBED_THREADS))
 
 # Safe import to avoiding crashing if fastembed isn't installed (though it should be)
 try:
@@ -12,21 +18,108 @@ try:
 except ImportError:
     TextEmbedding = None
 
+# tokenizers ships with fastembed; only used to measure chunk sizes
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+MODEL_MAX_TOKENS = 512  # bge-small truncates anything longer
+
+# host:port of a running `python -m backend.embed_worker`; when set, this
+# process sends texts there instead of loading its own copy of the model
+EMBED_WORKER_ADDRESS = os.environ.get("EMBED_WORKER_ADDRESS", "")
 
 # Global variable for lazy loading
 # fastembed model is ~200MB, loads once
 embedding_model = None
+_model_lock = threading.Lock()
+
+# Lifecycle of the model in this process, reported by /health
+model_status = {"state": "cold", "error": None, "load_seconds": None, "warmup_seconds": None}
+
+def load_model():
+    """
+    Builds the local FastEmbed model, ignoring EMBED_WORKER_ADDRESS.
+    """
+    if TextEmbedding is None:
+         raise ImportError("FastEmbed not installed")
+
+    # "BAAI/bge-small-en-v1.5" is default and efficiently small
+    print(f"Loading FastEmbed model (Singleton, {EMBED_THREADS} threads)...")
+    cache_dir = os.path.join(ROOT_DIR, "fastembed_cache")
+    model = TextEmbedding(model_name=MODEL_NAME, cache_dir=cache_dir, threads=EMBED_THREADS)
+    print("Model loaded.")
+    return model
 
 def get_model():
     global embedding_model
     if embedding_model is None:
-        if TextEmbedding is None:
-             raise ImportError("FastEmbed not installed")
-        
-        # "BAAI/bge-small-en-v1.5" is default and efficiently small
-        print("Loading FastEmbed model (Singleton)...")
-        cache_dir = os.path.join(ROOT_DIR, "fastembed_cache")
-        embedding_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5", cache_dir=cache_dir)
-        print("Model loaded.")
+        # Lock so concurrent first requests don't each build a session
+        with _model_lock:
+            if embedding_model is None:
+                start = time.perf_counter()
+                model_status["state"] = "loading"
+                try:
+                    if EMBED_WORKER_ADDRESS:
+                        from backend.embed_worker import RemoteEmbedding
+                        model = RemoteEmbedding(EMBED_WORKER_ADDRESS)
+                    else:
+                        model = load_model()
+                except Exception as e:
+                    model_status.update(state="failed", error=str(e))
+                    raise
+                model_status.update(state="loaded", load_seconds=round(time.perf_counter() - start, 3))
+                embedding_model = model
     return embedding_model
+
+def warm_up():
+    """
+    Loads the model and runs one embedding so the ONNX session has allocated
+    its buffers before the first real request. Safe to call from a thread.
+    """
+    try:
+        model = get_model()
+        start = time.perf_counter()
+        list(model.embed(["warm up"]))
+        model_status.update(state="ready", error=None,
+                            warmup_seconds=round(time.perf_counter() - start, 3))
+        print(f"Embedding model ready (load {model_status['load_seconds']}s, "
+              f"warm-up {model_status['warmup_seconds']}s)")
+    except Exception as e:
+        model_status.update(state="failed", error=str(e))
+        print(f"Embedding model warm-up failed: {e}")
+    return model_status["state"] == "ready"
+
+def model_ready():
+    return model_status["state"] in ("loaded", "ready")
+
+
+tokenizer = None
+
+def get_tokenizer():
+    """
+    The embedding model's own WordPiece tokenizer, read from fastembed_cache.
+    Returns None if it isn't available (callers fall back to word counts).
+    """
+    global tokenizer
+    if tokenizer is None and Tokenizer is not None:
+        pattern = os.path.join(ROOT_DIR, "fastembed_cache", "*bge-small-en-v1.5*", "**", "tokenizer.json")
+        paths = glob.glob(pattern, recursive=True)
+        if paths:
+            tokenizer = Tokenizer.from_file(paths[0])
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+    return tokenizer
+
+def count_tokens(texts):
+    """
+    Token counts (without [CLS]/[SEP]) for a list of texts.
+    """
+    tok = get_tokenizer()
+    if tok is None:
+        # Rough English average for WordPiece when the tokenizer is missing
+        return [int(len(text.split()) * 1.3) for text in texts]
+    return [len(enc.ids) for enc in tok.encode_batch(texts, add_special_tokens=False)]
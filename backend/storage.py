@@ -0,0 +1,233 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from backend import vector_segments
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBED_DIR = os.path.join(ROOT_DIR, "embeddings")
+DB_PATH = os.path.join(EMBED_DIR, "video_embeddings.sqlite")
+
+# Connections kept open per database file; callers beyond this wait for one
+POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+MMAP_MB = int(os.environ.get("SQLITE_MMAP_MB", "256"))
+CACHE_MB = int(os.environ.get("SQLITE_CACHE_MB", "16"))
+
+# FTS5 index over embeddings.text, queried by lexical_index
+FTS_TABLE = "chunks_fts"
+
+PRAGMAS = [
+    # Readers keep reading while an ingest writes, and vice versa
+    "PRAGMA journal_mode=WAL",
+    # Durable at checkpoints; a crash can only lose the last commits, never corrupt
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size={MMAP_MB * 1024 * 1024}",
+    f"PRAGMA cache_size=-{CACHE_MB * 1024}",    # negative = KiB
+    "PRAGMA temp_store=MEMORY",
+]
+
+
+def init_fts(cur):
+    """
+    Creates the BM25 index over embeddings.text: an external-content FTS5
+    table kept in sync by triggers, so every insert/delete on embeddings
+    (executemany included) updates the postings in the same transaction.
+    Existing databases are back-filled once. Returns False if this SQLite
+    build has no FTS5.
+    """
+    exists = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    try:
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                text, content='embeddings', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 unavailable, lexical search disabled: {e}")
+        return False
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS embeddings_fts_insert AFTER INSERT ON embeddings BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS embeddings_fts_delete AFTER DELETE ON embeddings BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS embeddings_fts_update AFTER UPDATE OF text ON embeddings BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    if not exists:
+        cur.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def init_version(cur):
+    """
+    A counter bumped (by triggers, in the writer's transaction) on every
+    change to embeddings rows or their vector locations, whichever process
+    makes it. Each process's vector index compares it to the value it
+    loaded at, so one worker's ingest reaches the others' searches.
+    """
+    cur.execute("CREATE TABLE IF NOT EXISTS embeddings_version (version INTEGER NOT NULL)")
+    cur.execute("INSERT INTO embeddings_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM embeddings_version)")
+    for name, event in (("insert", "INSERT"), ("delete", "DELETE"), ("move", "UPDATE OF segment, segment_row")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS embeddings_version_{name} AFTER {event} ON embeddings BEGIN
+                UPDATE embeddings_version SET version = version + 1;
+            END
+        """)
+
+
+def data_version(conn):
+    return conn.execute("SELECT version FROM embeddings_version").fetchone()[0]
+
+
+def migrate(conn, db_path):
+    """
+    Brings the schema up to date. Runs once per database file per process,
+    when its pool is created.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            id INTEGER PRIMARY KEY,
+            source TEXT,
+            chunk_id INTEGER,
+            text TEXT,
+            vector BLOB
+        )
+    """)
+    # source holds the YouTube video id; every per-video read/delete goes through it
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_source ON embeddings (source)")
+
+    # Chunk time span in seconds, for jump-to-timestamp answers (added later, so migrate)
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(embeddings)")}
+    for column in ("start_sec", "end_sec"):
+        if column not in columns:
+            cur.execute(f"ALTER TABLE embeddings ADD COLUMN {column} REAL")
+    # Vectors live in segment files shared by many videos (backend.vector_segments);
+    # a row points at its segment and its position in it. vector is only set
+    # on rows written before that, until they are moved below.
+    for column, kind in (("segment", "TEXT"), ("segment_row", "INTEGER")):
+        if column not in columns:
+            cur.execute(f"ALTER TABLE embeddings ADD COLUMN {column} {kind}")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_segment ON embeddings (segment)")
+    # One row per segment: its vector size and the rows reserved in it so far
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vector_segments (
+            name TEXT PRIMARY KEY,
+            dim INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            reserved_at REAL NOT NULL
+        )
+    """)
+
+    # BM25 postings over chunk text, maintained by triggers on embeddings
+    init_fts(cur)
+    init_version(cur)
+    conn.commit()
+
+    directory = segments_dir(db_path)
+    vector_segments.migrate_rows(conn, directory)
+    vector_segments.compact(conn, directory)
+    vector_segments.sweep(conn, directory)
+
+
+def segments_dir(db_path=None):
+    return vector_segments.segments_dir(db_path or DB_PATH)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections to one file, all opened with the
+    same pragmas. Reusing connections also reuses each connection's
+    prepared-statement cache, so hot queries are parsed once.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._open()
+        migrate(conn, db_path)
+        self._idle.put(conn)
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self._opened += 1
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                return self._open()
+        return self._idle.get()
+
+    def release(self, conn):
+        # Never hand the next caller someone else's half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+
+# One pool per database file, created lazily
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    db_path = db_path or DB_PATH
+    pool = pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = pools.get(db_path)
+            if pool is None:
+                pool = pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+def connection(db_path=None):
+    """
+    Context manager yielding a pooled connection to db_path (default DB_PATH).
+    Uncommitted work is rolled back when the block exits.
+    """
+    return get_pool(db_path).connection()
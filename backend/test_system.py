@@ -5,6 +5,18 @@ import sys
 BASE_URL = "http://127.0.0.1:8000"
 VIDEO_URL = "https://www.youtube.com/watch?v=jNQXAC9IVRw" # Me at the zoo (19s)
 
+def wait_for_job(job_id, timeout=300):
+    # /process_video returns a job id right away; poll until the job finishes
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{BASE_URL}/jobs/{job_id}", timeout=5).json()
+        if job["status"] == "done":
+            return job["result"]
+        if job["status"] == "failed":
+            return {"error": job["error"]}
+        time.sleep(2)
+    return {"error": f"Job {job_id} timed out after {timeout}s"}
+
 def test_pipeline():
     print(f"Testing connectivity to {BASE_URL}...")
     try:
@@ -18,9 +30,9 @@ def test_pipeline():
     print(f"\nSubmitting video for processing: {VIDEO_URL}")
     start_time = time.time()
     try:
-        response = requests.post(f"{BASE_URL}/process_video", json={"url": VIDEO_URL}, timeout=300)
-        if response.status_code == 200:
-            data = response.json()
+        response = requests.post(f"{BASE_URL}/process_video", json={"url": VIDEO_URL}, timeout=10)
+        if response.status_code == 202:
+            data = wait_for_job(response.json()["job_id"])
             elapsed = time.time() - start_time
             print(f"[OK] Processing complete in {elapsed:.2f}s")
             print(f"   Title: {data.get('title')}")
@@ -1,74 +1,242 @@
 import os
-from groq import Groq
+import re
+import shutil
+import tempfile
+import subprocess
+import logging
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from backend.audio_extract import find_ffmpeg
+from backend.groq_clients import get_client
+from backend import metrics
+
+logger = logging.getLogger(__name__)
 
 # Configure Groq
 # Ensure GROQ_API_KEY is in your environment variables
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+client = get_client()
+
+WHISPER_MODEL = "whisper-large-v3"
+
+# Long audio is cut into fixed windows that are transcribed in parallel.
+# Each window is padded by WINDOW_OVERLAP seconds on both sides so words on a
+# cut are heard whole by at least one request.
+WINDOW_SECONDS = int(os.environ.get("TRANSCRIBE_WINDOW_SECONDS", "600"))
+WINDOW_OVERLAP = int(os.environ.get("TRANSCRIBE_WINDOW_OVERLAP", "10"))
+MAX_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", "4"))
 
-OUTPUT_DIR = "transcripts"
+DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
 
-def transcribe_audio(audio_path, attempt_translation=False):
+
+def probe_duration(audio_path, ffmpeg_binary=None):
+    """
+    Returns the audio duration in seconds (from ffmpeg's header dump), or None.
+    """
+    ffmpeg_binary = ffmpeg_binary or find_ffmpeg()
+    if not ffmpeg_binary:
+        return None
+
+    result = subprocess.run(
+        [ffmpeg_binary, "-hide_banner", "-i", audio_path],
+        capture_output=True,
+        text=True,
+        check=False  # ffmpeg exits 1 when no output file is given
+    )
+    match = DURATION_PATTERN.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def plan_windows(duration, window_seconds, overlap):
+    """
+    Splits [0, duration] into windows. Returns (cut_start, cut_end, keep_start, keep_end)
+    per window: the audio sent is [cut_start, cut_end], segments whose midpoint
+    falls in [keep_start, keep_end) are kept.
+    """
+    windows = []
+    start = 0.0
+    while start < duration:
+        end = min(start + window_seconds, duration)
+        # Fold a short tail into the previous window instead of sending a tiny request
+        if duration - end < overlap:
+            end = duration
+        windows.append((
+            max(0.0, start - overlap),
+            min(duration, end + overlap),
+            start if windows else float("-inf"),
+            end if end < duration else float("inf"),
+        ))
+        start = end
+    return windows
+
+
+def _cut(ffmpeg_binary, audio_path, start, end, out_path):
+    # Stream copy: no re-encode, the piece starts on the nearest frame
+    subprocess.run(
+        [ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y",
+         "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+         "-i", audio_path, "-vn", "-c", "copy", out_path],
+        capture_output=True,
+        check=True
+    )
+
+
+def _request(client, audio_path, attempt_translation):
+    with open(audio_path, "rb") as file:
+        # Groq implementation usually matches OpenAI's
+        # Pass the file object directly instead of reading it into memory
+
+        if attempt_translation:
+             # Use translations endpoint (Audio -> English Text)
+            return client.audio.translations.create(
+                file=(os.path.basename(audio_path), file),
+                model=WHISPER_MODEL,
+                response_format="verbose_json",
+            )
+        # Standard transcription (Audio -> Same Language Text)
+        return client.audio.transcriptions.create(
+            file=(os.path.basename(audio_path), file),
+            model=WHISPER_MODEL,
+            response_format="verbose_json",
+        )
+
+
+def _raw_segments(transcript):
+    # Groq verbose_json return object has .segments list
+    return getattr(transcript, "segments", None) or []
+
+
+def _saved_window(checkpoint, i, cut_start, cut_end):
+    # A window transcribed by an earlier, interrupted run of the same ingest
+    saved = checkpoint.load(f"transcribe-window-{i:03d}") if checkpoint else None
+    if not saved or saved["window"] != [cut_start, cut_end]:
+        return None
+    return SimpleNamespace(text=saved["text"], segments=saved["segments"])
+
+
+def _transcribe_windows(client, audio_path, attempt_translation, duration,
+                        window_seconds, overlap, max_workers, ffmpeg_binary, checkpoint=None):
+    windows = plan_windows(duration, window_seconds, overlap)
+    logger.info(f"Splitting {duration:.0f}s of audio into {len(windows)} windows "
+          f"({window_seconds}s + {overlap}s overlap, {max_workers} workers)")
+
+    results = [_saved_window(checkpoint, i, w[0], w[1]) for i, w in enumerate(windows)]
+    todo = [i for i, result in enumerate(results) if result is None]
+    if len(todo) < len(windows):
+        logger.info(f"Resuming: {len(windows) - len(todo)} of {len(windows)} windows already transcribed")
+
+    def transcribe_window(i, path):
+        transcript = _request(client, path, attempt_translation)
+        if checkpoint:
+            # Each window is saved as soon as it's back, so a crash only loses the ones in flight
+            checkpoint.save(f"transcribe-window-{i:03d}", {
+                "window": list(windows[i][:2]),
+                "text": transcript.text,
+                "segments": [
+                    {"start": s.get("start", 0), "end": s.get("end", s.get("start", 0)), "text": s.get("text", "")}
+                    for s in _raw_segments(transcript)
+                ],
+            })
+        return transcript
+
+    tmp_dir = tempfile.mkdtemp(prefix="transcribe_")
+    try:
+        ext = os.path.splitext(audio_path)[1] or ".mp3"
+        pieces = []
+        for i in todo:
+            cut_start, cut_end, _, _ = windows[i]
+            piece_path = os.path.join(tmp_dir, f"part{i:03d}{ext}")
+            _cut(ffmpeg_binary, audio_path, cut_start, cut_end, piece_path)
+            pieces.append(piece_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i, transcript in zip(todo, pool.map(metrics.traced(transcribe_window), todo, pieces)):
+                results[i] = transcript
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Stitch: shift timestamps by the cut offset and keep each segment once,
+    # from the window whose keep range holds its midpoint
+    segments = []
+    for (cut_start, _, keep_start, keep_end), transcript in zip(windows, results):
+        for segment in _raw_segments(transcript):
+            start = cut_start + segment.get("start", 0)
+            end = cut_start + segment.get("end", segment.get("start", 0))
+            if keep_start <= (start + end) / 2 < keep_end:
+                segments.append({"start": start, "end": end, "text": segment.get("text", "")})
+
+    if segments:
+        full_text = " ".join(s["text"].strip() for s in segments)
+    else:
+        full_text = " ".join(t.text.strip() for t in results)
+    return full_text, segments
+
+
+@metrics.timed("transcribe_audio")
+def transcribe_audio(audio_path, attempt_translation=False, groq_client=None,
+                     window_seconds=None, max_workers=None, checkpoint=None):
     """
     Transcribes audio using Groq (Distil-Whisper).
     Returns structured data with timestamps.
+
+    Audio longer than window_seconds (default WINDOW_SECONDS, 0 disables) is
+    split with ffmpeg and the windows are transcribed concurrently.
+    groq_client defaults to the module Groq client; pass a fake for
+    tests/benchmarks. With a checkpoint (backend.checkpoints) each finished
+    window is saved, and windows saved by an interrupted run are reused.
     """
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
+    groq_client = groq_client or client
+    window_seconds = WINDOW_SECONDS if window_seconds is None else window_seconds
+    max_workers = max_workers or MAX_WORKERS
+
     action = "Translating" if attempt_translation else "Transcribing"
-    print(f"{action} via Groq API: {audio_path}")
-    
+    logger.info(f"{action} via Groq API: {audio_path}")
+
     try:
-        with open(audio_path, "rb") as file:
-            # Groq implementation usually matches OpenAI's
-            # Pass the file object directly instead of reading it into memory
-            
-            if attempt_translation:
-                 # Use translations endpoint (Audio -> English Text)
-                transcript = client.audio.translations.create(
-                    file=(os.path.basename(audio_path), file),
-                    model="whisper-large-v3",
-                    response_format="verbose_json",
-                )
-            else:
-                # Standard transcription (Audio -> Same Language Text)
-                transcript = client.audio.transcriptions.create(
-                    file=(os.path.basename(audio_path), file),
-                    model="whisper-large-v3",
-                    response_format="verbose_json",
-                )
-        
+        ffmpeg_binary = find_ffmpeg() if window_seconds else None
+        duration = probe_duration(audio_path, ffmpeg_binary) if ffmpeg_binary else None
+
+        if duration and duration > window_seconds + WINDOW_OVERLAP:
+            full_text, segments = _transcribe_windows(
+                groq_client, audio_path, attempt_translation, duration,
+                window_seconds, WINDOW_OVERLAP, max_workers, ffmpeg_binary, checkpoint
+            )
+        else:
+            transcript = _request(groq_client, audio_path, attempt_translation)
+            full_text = transcript.text
+            segments = _raw_segments(transcript)
+
         # Parse segments for UI
-        # Groq verbose_json return object has .segments list
         transcript_data = []
-        full_text = transcript.text
-        
-        segments = getattr(transcript, "segments", [])
-        
+
         for segment in segments:
             # Format: [00:12] Text...
             start_time = int(segment.get("start", 0))
             minutes = start_time // 60
             seconds = start_time % 60
             time_str = f"[{minutes:02d}:{seconds:02d}]"
-            
+
             text = segment.get("text", "").strip()
-            
+
             transcript_data.append({
                 "time": time_str,
-                "text": text
+                "text": text,
+                "start": segment.get("start", 0),
+                "end": segment.get("end", segment.get("start", 0)),
             })
 
-        print(f"Transcription complete. Length: {len(full_text)} chars")
-        
+        logger.info(f"Transcription complete. Length: {len(full_text)} chars")
+
         return {
             "full_text": full_text,
             "segments": transcript_data
         }
 
     except Exception as e:
-        print(f"Groq Transcription failed: {e}")
+        logger.error(f"Groq Transcription failed: {e}")
+        metrics.upstream_error("groq_whisper", e)
         raise e
 
 if __name__ == "__main__":
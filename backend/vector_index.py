@@ -0,0 +1,365 @@
+import os
+import threading
+from types import SimpleNamespace
+import numpy as np
+
+from backend import ann_index
+from backend import quantize
+from backend import storage
+from backend import vector_segments
+
+# With VECTOR_ENGINE=ivf, scopes smaller than this are still scanned exactly
+IVF_MIN_ROWS = int(os.environ.get("IVF_MIN_ROWS", "10000"))
+
+# Rows are scanned this many at a time: adjacent segments are packed into
+# blocks of this size (one matrix-vector product each, however small the
+# videos are), and quantized rows are widened to float32 a block at a time,
+# small enough that the widened block stays in cache
+SCAN_BLOCK_ROWS = int(os.environ.get("VECTOR_SCAN_BLOCK_ROWS", "256"))
+
+
+def _empty_state():
+    return SimpleNamespace(
+        segments=[],                            # per video: its rows and scan/exact map views
+        starts=np.zeros(0, dtype=np.int64),     # first row of each segment
+        blocks=[],                              # (start, stop, [segment views]) for full scans
+        scales=None,                            # int8 scale per row, None for float scans
+        ranges={},                              # source (video id) -> (start, stop) row slice
+        ids=np.zeros(0, dtype=np.int64),        # embeddings.id per row
+        id_order=np.zeros(0, dtype=np.int64),   # argsort(ids), maps ANN candidate ids back to rows
+        version=-1,                             # storage.data_version the rows were read at
+    )
+
+
+def _blocks(segments):
+    # Consecutive segments cut and packed into runs of at most SCAN_BLOCK_ROWS rows
+    blocks, views, start, filled = [], [], 0, 0
+    for seg in segments:
+        rows = seg.stop - seg.start
+        offset = 0
+        while offset < rows:
+            take = min(rows - offset, SCAN_BLOCK_ROWS - filled)
+            views.append(seg.codes[offset:offset + take])
+            offset += take
+            filled += take
+            if filled == SCAN_BLOCK_ROWS:
+                blocks.append((start, start + filled, views))
+                start, views, filled = start + filled, [], 0
+    if views:
+        blocks.append((start, start + filled, views))
+    return blocks
+
+
+class VectorIndex:
+    """
+    Searches the vector segment files (backend.vector_segments) through
+    read-only memory maps, one per file however many videos it holds, so
+    the OS page cache holds the vectors and every worker process shares the
+    same pages. Only row ids, the per-video row ranges and the int8 scales
+    are resident; chunk text and metadata are read from SQLite for the
+    returned hits.
+
+    Rows are L2-normalized when written, so scoring a query is a
+    matrix-vector product per block of adjacent segments followed by an
+    argpartition top-k.
+    With quantization "int8" (default: VECTOR_QUANTIZATION) the
+    scan reads the segments' compact copies and the best candidates are
+    re-scored against their float32 rows.
+
+    The row list is loaded lazily on the first search and reloaded when the
+    embeddings table has changed since (storage.data_version, bumped by any
+    process's writes, so one worker sees another's ingests) or after
+    invalidate().
+
+    With engine="ivf" the rows to score come from an IVFIndex (ann_index)
+    instead of every segment.
+    """
+
+    def __init__(self, db_path=None, engine=None, ann=None, quantization=None):
+        self.db_path = db_path      # None: storage.DB_PATH
+        self.engine = engine or ann_index.ENGINE
+        self.quantization = quantization or quantize.QUANTIZATION
+        self._ann = ann
+        self._lock = threading.Lock()
+        self._generation = 0        # bumped on every invalidate()
+        self._loaded_generation = -1
+        self._state = _empty_state()
+
+    @property
+    def ann(self):
+        if self._ann is None:
+            self._ann = ann_index.get_ann()
+        return self._ann
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._snapshot().ids)
+
+    def sources(self):
+        return list(self._snapshot().ranges)
+
+    def _load(self):
+        # Compaction may move rows and sweep() delete their old segment between
+        # our SELECT and opening its files; the next read of the table points
+        # at the new one
+        for _ in range(3):
+            try:
+                return self._load_segments()
+            except FileNotFoundError as e:
+                print(f"Vector segment replaced while loading, retrying: {e}")
+        return self._load_segments()
+
+    def _load_segments(self):
+        # Rows of one video are contiguous, so a per-video search is a slice.
+        # Ids are streamed straight into arrays; no per-row Python objects stay around.
+        with storage.connection(self.db_path) as conn:
+            conn.execute("BEGIN")       # both reads from one snapshot of the table
+            groups = conn.execute("""
+                SELECT source, segment, COUNT(*) FROM embeddings WHERE segment IS NOT NULL
+                GROUP BY source, segment ORDER BY source, segment
+            """).fetchall()
+            rows = np.fromiter(conn.execute("""
+                SELECT id, segment_row FROM embeddings WHERE segment IS NOT NULL
+                ORDER BY source, segment, id
+            """), dtype=[("id", np.int64), ("offset", np.int64)], count=sum(g[2] for g in groups))
+            dims = dict(conn.execute("SELECT name, dim FROM vector_segments"))
+            version = storage.data_version(conn)
+            conn.rollback()
+
+        state = _empty_state()
+        state.version = version
+        if not len(rows):
+            return state
+
+        directory = storage.segments_dir(self.db_path)
+        kind = self.quantization if self.quantization in quantize.KINDS else vector_segments.EXACT
+        state.ids = rows["id"].copy()
+        state.id_order = np.argsort(state.ids)
+
+        maps = {}                       # segment name -> (exact, scan), each file mapped once
+        start = 0
+        scale_parts = []
+        for source, name, count in groups:
+            stop = start + count
+            offsets = rows["offset"][start:stop]
+            if name not in maps:
+                exact = vector_segments.open_segment(directory, name, vector_segments.EXACT, dims[name])
+                scan = exact if kind == vector_segments.EXACT \
+                    else vector_segments.open_segment(directory, name, kind, dims[name])
+                # Plain ndarray views of the maps: np.memmap indexing is several times slower
+                maps[name] = np.asarray(exact), np.asarray(scan)
+            exact, scan = maps[name]
+            row = offsets[0]
+            if np.all(np.diff(offsets) == 1):
+                exact, scan = exact[row:row + count], scan[row:row + count]
+            else:
+                # Only part of the video is still in the table; keep those rows resident
+                exact, scan = exact[offsets], scan[offsets]
+            codes, scales = (scan, None) if kind == vector_segments.EXACT else quantize.decode(scan, kind)
+            state.segments.append(SimpleNamespace(start=start, stop=stop, exact=exact, codes=codes))
+            if scales is not None:
+                scale_parts.append(scales)
+            first, _ = state.ranges.get(source, (start, start))
+            state.ranges[source] = (first, stop)
+            start = stop
+        state.starts = np.array([seg.start for seg in state.segments], dtype=np.int64)
+        state.blocks = _blocks(state.segments)
+        if scale_parts:
+            state.scales = np.concatenate(scale_parts)
+
+        if self.engine == "ivf":
+            # Catch up on rows the ANN index hasn't seen (or train it), then
+            # persist; it reads the float32 rows it needs segment by segment
+            self.ann.sync(state.ids, lambda rows: self._exact(state, rows))
+            self.ann.save()
+        return state
+
+    def _snapshot(self):
+        with storage.connection(self.db_path) as conn:
+            version = storage.data_version(conn)
+        with self._lock:
+            if self._loaded_generation != self._generation or self._state.version < version:
+                generation = self._generation
+                self._state = self._load()
+                self._loaded_generation = generation
+            return self._state
+
+    def _rows_for_ids(self, state, ids):
+        # Row positions of embeddings ids; ids deleted since the last load are skipped
+        sorted_ids = state.ids[state.id_order]
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return state.id_order[pos[sorted_ids[pos] == ids]]
+
+    def _ann_rows(self, state, query, scope_rows):
+        """
+        Row positions in the IVF cells nearest the query, limited to scope_rows.
+        """
+        ids = self.ann.candidates(query)
+        if len(ids) == 0:
+            return ids
+        rows = self._rows_for_ids(state, ids)
+        if scope_rows is not None:
+            rows = rows[np.isin(rows, scope_rows)]
+        return rows
+
+    def _gather(self, state, rows, field):
+        # Rows of every segment's codes or exact map, in the order given.
+        # One argsort groups the rows by segment (row positions are ordered by
+        # segment), then each segment touched fills one contiguous slice.
+        order = np.argsort(rows, kind="stable")
+        ordered = rows[order]
+        which = np.searchsorted(state.starts, ordered, side="right") - 1
+        bounds = np.flatnonzero(np.diff(which)) + 1
+        first = getattr(state.segments[0], field)
+        gathered = np.empty((len(rows), first.shape[1]), dtype=first.dtype)
+        local = ordered - state.starts[which]
+        starts = [0] + bounds.tolist()
+        for start, stop, s in zip(starts, starts[1:] + [len(rows)], which[starts].tolist()):
+            gathered[start:stop] = getattr(state.segments[s], field)[local[start:stop]]
+        out = np.empty_like(gathered)
+        out[order] = gathered
+        return out
+
+    def _scores(self, state, query, rows=None):
+        # Scores of all rows, or of the given row positions, in that order;
+        # quantized codes are widened to float32 one cache-sized block at a time
+        if rows is None:
+            scores = np.empty(len(state.ids), dtype=np.float32)
+            buffer = None
+            for start, stop, views in state.blocks:
+                if len(views) == 1:
+                    block = views[0]
+                else:
+                    if buffer is None:
+                        buffer = np.empty((SCAN_BLOCK_ROWS, views[0].shape[1]), dtype=views[0].dtype)
+                    block = np.concatenate(views, out=buffer[:stop - start])
+                scores[start:stop] = block.astype(np.float32, copy=False) @ query
+            if state.scales is not None:
+                scores *= state.scales
+            return scores
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        # Gathered a bounded number of rows at a time, whatever the scope
+        step = SCAN_BLOCK_ROWS * 16
+        for start in range(0, len(rows), step):
+            codes = self._gather(state, rows[start:start + step], "codes")
+            for offset in range(0, len(codes), SCAN_BLOCK_ROWS):
+                block = codes[offset:offset + SCAN_BLOCK_ROWS]
+                scores[start + offset:start + offset + len(block)] = block.astype(np.float32, copy=False) @ query
+        if state.scales is not None:
+            scores *= state.scales[rows]
+        return scores
+
+    def _exact(self, state, rows):
+        # Normalized float32 rows for row positions, read from the segments
+        return self._gather(state, rows, "exact")
+
+    def search(self, query_vec, k, sources=None):
+        """
+        Returns up to k (score, text) pairs sorted by cosine similarity.
+        If sources (a list of video ids) is given, only those videos are scored.
+        """
+        return [(hit["score"], hit["text"]) for hit in self.search_hits(query_vec, k, sources)]
+
+    def search_hits(self, query_vec, k, sources=None):
+        """
+        Like search(), but each hit is a dict with score, text, video_id,
+        chunk_id, the chunk's start/end seconds (None for older rows) and the
+        embeddings row id.
+        """
+        state = self._snapshot()
+        if not len(state.ids) or k <= 0:
+            return []
+
+        if sources is None:
+            rows = None
+        else:
+            slices = [state.ranges[s] for s in dict.fromkeys(sources) if s in state.ranges]
+            if not slices:
+                return []
+            rows = np.concatenate([np.arange(start, stop) for start, stop in slices])
+
+        query = np.asarray(query_vec, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scope_size = len(state.ids) if rows is None else len(rows)
+        if self.engine == "ivf" and scope_size >= IVF_MIN_ROWS and self.ann.trained:
+            rows = self._ann_rows(state, query, rows)
+            if len(rows) == 0:
+                return []
+
+        scores = self._scores(state, query, rows)
+
+        # Quantized scan: keep extra candidates for the exact re-score
+        quantized = self.quantization in quantize.KINDS
+        wanted = min(max(k, quantize.RERANK_CANDIDATES) if quantized else k, len(scores))
+        if wanted < len(scores):
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(len(scores))
+        top_rows = rows[top] if rows is not None else top
+        top_scores = self._exact(state, top_rows) @ query if quantized else scores[top]
+
+        order = np.argsort(-top_scores)[:k]
+        return self._hits(state, top_rows[order], top_scores[order])
+
+    def _hits(self, state, rows, scores):
+        # Hit dicts with the chunk metadata read from the table; rows deleted
+        # since the last load are dropped
+        ids = [int(i) for i in state.ids[rows]]
+        if not ids:
+            return []
+        with storage.connection(self.db_path) as conn:
+            found = {row[0]: row[1:] for row in conn.execute(
+                "SELECT id, source, chunk_id, start_sec, end_sec, text FROM embeddings"
+                f" WHERE id IN ({','.join('?' * len(ids))})", ids
+            )}
+        hits = []
+        for row_id, score in zip(ids, scores):
+            if row_id not in found:
+                continue
+            source, chunk_id, start, end, text = found[row_id]
+            hits.append({
+                "score": float(score),
+                "text": text,
+                "video_id": source,
+                "chunk_id": chunk_id,
+                "start": start,
+                "end": end,
+                "id": row_id,
+            })
+        return hits
+
+    def hits_for_ids(self, ids, query_vec):
+        """
+        Hit dicts (scored against query_vec) for specific embeddings ids, in
+        the given order. Ids no longer in the index are skipped.
+        """
+        state = self._snapshot()
+        if not len(state.ids) or not len(ids):
+            return []
+        rows = self._rows_for_ids(state, np.asarray(ids, dtype=np.int64))
+        if not len(rows):
+            return []
+
+        query = np.asarray(query_vec, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        return self._hits(state, rows, self._exact(state, rows) @ query)
+
+
+# Global variable for lazy loading, one index per process
+vector_index = None
+
+
+def get_index():
+    global vector_index
+    if vector_index is None:
+        vector_index = VectorIndex()
+    return vector_index
@@ -0,0 +1,270 @@
+import os
+import time
+import uuid
+from contextlib import nullcontext
+import numpy as np
+
+from backend import quantize
+
+# Videos share segment files; a new segment is started once the open one
+# holds this many rows (~96 MB of float32 at 384 dims). The index keeps one
+# map, and so one file descriptor, per segment file, not per video.
+SEGMENT_ROWS = int(os.environ.get("VECTOR_SEGMENT_ROWS", "65536"))
+# Closed segments whose live rows fall below this share are rewritten by compact()
+COMPACT_BELOW = float(os.environ.get("VECTOR_SEGMENT_COMPACT_BELOW", "0.5"))
+# Segments reserved in more recently than this may have a write in flight
+# (possibly in another worker), so sweep() and compact() leave them
+SWEEP_MIN_AGE = float(os.environ.get("VECTOR_SEGMENT_SWEEP_AGE", "3600"))
+
+EXACT = "f32"
+
+
+def segments_dir(db_path):
+    # embeddings/video_embeddings.sqlite -> embeddings/video_embeddings.segments/
+    return os.path.splitext(db_path)[0] + ".segments"
+
+
+def path_for(directory, name, kind):
+    return os.path.join(directory, f"{name}.{kind}")
+
+
+def _layout(kind, dim):
+    # dtype and row width of one of a segment's files
+    if kind == EXACT:
+        return np.dtype(np.float32), dim
+    sample = quantize.encode(np.zeros((1, dim), dtype=np.float32), kind)
+    return sample.dtype, sample.shape[1]
+
+
+def reserve(conn, rows, dim):
+    """
+    Claims rows consecutive rows in the open segment for dim (a new segment
+    once it is full) and returns (segment name, first row). The claim is
+    committed at once, so writers in other processes never overlap; rows
+    claimed but never committed to embeddings are dead space until compact().
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # Only the newest segment of a dimension takes rows; older ones are closed
+        found = cur.execute(
+            "SELECT name, rows FROM vector_segments WHERE dim = ? ORDER BY rowid DESC LIMIT 1", (dim,)
+        ).fetchone()
+        if found and (found[1] + rows <= SEGMENT_ROWS or found[1] == 0):
+            name, offset = found
+            cur.execute("UPDATE vector_segments SET rows = rows + ?, reserved_at = ? WHERE name = ?",
+                        (rows, time.time(), name))
+        else:
+            name, offset = uuid.uuid4().hex[:16], 0
+            cur.execute("INSERT INTO vector_segments (name, dim, rows, reserved_at) VALUES (?, ?, ?, ?)",
+                        (name, dim, rows, time.time()))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return name, offset
+
+
+class SegmentWriter:
+    """
+    Writes one video's vectors into a row range of a shared segment: a
+    float32 file of L2-normalized rows (exact scores, load_source) and an
+    int8 file of the rows the index scans (see backend.quantize; written in
+    every mode, so VECTOR_QUANTIZATION can change without a rewrite).
+    The range is reserved (via connect(), a context manager yielding a
+    connection to the database) on the first batch; batches are then
+    written into it in order.
+    """
+
+    def __init__(self, directory, rows, connect):
+        self.directory = directory
+        self.rows = rows
+        self.connect = connect
+        self.name = None
+        self.offset = 0
+        self.written = 0
+        self._files = {}
+
+    def _open(self, dim):
+        with self.connect() as conn:
+            self.name, self.offset = reserve(conn, self.rows, dim)
+        os.makedirs(self.directory, exist_ok=True)
+        for kind in (EXACT,) + quantize.KINDS:
+            fd = os.open(path_for(self.directory, self.name, kind),
+                         os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+            self._files[kind] = os.fdopen(fd, "r+b")
+
+    def write(self, vectors):
+        """
+        Writes a batch and returns the segment row of its first vector.
+        """
+        vectors = quantize.normalize(vectors)
+        if self.name is None:
+            self._open(vectors.shape[1])
+        start, stop = self.written, self.written + len(vectors)
+        if stop > self.rows:
+            raise ValueError(f"Range in segment {self.name} reserved for {self.rows} rows, got {stop}")
+        for kind, f in self._files.items():
+            data = vectors if kind == EXACT else quantize.encode(vectors, kind)
+            f.seek((self.offset + start) * data.shape[1] * data.itemsize)
+            f.write(data.tobytes())
+        self.written = stop
+        return self.offset + start
+
+    def finish(self):
+        # On disk before the rows pointing at them are committed
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self._files.clear()
+        return self.name
+
+    def discard(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def write_segment(directory, vectors, connect):
+    """
+    Writes vectors in one go; returns (segment name, first row), or
+    (None, 0) for no vectors.
+    """
+    writer = SegmentWriter(directory, len(vectors), connect)
+    if len(vectors):
+        writer.write(vectors)
+    return writer.finish(), writer.offset
+
+
+def open_segment(directory, name, kind, dim):
+    """
+    Read-only memory map, (rows, width), of one of a segment's files over
+    the rows written so far. Each map holds a file descriptor of its own.
+    """
+    dtype, width = _layout(kind, dim)
+    path = path_for(directory, name, kind)
+    rows = os.path.getsize(path) // (width * dtype.itemsize)
+    if rows == 0:
+        return np.zeros((0, width), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows, width))
+
+
+def remove(directory, names):
+    """
+    Deletes segments' files. Indexes that still map them keep reading the
+    old pages until they reload (POSIX unlink semantics); where the OS
+    refuses, sweep() retries later.
+    """
+    for name in names:
+        for kind in (EXACT,) + quantize.KINDS:
+            _remove_file(path_for(directory, name, kind))
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove segment file {path}: {e}")
+
+
+def sweep(conn, directory, min_age=None):
+    """
+    Deletes segments no embeddings row points to any more (every video in
+    them re-ingested, deleted or compacted away), plus stray files of
+    segments the table doesn't know. Returns the number of segments deleted.
+    """
+    cutoff = time.time() - (SWEEP_MIN_AGE if min_age is None else min_age)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        stale = [row[0] for row in cur.execute("""
+            SELECT name FROM vector_segments s WHERE reserved_at < ?
+            AND NOT EXISTS (SELECT 1 FROM embeddings e WHERE e.segment = s.name)
+        """, (cutoff,))]
+        cur.executemany("DELETE FROM vector_segments WHERE name = ?", ((name,) for name in stale))
+        known = {row[0] for row in cur.execute("SELECT name FROM vector_segments")}
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    remove(directory, stale)
+
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if filename.split(".")[0] not in known and os.path.getmtime(path) < cutoff:
+                _remove_file(path)
+    return len(stale)
+
+
+def compact(conn, directory, min_age=None):
+    """
+    Rewrites closed segments (not the newest of their dimension) in which
+    re-ingested and deleted videos left less than COMPACT_BELOW of the rows
+    live: the live rows are copied, in order, into the open segment and the
+    table repointed; sweep() then deletes the old files. Returns the number
+    of rows moved.
+    """
+    cutoff = time.time() - (SWEEP_MIN_AGE if min_age is None else min_age)
+    candidates = conn.execute("""
+        SELECT s.name, s.dim FROM vector_segments s
+        WHERE s.reserved_at < ?
+        AND s.rowid < (SELECT MAX(rowid) FROM vector_segments n WHERE n.dim = s.dim)
+        AND (SELECT COUNT(*) FROM embeddings e WHERE e.segment = s.name) < ? * s.rows
+    """, (cutoff, COMPACT_BELOW)).fetchall()
+    moved = 0
+    for name, dim in candidates:
+        rows = conn.execute(
+            "SELECT id, segment_row FROM embeddings WHERE segment = ? ORDER BY segment_row", (name,)
+        ).fetchall()
+        if not rows:
+            continue
+        exact = open_segment(directory, name, EXACT, dim)
+        writer = SegmentWriter(directory, len(rows), lambda: nullcontext(conn))
+        for start in range(0, len(rows), 4096):
+            writer.write(exact[[row[1] for row in rows[start:start + 4096]]])
+        new_name = writer.finish()
+        del exact
+        # Rows deleted meanwhile (a concurrent re-ingest) no longer match and stay deleted
+        conn.executemany(
+            "UPDATE embeddings SET segment = ?, segment_row = ? WHERE id = ? AND segment = ?",
+            ((new_name, writer.offset + i, row[0], name) for i, row in enumerate(rows))
+        )
+        conn.commit()
+        moved += len(rows)
+    if moved:
+        print(f"Compacted {moved} live vectors out of {len(candidates)} segment(s) in {directory}")
+    return moved
+
+
+def migrate_rows(conn, directory):
+    """
+    Moves vectors still stored in the embeddings table (databases written
+    before segment files) into the segments, one range per video, then
+    drops them from the table. Returns the number of rows moved.
+    """
+    sources = [row[0] for row in conn.execute(
+        "SELECT DISTINCT source FROM embeddings WHERE segment IS NULL AND vector IS NOT NULL"
+    )]
+    moved = 0
+    for source in sources:
+        rows = conn.execute(
+            "SELECT id, vector FROM embeddings WHERE source IS ? AND segment IS NULL AND vector IS NOT NULL ORDER BY id",
+            (source,)
+        ).fetchall()
+        vectors = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows], dtype=np.float32)
+        name, offset = write_segment(directory, vectors, lambda: nullcontext(conn))
+        conn.executemany(
+            "UPDATE embeddings SET segment = ?, segment_row = ?, vector = NULL WHERE id = ?",
+            ((name, offset + i, row[0]) for i, row in enumerate(rows))
+        )
+        conn.commit()
+        moved += len(rows)
+    if moved:
+        # Give the freed blob pages back to the file system
+        conn.execute("VACUUM")
+        print(f"Moved {moved} vectors of {len(sources)} video(s) into segment files in {directory}")
+    return moved
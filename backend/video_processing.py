@@ -1,137 +1,458 @@
 import os
 import json
-from groq import Groq
-from backend.audio_extract import extract_audio
-from backend.transcribe import transcribe_audio
-from backend.chunks_text import chunk_text
-from backend.embed_chunks import embed_chunks, reset_db
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from backend.audio_extract import extract_audio, get_video_id
+from backend.transcribe import transcribe_audio, WHISPER_MODEL
+from backend.chunks_text import chunk_text, chunk_segments, CHUNK_SIZE, OVERLAP, CHUNK_TOKENS, OVERLAP_SEGMENTS
+from backend.embed_chunks import embed_chunks, load_source, store_embeddings, count_source
+from backend.shared_model import MODEL_NAME
+from backend import ingest_cache
+from backend import checkpoints
+from backend.groq_clients import get_client
+from backend import metrics
+from backend.pipeline import Stage, run_stages
 
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+logger = logging.getLogger(__name__)
 
-def generate_structured_summary(text, language_mode="original"):
-    """
-    Generates a Topic/Subtopic structure from the transcript using Groq Llama 3.
-    """
-    
-    lang_instruction = ""
-    if language_mode == "english":
-        lang_instruction = "IMPORTANT: The output MUST be in English, even if the transcript is in another language."
+client = get_client()
 
-    prompt = f"""
-    Analyze the following video transcript and structure it into a clear, nested hierarchy of Topics and Subtopics.
-    For each subtopic, provide a brief 1-sentence summary.
-    {lang_instruction}
-    
+SUMMARY_MODEL = "llama-3.3-70b-versatile"
+
+# Transcripts longer than one window are summarized window by window
+# (SUMMARY_WORKERS at a time) and the partial topic trees merged
+SUMMARY_WINDOW_CHARS = int(os.environ.get("SUMMARY_WINDOW_CHARS", "20000"))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "4"))
+
+SUMMARY_ERROR = {"title": "Error", "summary": "Could not generate summary.", "topics": []}
+
+# Pipeline stages, in order, as reported to the progress callback
+STAGES = ["download", "transcribe", "summarize", "embed"]
+
+
+def ingest_cache_key(video_id, language_mode):
+    return ingest_cache.cache_key(video_id, language_mode, {
+        "whisper_model": WHISPER_MODEL,
+        "summary_model": SUMMARY_MODEL,
+        "summary_window_chars": SUMMARY_WINDOW_CHARS,
+        "embedding_model": MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": OVERLAP,
+        "chunk_tokens": CHUNK_TOKENS,
+        "chunk_overlap_segments": OVERLAP_SEGMENTS,
+    })
+
+
+SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes video content into structured JSON. You output ONLY JSON."
+
+SUMMARY_FORMAT = """
     Output JSON format:
-    {{
+    {
         "title": "Video Title",
         "summary": "Main video summary",
         "topics": [
-            {{
+            {
                 "title": "Topic Name",
                 "subtopics": [
-                    {{ "name": "Subtopic Name", "summary": "Brief explanation" }}
+                    { "name": "Subtopic Name", "summary": "Brief explanation" }
                 ]
-            }}
+            }
         ]
-    }}
+    }
+"""
+
+
+def _language_instruction(language_mode):
+    if language_mode == "english":
+        return "IMPORTANT: The output MUST be in English, even if the transcript is in another language."
+    return ""
+
+
+def _summary_request(prompt, groq_client):
+    response = groq_client.chat.completions.create(
+        model=SUMMARY_MODEL, # Powerful model for summarization
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.3
+    )
+    return json.loads(response.choices[0].message.content)
+
 
+def summary_windows(text, segments=None, max_chars=SUMMARY_WINDOW_CHARS):
+    """
+    Splits the transcript into consecutive windows of at most max_chars:
+    on segment boundaries when there are timestamped segments, on
+    whitespace otherwise. Returns [{"text", "start", "end"}] (start/end
+    are None without segments).
+    """
+    windows = []
+    if segments:
+        pieces, size, first = [], 0, None
+        for segment in segments:
+            piece = segment.get("text", "").strip()
+            if pieces and size + len(piece) + 1 > max_chars:
+                windows.append({"text": " ".join(pieces), "start": first["start"], "end": last["end"]})
+                pieces, size = [], 0
+            if not pieces:
+                first = segment
+            pieces.append(piece)
+            size += len(piece) + 1
+            last = segment
+        if pieces:
+            windows.append({"text": " ".join(pieces), "start": first["start"], "end": last["end"]})
+        return windows
+
+    rest = text.strip()
+    while rest:
+        cut = len(rest)
+        if cut > max_chars:
+            cut = rest.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+        windows.append({"text": rest[:cut].strip(), "start": None, "end": None})
+        rest = rest[cut:].strip()
+    return windows
+
+
+def _window_prompt(window, index, count, language_mode):
+    if count == 1:
+        scope = "Analyze the following video transcript"
+    else:
+        position = f"part {index + 1} of {count}"
+        if window["start"] is not None:
+            position += f", {int(window['start']) // 60}:{int(window['start']) % 60:02d}-{int(window['end']) // 60}:{int(window['end']) % 60:02d}"
+        scope = f"Analyze the following excerpt ({position}) of a longer video transcript"
+
+    return f"""
+    {scope} and structure it into a clear, nested hierarchy of Topics and Subtopics.
+    For each subtopic, provide a brief 1-sentence summary.
+    {_language_instruction(language_mode)}
+    {SUMMARY_FORMAT}
     Transcript:
-    {text[:20000]}  # Groq has good context, but limit to be safe
+    {window["text"]}
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile", # Powerful model for summarization
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes video content into structured JSON. You output ONLY JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Summarization error: {e}")
-        return {"title": "Error", "summary": "Could not generate summary.", "topics": []}
-
-
-def process_youtube_video(url, language_mode="original"):
-    print(f"--- Starting processing for {url} [Mode: {language_mode}] ---")
-
-    # 1. Extract Audio
-    print("1. Downloading audio...")
-    try:
-        audio_path = extract_audio(url)
-        print(f"   Audio saved to: {audio_path}")
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        error_msg = str(e)
-        
-        # Sanitize error message for UI
-        if "Sign in" in error_msg:
-            ui_msg = "This video is age-restricted or requires sign-in."
-        elif "Video unavailable" in error_msg:
-            ui_msg = "This video is unavailable (private or deleted)."
-        elif "Requested format" in error_msg or "ffmpeg" in error_msg.lower():
-             ui_msg = "Server Configuration Error: Audio processor (FFmpeg) not found. Please check deployment logs."
-        elif "empty" in error_msg.lower():
-             ui_msg = "Download failed (Empty file). Try a different video."
-        else:
-            ui_msg = f"Audio download failed. (Technicals: {error_msg[:50]}...)"
 
-        print(f"   Audio download failed: {error_msg}")
-        return {"error": ui_msg}
+def _merge_prompt(partials, language_mode):
+    return f"""
+    Below are topic trees, in video order, each summarizing one consecutive part of the same video.
+    Merge them into a single nested hierarchy of Topics and Subtopics for the whole video:
+    combine topics that continue across parts, keep the video's order, keep each subtopic summary to 1 sentence,
+    and write one title and one overall summary for the whole video.
+    {_language_instruction(language_mode)}
+    {SUMMARY_FORMAT}
+    Topic trees:
+    {json.dumps(partials, ensure_ascii=False)}
+    """
+
+
+def merge_topic_trees(partials):
+    """
+    Mechanical merge, used when the LLM merge fails: topics concatenated in
+    order, title from the first part, summaries joined.
+    """
+    return {
+        "title": partials[0].get("title", "Video"),
+        "summary": " ".join(p.get("summary", "") for p in partials if p.get("summary")),
+        "topics": [topic for p in partials for topic in p.get("topics", [])],
+    }
+
+
+def _merge_groups(partials, max_chars):
+    # Consecutive runs of partial trees whose JSON fits one merge request
+    groups, size = [[]], 0
+    for partial in partials:
+        length = len(json.dumps(partial, ensure_ascii=False))
+        if groups[-1] and size + length > max_chars:
+            groups.append([])
+            size = 0
+        groups[-1].append(partial)
+        size += length
+    if len(groups) == len(partials) and len(partials) > 1:
+        # Every tree is over budget by itself: merge pairwise so each round still halves
+        groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+    return groups
+
+
+@metrics.timed("generate_structured_summary")
+def generate_structured_summary(text, language_mode="original", segments=None,
+                                groq_client=None, max_workers=None, window_chars=None):
+    """
+    Generates a Topic/Subtopic structure from the transcript using Groq Llama 3.
+
+    Transcripts longer than window_chars (default SUMMARY_WINDOW_CHARS) are
+    map-reduced: each window (built from segments when given) is summarized
+    concurrently on max_workers threads, then the partial trees are merged
+    by the LLM (in rounds, if they don't fit one request) into the same
+    {"title", "summary", "topics"} shape.
+    """
+    groq_client = groq_client or client
+    max_workers = max_workers or SUMMARY_WORKERS
+    window_chars = window_chars or SUMMARY_WINDOW_CHARS
+
+    windows = summary_windows(text, segments, window_chars)
+    if not windows:
+        return dict(SUMMARY_ERROR)
+
+    def summarize(i):
+        try:
+            return _summary_request(_window_prompt(windows[i], i, len(windows), language_mode), groq_client)
+        except Exception as e:
+            logger.warning(f"Summarization error (window {i + 1}/{len(windows)}): {e}")
+            metrics.upstream_error("groq_chat", e)
+            return None
+
+    def merge(group):
+        if len(group) == 1:
+            return group[0]
+        try:
+            return _summary_request(_merge_prompt(group, language_mode), groq_client)
+        except Exception as e:
+            logger.warning(f"Summary merge error ({len(group)} parts), merging mechanically: {e}")
+            metrics.upstream_error("groq_chat", e)
+            return merge_topic_trees(group)
+
+    if len(windows) == 1:
+        return summarize(0) or dict(SUMMARY_ERROR)
+
+    logger.info(f"   Summarizing {len(text)} chars in {len(windows)} windows ({max_workers} workers)")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partials = [p for p in pool.map(metrics.traced(summarize), range(len(windows))) if p]
+        if not partials:
+            return dict(SUMMARY_ERROR)
+
+        while len(partials) > 1:
+            groups = _merge_groups(partials, window_chars)
+            if len(groups) == 1:
+                return merge(groups[0])
+            partials = list(pool.map(metrics.traced(merge), groups))
+    return partials[0]
+
+
+def process_youtube_video(url, language_mode="original", progress=None, gates=None):
+    """
+    Runs download -> transcribe -> (summarize || embed) for one video; the
+    summary and the chunk+embed stage run concurrently (see backend.pipeline).
+    progress, if given, is called as progress(stage, status, **info) with
+    status "running", "done", "failed", "cached" or "resumed"; finished
+    stages carry seconds=..., and download also its byte counts.
+    gates optionally maps stage names to semaphores that cap how many
+    videos run that stage at once (batch ingest); a stage reports
+    "running" only once it holds its slot.
+
+    Each stage's output is checkpointed (backend.checkpoints) as it
+    finishes, so after a crash or failure the next run of the same video
+    and mode starts at the first stage that didn't finish.
+    """
+    gates = gates or {}
+    timings = {}
+
+    def report(stage, status, **info):
+        if status == "running":
+            timings[stage] = time.perf_counter()
+        elif stage in timings:
+            info["seconds"] = round(time.perf_counter() - timings.pop(stage), 3)
+            logger.info(f"   [{stage}] {status} in {info['seconds']:.2f}s")
+        if progress:
+            progress(stage, status, **info)
+
+    def enter(stage):
+        if stage in gates:
+            gates[stage].acquire()
+        report(stage, "running")
+
+    def leave(stage, status, **info):
+        report(stage, status, **info)
+        if stage in gates:
+            gates[stage].release()
+
+    logger.info(f"--- Starting processing for {url} [Mode: {language_mode}] ---")
+
+    # 0. Ingest cache: same video + mode + models -> skip the whole pipeline
+    video_id = get_video_id(url)
+    checkpoint = None
+    if video_id:
+        cache_key = ingest_cache_key(video_id, language_mode)
+        cached = ingest_cache.get(cache_key)
+        metrics.cache_result("ingest", cached is not None)
+        if cached:
+            logger.info(f"0. Ingest cache hit for {video_id}, skipping download/transcribe/summarize/embed.")
+            # Usually the rows are still there; rewriting them would reload the
+            # vector index and drop the video's cached answers on every hit
+            if count_source(video_id) != len(cached["chunks"]):
+                store_embeddings(cached["chunks"], cached["vectors"], source_name=video_id)
+            for stage in STAGES:
+                report(stage, "cached")
+            structure = cached["structure"]
+            structure["transcript"] = cached["segments"]
+            structure["video_id"] = video_id
+            return structure
+        checkpoint = checkpoints.for_video(video_id, cache_key)
+
+    def saved(stage):
+        return checkpoint.load(stage) if checkpoint else None
+
+    # 1. Extract Audio (not needed once the transcript is saved)
+    audio_path = None
+    transcript_data = saved("transcribe")
+    download = saved("download")
+    if transcript_data is not None:
+        logger.info(f"1-2. Resuming {video_id} from its saved transcript.")
+        report("download", "resumed")
+    elif download and os.path.exists(download["audio_path"]):
+        audio_path = download["audio_path"]
+        logger.info(f"1. Resuming with the downloaded audio: {audio_path}")
+        report("download", "resumed")
+    else:
+        logger.info("1. Downloading audio...")
+        enter("download")
+        download_stats = {}
+        try:
+            audio_path = os.path.abspath(extract_audio(url, stats=download_stats))
+            logger.info(f"   Audio saved to: {audio_path} ({download_stats})")
+            # yt-dlp names the file %(id)s.mp3, which covers URLs we can't parse
+            if not video_id:
+                video_id = os.path.splitext(os.path.basename(audio_path))[0]
+                checkpoint = checkpoints.for_video(video_id, ingest_cache_key(video_id, language_mode))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            error_msg = str(e)
+
+            # Sanitize error message for UI
+            if "Sign in" in error_msg:
+                ui_msg = "This video is age-restricted or requires sign-in."
+            elif "Video unavailable" in error_msg:
+                ui_msg = "This video is unavailable (private or deleted)."
+            elif "Requested format" in error_msg or "ffmpeg" in error_msg.lower():
+                 ui_msg = "Server Configuration Error: Audio processor (FFmpeg) not found. Please check deployment logs."
+            elif "empty" in error_msg.lower():
+                 ui_msg = "Download failed (Empty file). Try a different video."
+            else:
+                ui_msg = f"Audio download failed. (Technicals: {error_msg[:50]}...)"
+
+            logger.error(f"   Audio download failed: {error_msg}")
+            metrics.upstream_error("yt_dlp", e)
+            leave("download", "failed")
+            return {"error": ui_msg}
+        download_stats.pop("seconds", None)
+        if checkpoint:
+            checkpoint.save("download", {"audio_path": audio_path, **download_stats})
+        leave("download", "done", **download_stats)
 
     # 2. Transcribe
-    print("2. Transcribing...")
-    try:
-        # Get absolute path for transcribe
-        abs_audio_path = os.path.abspath(audio_path)
-        
-        # Determine if we need to translate to English
-        attempt_translation = (language_mode == "english")
-        
-        transcript_data = transcribe_audio(abs_audio_path, attempt_translation=attempt_translation)
-        
-        # Unpack
-        transcript_text = transcript_data["full_text"]
-        transcript_segments = transcript_data["segments"]
-        
-        print(f"   Transcription complete. Length: {len(transcript_text)} chars")
-    except Exception as e:
-        print(f"   Transcription failed: {e}")
-        return {"error": str(e)}
-
-    # 3. Summarize (Topic/Subtopic)
-    print("3. Generating structured summary (Calling Groq Llama 3)...")
-    structure = generate_structured_summary(transcript_text, language_mode=language_mode)
-    print("   Summary generated.")
-
-    # 4. Chunk & Embed for Q&A
-    print("4. Chunking and Embedding...")
-    reset_db()  # Clear previous video context
-    chunks = chunk_text(transcript_text, chunk_size=500, overlap=100)
-    
-    # Prepare chunks with IDs
-    chunks_data = [
-        {"chunk_id": i, "text": chunk}
-        for i, chunk in enumerate(chunks)
-    ]
-    
-    # Use video title from summary as source name, or filename
-    video_title = structure.get("title", os.path.basename(audio_path))
-    embed_chunks(chunks_data, source_name=video_title)
+    if transcript_data is not None:
+        report("transcribe", "resumed")
+    else:
+        logger.info("2. Transcribing...")
+        enter("transcribe")
+        try:
+            # Determine if we need to translate to English
+            attempt_translation = (language_mode == "english")
+
+            # Long audio is saved window by window, so a retry only redoes the missing windows
+            transcript_data = transcribe_audio(audio_path, attempt_translation=attempt_translation,
+                                               checkpoint=checkpoint)
+            if checkpoint:
+                checkpoint.save("transcribe", transcript_data)
+
+            logger.info(f"   Transcription complete. Length: {len(transcript_data['full_text'])} chars")
+        except Exception as e:
+            logger.error(f"   Transcription failed: {e}")
+            leave("transcribe", "failed")
+            return {"error": str(e)}
+        leave("transcribe", "done")
+
+    # Unpack
+    transcript_text = transcript_data["full_text"]
+    transcript_segments = transcript_data["segments"]
+
+    # 3 + 4. Both need only the transcript, so they run side by side: the
+    # summary waits on Groq while chunking/embedding keeps the CPU busy
+    def summarize(transcript):
+        logger.info("3. Generating structured summary (Calling Groq Llama 3)...")
+        structure = generate_structured_summary(transcript["full_text"], language_mode=language_mode,
+                                                segments=transcript["segments"])
+        if structure.get("title") == "Error":
+            raise Exception(structure["summary"])
+        if checkpoint:
+            checkpoint.save("summarize", structure)
+        logger.info("   Summary generated.")
+        return structure
+
+    def chunk_and_embed(transcript):
+        logger.info("4. Chunking and Embedding...")
+        if transcript["segments"]:
+            # Token-budgeted chunks on segment boundaries, with start/end seconds
+            chunks = chunk_segments(transcript["segments"])
+        else:
+            # No timestamps from Whisper: fall back to word windows over the full text
+            chunks = [
+                {"text": chunk}
+                for chunk in chunk_text(transcript["full_text"], chunk_size=CHUNK_SIZE, overlap=OVERLAP)
+            ]
+
+        # Prepare chunks with IDs
+        chunks_data = [
+            {"chunk_id": i, **chunk}
+            for i, chunk in enumerate(chunks)
+        ]
+
+        # Rows are namespaced by video id so earlier videos stay searchable
+        embed_chunks(chunks_data, source_name=video_id)
+        if checkpoint:
+            # A video's rows are written in one transaction: all chunks or none
+            checkpoint.save("embed", {"chunks": len(chunks_data), "range": [0, len(chunks_data)]})
+
+    stages = []
+    structure = saved("summarize")
+    if structure is not None:
+        report("summarize", "resumed")
+    else:
+        stages.append(Stage("summarize", summarize, after=["transcript"]))
+    embedded = saved("embed")
+    if embedded is not None and count_source(video_id) == embedded["chunks"]:
+        report("embed", "resumed")
+    else:
+        stages.append(Stage("embed", chunk_and_embed, after=["transcript"]))
+
+    results, errors = run_stages(stages, inputs={"transcript": transcript_data}, progress=report, gates=gates)
+
+    if "embed" in errors:
+        raise errors["embed"]
+    structure = results.get("summarize") or structure or dict(SUMMARY_ERROR)
+
+    # Don't cache a failed summary; the next request should retry it
+    if structure.get("title") != "Error":
+        try:
+            stored_chunks, vectors = load_source(video_id)
+            ingest_cache.put(ingest_cache_key(video_id, language_mode), {
+                "video_id": video_id,
+                "language_mode": language_mode,
+                "full_text": transcript_text,
+                "segments": transcript_segments,
+                "structure": dict(structure),
+                "chunks": stored_chunks,
+            }, vectors)
+            # Complete and cached: the checkpoints have nothing left to resume
+            if checkpoint:
+                checkpoint.clear()
+        except Exception as e:
+            logger.warning(f"   Ingest cache write failed (result still returned): {e}")
 
     # Attach structured transcript to result
     structure["transcript"] = transcript_segments
+    structure["video_id"] = video_id
 
-    # Cleanup: Delete audio file to save space
-    if os.path.exists(audio_path):
+    # Cleanup: Delete audio file to save space (the transcript is saved by now),
+    # including one left behind by an interrupted earlier run
+    audio_path = audio_path or (download or {}).get("audio_path")
+    if audio_path and os.path.exists(audio_path):
         os.remove(audio_path)
-        print(f"Deleted temporary audio file: {audio_path}")
+        logger.info(f"Deleted temporary audio file: {audio_path}")
 
     return structure
@@ -0,0 +1,87 @@
+"""
+Benchmark: IVF approximate search vs the exact resident-matrix scan.
+
+Builds a clustered synthetic corpus (topics with noisy members, like chunks
+of many videos) in a temporary SQLite file, then for each nprobe reports
+recall@10 against the exact top-10 and the mean per-query latency.
+
+Usage:
+    python benchmarks/bench_ann.py [rows]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.vector_index import VectorIndex
+from backend.ann_index import IVFIndex
+
+DIM = 384
+TOP_K = 10
+QUERIES = 200
+VIDEOS = 500
+
+
+def build_db(path, rows, rng):
+    topics = rng.standard_normal((rows // 50, DIM)).astype(np.float32)
+    members = rng.integers(0, len(topics), size=rows)
+    vectors = topics[members] + 0.6 * rng.standard_normal((rows, DIM)).astype(np.float32)
+
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE embeddings (
+            id INTEGER PRIMARY KEY, source TEXT, chunk_id INTEGER, text TEXT,
+            vector BLOB, start_sec REAL, end_sec REAL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO embeddings (source, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
+        ((f"video{i % VIDEOS}", i, f"chunk {i}", v.tobytes()) for i, v in enumerate(vectors))
+    )
+    conn.commit()
+    conn.close()
+    return topics
+
+
+def time_queries(index, queries):
+    start = time.perf_counter()
+    results = [[hit["chunk_id"] for hit in index.search_hits(q, TOP_K)] for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "bench.sqlite")
+    topics = build_db(db_path, rows, rng)
+    queries = topics[rng.integers(0, len(topics), size=QUERIES)]
+    queries = queries + 0.8 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    exact = VectorIndex(db_path, engine="exact")
+    start = time.perf_counter()
+    len(exact)
+    print(f"{rows} rows x {DIM} dims; exact load {time.perf_counter() - start:.2f}s")
+    truth, exact_ms = time_queries(exact, queries)
+    print(f"{'exact':>12}: {exact_ms:7.2f} ms/query | recall@{TOP_K} 1.000")
+
+    ann = IVFIndex(os.path.join(tmp, "bench.ivf.npz"))
+    ivf = VectorIndex(db_path, engine="ivf", ann=ann)
+    start = time.perf_counter()
+    len(ivf)
+    print(f"IVF train + load {time.perf_counter() - start:.2f}s ({len(ann.centroids)} cells)")
+
+    for nprobe in (1, 4, 8, 16, 32):
+        ann.nprobe = nprobe
+        found, ms = time_queries(ivf, queries)
+        recall = np.mean([len(set(a) & set(b)) / TOP_K for a, b in zip(found, truth)])
+        print(f"{'nprobe=' + str(nprobe):>12}: {ms:7.2f} ms/query | recall@{TOP_K} {recall:.3f} "
+              f"| {exact_ms / ms:5.1f}x faster")
+
+    # Persisted index is reused without retraining
+    reloaded = IVFIndex(ann.path).load()
+    assert reloaded.trained and len(reloaded) == rows
@@ -0,0 +1,134 @@
+"""
+Load test: requests/sec of /ask at 50+ concurrent calls, async vs the
+previous sync handler.
+
+Both handlers run in the same uvicorn server against fake upstreams with the
+same latency profile: FakeGroq (time.sleep) for the old sync endpoint,
+FakeAsyncGroq (asyncio.sleep) for the async one. The embedding model is
+replaced by a small CPU-bound stand-in and search by a fixed hit list, so
+only the request path differs. The old handler is re-registered as
+/legacy_ask for comparison; it runs in Starlette's worker threadpool (40
+threads) and holds one thread for the whole LLM call.
+
+Usage:
+    python benchmarks/bench_async_load.py [concurrency ...]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("MODEL_PRELOAD", "0")
+
+from backend import app as app_module
+from backend import llm_answer
+from benchmarks.fake_groq import FakeGroq, FakeAsyncGroq
+from benchmarks.bench_stream_answer import serve
+
+# Roughly a real 70B answer: ~1s to first token, ~2s in total
+LATENCY = {"prefill_latency": 1.0, "token_latency": 0.025, "answer": " ".join(["word"] * 40)}
+REQUESTS_PER_WORKER = 3
+CONTEXT_HITS = [
+    {"score": 1.0, "text": f"Chunk {i} of the video.", "video_id": "bench", "chunk_id": i, "start": 0.0, "end": 1.0}
+    for i in range(3)
+]
+
+
+def fake_embed(question):
+    # ~1 ms of numpy work, standing in for the ONNX forward pass
+    rng = np.random.default_rng(abs(hash(question)) % 2**32)
+    m = rng.standard_normal((64, 384)).astype(np.float32)
+    return (m.T @ m).sum(axis=0)
+
+
+def fake_search(question, video_ids=None, query_vec=None):
+    return CONTEXT_HITS
+
+
+def install_fakes():
+    app_module.embed_query = fake_embed
+    app_module.search_hits = fake_search
+    app_module.get_answer_cache().threshold = 2.0   # never hit: every request reaches the LLM
+
+    async_fake = FakeAsyncGroq(**LATENCY)
+    app_module.agenerate_answer = lambda q, ctx: llm_answer.agenerate_answer(q, ctx, groq_client=async_fake)
+
+    sync_fake = FakeGroq(**LATENCY)
+
+    @app_module.app.post("/legacy_ask")
+    def legacy_ask(data: app_module.AskRequest):
+        # The pre-async handler: everything blocking, in a threadpool thread
+        query_vec = fake_embed(data.question)
+        app_module.get_answer_cache().lookup(data.video_id, query_vec)
+        hits = fake_search(data.question, video_ids=data.video_id, query_vec=query_vec)
+        answer = llm_answer.generate_answer(data.question, [h["text"] for h in hits], groq_client=sync_fake)
+        return {"question": data.question, "answer": answer, "sources": app_module.hit_sources(hits)}
+
+    # Static files are mounted at "/", so move the new route in front of it
+    routes = app_module.app.router.routes
+    routes.insert(0, routes.pop())
+
+
+async def post_json(reader, writer, host, path, payload):
+    # Minimal keep-alive HTTP/1.1 client: at a few hundred concurrent requests
+    # httpx's own pool overhead dominates and hides the server's behaviour
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    length = next(int(line.split(":", 1)[1]) for line in head if line.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return int(head[0].split()[1])
+
+
+async def load(base_url, path, concurrency):
+    host, port = base_url.split("//", 1)[1].split(":")
+    latencies, failures, errors = [], 0, {}
+
+    async def worker(w):
+        nonlocal failures
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            for i in range(REQUESTS_PER_WORKER):
+                start = time.perf_counter()
+                try:
+                    ok = await post_json(reader, writer, host, path, {"question": f"question {w}-{i}"}) == 200
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    return
+                finally:
+                    latencies.append(time.perf_counter() - start)
+                failures += not ok
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    failures += sum(errors.values())
+    print(f"{path:>12} x{concurrency:<4}: {len(ms) / elapsed:7.1f} req/s | p50 {np.percentile(ms, 50):7.0f} ms "
+          f"| p99 {np.percentile(ms, 99):7.0f} ms | {failures} failed {errors or ''}")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    levels = [int(a) for a in sys.argv[1:]] or [50, 100, 200]
+
+    install_fakes()
+    server, base_url = serve(app_module.app)
+    print(f"Fake LLM latency per answer: {LATENCY['prefill_latency'] + 40 * LATENCY['token_latency']:.1f}s; "
+          f"{REQUESTS_PER_WORKER} requests per concurrent client")
+    for concurrency in levels:
+        asyncio.run(load(base_url, "/legacy_ask", concurrency))
+        asyncio.run(load(base_url, "/ask", concurrency))
+    server.should_exit = True
@@ -0,0 +1,79 @@
+"""
+Benchmark: stream-mode audio extraction vs the yt-dlp MP3 re-encode.
+
+yt-dlp can't reach YouTube here, so a synthetic source stands in for the
+download: a stereo 48 kHz webm/Opus file at 128 kbps (YouTube's format 251).
+"mp3" is what `yt-dlp -x --audio-format mp3 --audio-quality 192K` runs after
+the download; "stream" pipes the same bytes through pipe_to_ffmpeg (`cat`
+in place of `yt-dlp -o -`) into 16 kHz mono Opus / FLAC. Reports time, bytes
+read from the source and bytes handed to transcription.
+
+Usage:
+    python benchmarks/bench_audio_extract.py [minutes]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend.audio_extract import find_ffmpeg, pipe_to_ffmpeg
+from backend.transcribe import probe_duration
+
+
+def make_source(path, seconds):
+    # Voice-band noise plus a tone so the encoders have real work to do
+    subprocess.run(
+        [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.2:duration={seconds}",
+         "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+         "-filter_complex", "amix=inputs=2", "-ar", "48000", "-ac", "2",
+         "-c:a", "libopus", "-b:a", "128k", path],
+        check=True
+    )
+
+
+def mp3_reencode(source, out_path):
+    start = time.perf_counter()
+    subprocess.run(
+        [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+         "-i", source, "-vn", "-c:a", "libmp3lame", "-b:a", "192k", out_path],
+        check=True
+    )
+    return time.perf_counter() - start
+
+
+def stream(source, out_path, codec):
+    start = time.perf_counter()
+    downloaded, returncode, _ = asyncio.run(pipe_to_ffmpeg(["cat", source], out_path, codec=codec))
+    assert returncode == 0
+    return time.perf_counter() - start, downloaded
+
+
+if __name__ == "__main__":
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seconds = int(minutes * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.webm")
+        make_source(source, seconds)
+        source_bytes = os.path.getsize(source)
+        print(f"Source: {minutes:g} min webm/opus 128k stereo, {source_bytes / 1e6:.1f} MB")
+
+        mp3_path = os.path.join(tmp, "audio.mp3")
+        mp3_s = mp3_reencode(source, mp3_path)
+        print(f"mp3 192k re-encode : {mp3_s:6.2f}s | read {source_bytes / 1e6:6.1f} MB "
+              f"| to transcribe {os.path.getsize(mp3_path) / 1e6:6.1f} MB")
+
+        for codec, ext in (("opus", ".ogg"), ("flac", ".flac")):
+            out_path = os.path.join(tmp, "audio" + ext)
+            stream_s, downloaded = stream(source, out_path, codec)
+            assert downloaded == source_bytes, (downloaded, source_bytes)
+            duration = probe_duration(out_path)
+            assert abs(duration - seconds) < 1, duration
+            print(f"stream {codec:<4} 16k mono: {stream_s:6.2f}s | read {downloaded / 1e6:6.1f} MB "
+                  f"| to transcribe {os.path.getsize(out_path) / 1e6:6.1f} MB")
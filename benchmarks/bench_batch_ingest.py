@@ -0,0 +1,143 @@
+"""
+Benchmark + check: batch ingest of a playlist vs one video at a time.
+
+yt-dlp is replaced by a tiny script that prints a flat playlist, download
+and transcription by sleeps, the summary by FakeGroq and embedding by NumPy
+work, so it runs offline. Reports videos/hour for a sequential loop over
+process_youtube_video and for BatchIngest with its staged concurrency
+limits, then checks per-item retry (a flaky transcription) and resume (a
+second run only re-ingests the videos that failed).
+
+Usage:
+    python benchmarks/bench_batch_ingest.py [videos]
+"""
+import os
+import sys
+import json
+import time
+import stat
+import tempfile
+import threading
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend import video_processing, batch_ingest, ingest_cache, checkpoints
+from backend.audio_extract import get_video_id
+from benchmarks.fake_groq import FakeGroq
+
+DOWNLOAD_SECONDS = 0.6
+TRANSCRIBE_SECONDS = 1.0
+EMBED_SECONDS = 0.2
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLbenchmark"
+
+calls = {"download": 0}
+broken = set()      # video ids whose download fails ("Video unavailable")
+flaky = set()       # video ids whose first transcription fails
+lock = threading.Lock()
+
+
+def fake_ytdlp(tmp, videos):
+    # Prints what `yt-dlp --flat-playlist --dump-single-json` prints (the parts we read)
+    listing = {"_type": "playlist", "entries": [
+        {"_type": "url", "id": f"vid{i:08d}", "url": f"https://www.youtube.com/watch?v=vid{i:08d}"}
+        for i in range(videos)
+    ]}
+    path = os.path.join(tmp, "yt-dlp")
+    with open(path, "w") as f:
+        f.write(f"#!{sys.executable}\nprint({json.dumps(json.dumps(listing))})\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def fake_download(url, stats=None):
+    video_id = get_video_id(url)
+    with lock:
+        calls["download"] += 1
+    time.sleep(DOWNLOAD_SECONDS)
+    if video_id in broken:
+        raise Exception("Video unavailable")
+    return f"audio/{video_id}.ogg"
+
+
+def fake_transcribe(audio_path, attempt_translation=False, checkpoint=None):
+    time.sleep(TRANSCRIBE_SECONDS)
+    video_id = os.path.splitext(os.path.basename(audio_path))[0]
+    with lock:
+        if video_id in flaky:
+            flaky.discard(video_id)
+            raise Exception("Error code: 503 - upstream connect error")
+    segments = [{"time": "[00:00]", "text": f"Words of {video_id}.", "start": 0.0, "end": 4.0}]
+    return {"full_text": segments[0]["text"], "segments": segments}
+
+
+def fake_embed_chunks(chunks_data, source_name="unknown", batch_size=None):
+    m = np.random.default_rng(0).standard_normal((256, 256)).astype(np.float32)
+    deadline = time.perf_counter() + EMBED_SECONDS
+    while time.perf_counter() < deadline:
+        m = np.tanh(m @ m)
+
+
+def install_fakes(tmp, videos):
+    ytdlp = fake_ytdlp(tmp, videos)
+    batch_ingest.find_ytdlp = lambda: ytdlp
+    batch_ingest.BATCH_DIR = os.path.join(tmp, "batches")
+    batch_ingest.RETRY_BACKOFF = 0.05
+    ingest_cache.CACHE_DIR = os.path.join(tmp, "ingest")
+    checkpoints.CHECKPOINT_DIR = os.path.join(tmp, "checkpoints")
+    video_processing.extract_audio = fake_download
+    video_processing.transcribe_audio = fake_transcribe
+    video_processing.embed_chunks = fake_embed_chunks
+    video_processing.load_source = lambda video_id: ([], np.zeros((0, 384), dtype=np.float32))
+    video_processing.client = FakeGroq(prefill_latency=0.5, token_latency=0.005)
+
+
+def quiet(fn, *args, **kwargs):
+    # The pipeline prints a few lines (and tracebacks) per stage; keep the report readable
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+if __name__ == "__main__":
+    videos = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+
+    with tempfile.TemporaryDirectory() as tmp:
+        install_fakes(tmp, videos)
+        urls = quiet(batch_ingest.expand_urls, [PLAYLIST_URL])
+        assert len(urls) == videos, urls
+        print(f"Playlist expanded to {len(urls)} videos "
+              f"(download {DOWNLOAD_SECONDS}s, transcribe {TRANSCRIBE_SECONDS}s, summary ~0.6s, embed {EMBED_SECONDS}s each)")
+
+        start = time.perf_counter()
+        for url in urls:
+            quiet(video_processing.process_youtube_video, url)
+        sequential = time.perf_counter() - start
+        print(f"one at a time : {sequential:6.2f}s, {videos / sequential * 3600:8.0f} videos/hour")
+
+        # Retry: two transcriptions fail once; resume: three downloads fail for good
+        flaky.update(get_video_id(u) for u in urls[:2])
+        broken.update(get_video_id(u) for u in urls[-3:])
+        quiet(ingest_cache.evict, 0)
+
+        snap = quiet(batch_ingest.BatchIngest([PLAYLIST_URL]).run)
+        print(f"batch         : {snap['elapsed_seconds']:6.2f}s, {snap['videos_per_hour']:8.0f} videos/hour "
+              f"(limits download {batch_ingest.DOWNLOAD_CONCURRENCY}, transcribe {batch_ingest.TRANSCRIBE_CONCURRENCY}, "
+              f"embed {batch_ingest.EMBED_CONCURRENCY}) {snap['counts']}")
+        retried = [i for i in snap["items"] if i["attempts"] > 1 and i["status"] == "done"]
+        assert len(retried) == 2, snap["items"]
+        assert snap["counts"] == {"done": videos - 3, "failed": 3}, snap["counts"]
+        assert all(i["attempts"] == 1 for i in snap["items"] if i["status"] == "failed"), "permanent errors retried"
+
+        broken.clear()
+        calls["download"] = 0
+        snap = quiet(batch_ingest.BatchIngest([PLAYLIST_URL]).run)
+        assert snap["counts"] == {"done": videos}, snap["counts"]
+        assert calls["download"] == 3, calls
+        print(f"resume        : re-ran {calls['download']} failed videos, skipped {videos - 3} done; "
+              f"retry: {len(retried)} flaky videos done on attempt 2")
@@ -0,0 +1,164 @@
+"""
+Fault injection: kill the ingest pipeline between stages (and between
+transcription windows), run it again, and measure the work the stage
+checkpoints saved.
+
+Each run is a forked child process; a killed run calls os._exit right
+after a chosen checkpoint is written, like a worker dying mid-job. The
+download is a copy of a synthetic MP3 (plus a sleep), transcription is the
+real windowed transcribe_audio against FakeGroq (1 worker, so windows
+finish one by one), the summary is FakeGroq and embedding writes random
+vectors through store_embeddings after a sleep. Everything lives in a temp
+directory.
+
+The mid-transcription kill comes after half of the windows; audio short
+enough for one window (about a minute) has no window checkpoints and skips it.
+
+Usage:
+    python benchmarks/bench_checkpoints.py [audio_minutes]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend import storage, ingest_cache, checkpoints, transcribe, video_processing
+from backend.embed_chunks import store_embeddings, count_source
+from benchmarks.fake_groq import FakeGroq
+from benchmarks.bench_transcribe import make_audio
+
+DOWNLOAD_SECONDS = 1.0
+EMBED_SECONDS = 0.5
+WINDOW_SECONDS = 60
+KILLED = 3
+
+
+def fake_download(url, stats=None, audio_dir=None, source=None):
+    time.sleep(DOWNLOAD_SECONDS)
+    path = os.path.join(audio_dir, f"{url.rsplit('=', 1)[-1]}.mp3")
+    shutil.copy(source, path)
+    return path
+
+
+def fake_embed_chunks(chunks_data, source_name="unknown", batch_size=None):
+    time.sleep(EMBED_SECONDS)
+    vectors = np.random.default_rng(0).standard_normal((len(chunks_data), 384)).astype(np.float32)
+    store_embeddings(chunks_data, vectors, source_name)
+
+
+def quiet(fn, *args, **kwargs):
+    # The pipeline prints a few lines per stage; keep the report readable
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def child(video_id, kill_after, results):
+    transcribe.client = FakeGroq(seconds_per_audio_second=0.01)
+    if kill_after:
+        save = checkpoints.Checkpoint.save
+
+        def save_then_die(self, name, data):
+            save(self, name, data)
+            if name == kill_after:
+                os._exit(KILLED)
+        checkpoints.Checkpoint.save = save_then_die
+
+    statuses = {}
+    result = quiet(video_processing.process_youtube_video, f"https://www.youtube.com/watch?v={video_id}",
+                   progress=lambda stage, status, **info: statuses.__setitem__(stage, status))
+    results.put({
+        "statuses": statuses,
+        "whisper_calls": transcribe.client.calls,
+        "segments": len(result.get("transcript", [])),
+        "rows": count_source(video_id),
+        "checkpoint_left": os.path.isdir(checkpoints.CHECKPOINT_DIR)
+                           and any(n.startswith(video_id) for n in os.listdir(checkpoints.CHECKPOINT_DIR)),
+    })
+
+
+def run(video_id, kill_after=None):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    start = time.perf_counter()
+    p = ctx.Process(target=child, args=(video_id, kill_after, results))
+    p.start()
+    report = results.get() if not kill_after else None
+    p.join()
+    seconds = time.perf_counter() - start
+    if kill_after:
+        assert p.exitcode == KILLED, f"run was not killed after {kill_after} (exit {p.exitcode})"
+    return seconds, report
+
+
+if __name__ == "__main__":
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 6
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_dir = os.path.join(tmp, "audio")
+        os.makedirs(audio_dir)
+        source = os.path.join(tmp, "source.mp3")
+        seconds = int(minutes * 60)
+        make_audio(source, seconds)
+        # Same split transcribe_audio makes (one request up to a window plus its overlap)
+        planned = len(transcribe.plan_windows(seconds, WINDOW_SECONDS, transcribe.WINDOW_OVERLAP)) \
+            if seconds > WINDOW_SECONDS + transcribe.WINDOW_OVERLAP else 1
+        # Windows done when the mid-transcription run dies (0: scenario skipped)
+        window_kill = planned // 2 if planned > 1 else 0
+
+        # Everything the pipeline writes goes to tmp; set before any child forks
+        storage.DB_PATH = os.path.join(tmp, "embeddings.sqlite")
+        ingest_cache.CACHE_DIR = os.path.join(tmp, "ingest")
+        checkpoints.CHECKPOINT_DIR = os.path.join(tmp, "checkpoints")
+        transcribe.WINDOW_SECONDS = WINDOW_SECONDS
+        transcribe.MAX_WORKERS = 1
+        video_processing.extract_audio = lambda url, stats=None: fake_download(url, stats, audio_dir, source)
+        video_processing.embed_chunks = fake_embed_chunks
+        video_processing.client = FakeGroq(prefill_latency=1.0, token_latency=0.005)
+
+        full, baseline = run("fullrun0001")
+        windows = baseline["whisper_calls"]
+        assert windows == planned, (windows, planned)
+        assert not baseline["checkpoint_left"], "checkpoint not cleared after a complete ingest"
+        print(f"{minutes:g} min of audio in {windows} windows; uninterrupted ingest {full:.2f}s")
+
+        scenarios = [("download", "download")]
+        if window_kill:
+            scenarios.append((f"transcribe-window-{window_kill - 1:03d}", f"{window_kill} transcription window{'s' if window_kill > 1 else ''}"))
+        else:
+            print("  (one transcription window: no mid-transcription kill)")
+        scenarios += [
+            ("transcribe", "transcribe"),
+            ("embed", "embed (summary in flight)"),
+        ]
+        for i, (kill_after, label) in enumerate(scenarios):
+            video_id = f"killed{i:05d}"
+            killed, _ = run(video_id, kill_after)
+            resumed, report = run(video_id)
+
+            assert report["segments"] == baseline["segments"], (report, baseline)
+            assert report["rows"] == baseline["rows"], (report, baseline)
+            assert not report["checkpoint_left"], report
+            skipped = [s for s, status in report["statuses"].items() if status == "resumed"]
+            print(f"  killed after {label:<26}: killed run {killed:5.2f}s, retry {resumed:5.2f}s "
+                  f"(saved {full - resumed:5.2f}s of {full:.2f}s) | resumed {skipped or '-'} "
+                  f"| whisper calls {report['whisper_calls']}/{windows}")
+
+            if kill_after == "download":
+                assert skipped == ["download"] and report["whisper_calls"] == windows, report
+            elif kill_after.startswith("transcribe-window"):
+                assert report["whisper_calls"] == windows - window_kill, report
+            elif kill_after == "transcribe":
+                assert report["whisper_calls"] == 0 and "transcribe" in skipped, report
+            else:
+                # The summary was still running when the worker died: only it is redone
+                assert "embed" in skipped and "summarize" not in skipped, report
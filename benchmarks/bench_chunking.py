@@ -0,0 +1,107 @@
+"""
+Benchmark: segment-aware token-budget chunker vs the 500-word / 100-overlap
+word chunker, on the fixed lecture fixture.
+
+Reports, per chunker: chunk count, tokens lost to the model's 512-token
+truncation, embed time, and retrieval quality (hit@3 and MRR for questions
+whose answer phrase is known).
+
+Uses the real FastEmbed model when it can be loaded. Otherwise it uses a
+hashed bag-of-wordpieces embedder that truncates at 512 tokens like the real
+model does, and reports that embed time as a proxy.
+
+Usage:
+    python benchmarks/bench_chunking.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chunks_text import chunk_text, chunk_segments, CHUNK_SIZE, OVERLAP
+from backend.shared_model import get_model, get_tokenizer, count_tokens, MODEL_MAX_TOKENS
+from benchmarks.fixtures import lecture_segments, fact_questions, full_text
+
+TOP_K = 3
+
+
+class HashedEmbedder:
+    """
+    Offline stand-in: idf-weighted hashed wordpiece ids, truncated to the
+    model's window so truncation costs recall exactly like it would for bge.
+    idf is fitted once on the fixture segments, so both chunkers share it.
+    """
+    DIM = 4096
+
+    def __init__(self, corpus):
+        self.idf = np.zeros(self.DIM, dtype=np.float32)
+        docs = [set(self._ids(text)) for text in corpus]
+        for doc in docs:
+            for token in doc:
+                self.idf[hash(token) % self.DIM] += 1
+        self.idf = np.log((1 + len(docs)) / (1 + self.idf)) + 1
+
+    def _ids(self, text):
+        tok = get_tokenizer()
+        return tok.encode(text).ids[:MODEL_MAX_TOKENS] if tok else text.split()[:MODEL_MAX_TOKENS]
+
+    def embed(self, texts, batch_size=256):
+        for text in texts:
+            vec = np.zeros(self.DIM, dtype=np.float32)
+            for token in self._ids(text):
+                vec[hash(token) % self.DIM] += 1.0
+            yield np.log1p(vec) * self.idf
+
+
+def load_embedder(corpus):
+    try:
+        model = get_model()
+        list(model.embed(["warm up"]))
+        return model, "FastEmbed bge-small"
+    except Exception as e:
+        print(f"(FastEmbed model unavailable: {e.__class__.__name__}; using hashed stand-in)")
+        return HashedEmbedder(corpus), "hashed stand-in"
+
+
+def evaluate(name, chunks, questions, model):
+    texts = [c["text"] for c in chunks]
+    tokens = count_tokens(texts)
+    truncated = sum(max(0, t - (MODEL_MAX_TOKENS - 2)) for t in tokens)
+
+    start = time.perf_counter()
+    matrix = np.array(list(model.embed(texts)), dtype=np.float32)
+    embed_s = time.perf_counter() - start
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    query_vecs = np.array(list(model.embed([q["question"] for q in questions])), dtype=np.float32)
+    query_vecs /= np.linalg.norm(query_vecs, axis=1, keepdims=True)
+
+    hits, reciprocal, context_tokens = 0, 0.0, 0
+    for q, vec in zip(questions, query_vecs):
+        ranked = np.argsort(-(matrix @ vec))[:TOP_K]
+        context_tokens += sum(tokens[i] for i in ranked)
+        for rank, i in enumerate(ranked, 1):
+            if q["fact"] in texts[i]:
+                hits += 1
+                reciprocal += 1.0 / rank
+                break
+
+    n = len(questions)
+    print(f"{name:>16}: {len(chunks):4d} chunks | {sum(tokens):6d} tokens, {truncated:6d} truncated "
+          f"({100 * truncated / sum(tokens):4.1f}%) | embed {embed_s:6.2f}s "
+          f"| hit@{TOP_K} {hits / n:.2f} | MRR {reciprocal / n:.2f} "
+          f"| {context_tokens / n:4.0f} context tokens/question")
+
+
+if __name__ == "__main__":
+    segments = lecture_segments()
+    questions = fact_questions(segments)
+    model, label = load_embedder([s["text"] for s in segments])
+    print(f"Fixture: {len(segments)} segments, {len(full_text(segments).split())} words; "
+          f"{len(questions)} questions; embedder: {label}")
+
+    word_chunks = [{"text": c} for c in chunk_text(full_text(segments), CHUNK_SIZE, OVERLAP)]
+    evaluate("500-word chunks", word_chunks, questions, model)
+    evaluate("segment chunks", chunk_segments(segments), questions, model)
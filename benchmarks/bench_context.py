@@ -0,0 +1,122 @@
+"""
+Benchmark: answer-prompt size with the context builder vs the old prompt
+(long instructions + the top-3 chunks joined as they are), on the lecture
+fixture.
+
+Chunks the fixture both ways (500-word / 100-overlap word windows and
+segment-aware chunks), retrieves the top chunks for two question sets
+(fact questions, and topic questions whose answers span neighbouring
+chunks), and reports per question: prompt tokens before / after, words
+dropped as overlap duplicates, how often the answer phrase is still in the
+prompt, and the time build_context takes. Tokens are counted with the
+embedding model's tokenizer, as the context builder and chunking do.
+
+Usage:
+    python benchmarks/bench_context.py [context_token_budget]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend import context_builder
+from backend.context_builder import build_context, passages
+from backend.shared_model import get_tokenizer, count_tokens
+from backend.llm_answer import build_prompt
+from backend.chunks_text import chunk_text, chunk_segments, CHUNK_SIZE, OVERLAP
+from benchmarks.fixtures import lecture_segments, fact_questions, full_text, FILLER
+from benchmarks.bench_chunking import load_embedder
+
+TOP_K = 3
+
+# llm_answer's prompt before the context builder
+OLD_PROMPT = """
+    You are a helpful and conversational AI assistant.
+    Your primary source of information is the provided Context from a YouTube video.
+    Always prioritize the Context.
+
+    If the answer is found in the Context, answer using that information.
+    If the answer is NOT found in the Context, use your general knowledge to provide a helpful answer, but briefly mention that this information comes from outside the video.
+
+    Do not say "I don't know" unless the question is completely nonsensical.
+
+    Context:
+    {context}
+
+    Question:
+    {question}
+    """
+
+
+def topic_questions(segments, per_topic=12):
+    # The word every segment of a topic repeats; asking about it pulls in
+    # several neighbouring chunks of that topic
+    questions = []
+    for i in range(0, len(segments), per_topic):
+        shared = set.intersection(*(set(s["text"].strip(" .").split()) for s in segments[i:i + per_topic]))
+        for word in sorted(shared - set(FILLER)):
+            questions.append({"question": f"what does the speaker explain about {word}?", "fact": word})
+    return questions
+
+
+def evaluate(name, chunks, questions, model):
+    texts = [c["text"] for c in chunks]
+    matrix = np.array(list(model.embed(texts)), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query_vecs = np.array(list(model.embed([q["question"] for q in questions])), dtype=np.float32)
+    query_vecs /= np.linalg.norm(query_vecs, axis=1, keepdims=True)
+
+    old_tokens = new_tokens = context_tokens = dropped = old_found = new_found = merged = 0
+    elapsed = 0.0
+    for q, vec in zip(questions, query_vecs):
+        scores = matrix @ vec
+        hits = [dict(chunks[i], score=float(scores[i]), video_id="lecture", chunk_id=int(i))
+                for i in np.argsort(-scores)[:TOP_K]]
+
+        old_context = "\n\n".join(h["text"] for h in hits)
+        old_prompt = OLD_PROMPT.format(context=old_context, question=q["question"])
+
+        start = time.perf_counter()
+        context = build_context(hits)
+        elapsed += time.perf_counter() - start
+        new_prompt = build_prompt(q["question"], context["chunks"])
+
+        before, after = count_tokens([old_prompt, new_prompt])
+        old_tokens += before
+        new_tokens += after
+        context_tokens += context["tokens"]
+        # Overlap removed from the retrieved chunks, before any budget trimming
+        dropped += len(old_context.split()) - sum(len(p["text"].split()) for p in passages(hits))
+        merged += len(context["hits"]) - len(context["chunks"])
+        old_found += q["fact"] in old_context
+        new_found += any(q["fact"] in c for c in context["chunks"])
+        assert context["tokens"] <= context_builder.CONTEXT_TOKENS, context["tokens"]
+
+    n = len(questions)
+    print(f"  {name:<34}: prompt {old_tokens / n:5.0f} -> {new_tokens / n:5.0f} tokens "
+          f"(-{100 * (1 - new_tokens / old_tokens):4.1f}%), context {context_tokens / n:4.0f} "
+          f"| {dropped / n:4.1f} overlap words, {merged / n:3.1f} merges "
+          f"| answer in prompt {old_found / n:.2f} -> {new_found / n:.2f} "
+          f"| build_context {1000 * elapsed / n:.2f} ms")
+    return old_found, new_found
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        context_builder.CONTEXT_TOKENS = int(sys.argv[1])
+    segments = lecture_segments()
+    model, label = load_embedder([s["text"] for s in segments])
+    tok = get_tokenizer()
+    print(f"Top {TOP_K} chunks per question; budget {context_builder.CONTEXT_TOKENS} context tokens; "
+          f"embedder: {label}; tokenizer: {'bge WordPiece' if tok else 'word estimate'}")
+
+    word_chunks = [{"text": c} for c in chunk_text(full_text(segments), CHUNK_SIZE, OVERLAP)]
+    segment_chunks = chunk_segments(segments)
+    print("Overlap words are those removed before the budget is applied.")
+    for set_name, questions in (("fact", fact_questions(segments)), ("topic", topic_questions(segments))):
+        print(f"{set_name} questions ({len(questions)}):")
+        for chunk_name, chunks in (("500-word chunks", word_chunks), ("segment chunks", segment_chunks)):
+            evaluate(chunk_name, chunks, questions, model)
@@ -0,0 +1,128 @@
+"""
+Benchmark: pipelined/batched embed_chunks vs the previous implementation
+(list() of every vector, then one INSERT per row).
+
+Each run happens in a fresh subprocess so peak RSS (ru_maxrss) is per
+implementation. A fake model stands in for FastEmbed: it yields 384-dim
+vectors in batches with a per-text compute delay, like ONNX releasing the GIL.
+
+Then checks that a slow embed_chunks doesn't lock other writers out:
+store_embeddings for another video, run while the model is still
+embedding, must finish well inside the SQLite busy timeout.
+
+Usage:
+    python benchmarks/bench_embed_chunks.py [chunks]
+"""
+import os
+import sys
+import time
+import json
+import sqlite3
+import resource
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import storage
+
+DIM = 384
+SECONDS_PER_TEXT = 0.00005
+
+
+class FakeModel:
+    def embed(self, texts, batch_size=256):
+        rng = np.random.default_rng(0)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            time.sleep(SECONDS_PER_TEXT * len(batch))
+            for vector in rng.standard_normal((len(batch), DIM)).astype(np.float32):
+                yield vector
+
+
+def legacy_embed_chunks(embed_module, chunks_data, source_name):
+    # The pre-pipeline implementation, kept here for comparison
+    conn = sqlite3.connect(storage.DB_PATH)
+    cur = conn.cursor()
+    model = embed_module.get_model()
+    texts = [item["text"] for item in chunks_data]
+    ids = [item["chunk_id"] for item in chunks_data]
+    embeddings_list = list(model.embed(texts))
+    for i, vector in enumerate(embeddings_list):
+        cur.execute(
+            "INSERT INTO embeddings (source, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
+            (source_name, ids[i], texts[i], vector.astype(np.float32).tobytes())
+        )
+    conn.commit()
+    conn.close()
+
+
+def child(impl, n, db_dir):
+    from backend import embed_chunks as embed_module
+    storage.DB_PATH = os.path.join(db_dir, "bench.sqlite")
+    storage.get_pool()  # schema for both implementations
+    embed_module.get_model = lambda: FakeModel()
+
+    chunks = [{"chunk_id": i, "text": f"chunk {i} " + "word " * 80} for i in range(n)]
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if impl == "legacy":
+        legacy_embed_chunks(embed_module, chunks, "bench")
+    else:
+        embed_module.embed_chunks(chunks, source_name="bench")
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "rows_per_sec": n / elapsed,
+        "seconds": elapsed,
+        "peak_rss_growth_mb": (peak_rss - baseline_rss) / 1024,
+    }))
+
+
+def concurrent_writer_check(embed_seconds=8.0, n=2000):
+    from backend import embed_chunks as embed_module
+    global SECONDS_PER_TEXT
+    SECONDS_PER_TEXT = embed_seconds / n
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = os.path.join(tmp, "bench.sqlite")
+        embed_module.get_model = lambda: FakeModel()
+        chunks = [{"chunk_id": i, "text": f"chunk {i}"} for i in range(n)]
+        slow = threading.Thread(target=embed_module.embed_chunks, args=(chunks, "slow-video"))
+        slow.start()
+        time.sleep(1.0)                 # well into the model run
+
+        start = time.perf_counter()
+        embed_module.store_embeddings(chunks[:10], np.ones((10, DIM), dtype=np.float32), "other-video")
+        waited = time.perf_counter() - start
+        still_embedding = slow.is_alive()
+        slow.join()
+
+        print(f"store_embeddings during a {embed_seconds:.0f}s embed: {waited * 1000:.0f} ms "
+              f"(embed still running: {still_embedding})")
+        assert still_embedding and waited < storage.BUSY_TIMEOUT_MS / 1000 / 2, waited
+        assert embed_module.count_source("slow-video") == n and embed_module.count_source("other-video") == 10
+
+
+def run(n):
+    for impl in ("legacy", "pipelined"):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", impl, str(n), tmp],
+                capture_output=True, text=True, check=True,
+                env={**os.environ, "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "offline-benchmark")},
+            ).stdout.strip().splitlines()[-1]
+        result = json.loads(out)
+        print(f"{impl:>9}: {result['rows_per_sec']:9.0f} rows/s ({result['seconds']:.2f}s) "
+              f"| peak RSS growth {result['peak_rss_growth_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
+        concurrent_writer_check()
@@ -0,0 +1,87 @@
+"""
+Benchmark: dense-only retrieval vs dense + BM25 fused by reciprocal rank.
+
+Ingests the lecture fixture through embed_chunks into a temporary SQLite
+file, then asks two kinds of question: the fixture's fact questions and a
+harder variant that names only one rare word of the fact. Reports hit@3,
+MRR, per-query search latency (embedding excluded) and the size of the
+FTS5 postings next to the vector blobs.
+
+Usage:
+    python benchmarks/bench_hybrid.py
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import embed_chunks as embed_module
+from backend import search_and_qa, vector_index, storage
+from backend.chunks_text import chunk_segments
+from backend.storage import FTS_TABLE
+from benchmarks.fixtures import lecture_segments, fact_questions
+from benchmarks.bench_chunking import load_embedder
+
+TOP_K = search_and_qa.TOP_K
+
+
+def one_word_questions(questions, seed=2):
+    rng = random.Random(seed)
+    return [
+        {"question": f"when is {rng.choice(q['fact'].split())} mentioned?", "fact": q["fact"]}
+        for q in questions
+    ]
+
+
+def evaluate(name, questions, model, hybrid):
+    search_and_qa.HYBRID_SEARCH = hybrid
+    vecs = [np.asarray(v, dtype=np.float32) for v in model.embed([q["question"] for q in questions])]
+
+    hits, reciprocal, elapsed = 0, 0.0, 0.0
+    for q, vec in zip(questions, vecs):
+        start = time.perf_counter()
+        results = search_and_qa.search_hits(q["question"], query_vec=vec)
+        elapsed += time.perf_counter() - start
+        for rank, hit in enumerate(results[:TOP_K], 1):
+            if q["fact"] in hit["text"]:
+                hits += 1
+                reciprocal += 1.0 / rank
+                break
+
+    n = len(questions)
+    print(f"{name:>28}: hit@{TOP_K} {hits / n:.2f} | MRR {reciprocal / n:.2f} "
+          f"| {1000 * elapsed / n:6.2f} ms/query")
+
+
+def table_bytes(conn, pattern):
+    return conn.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name LIKE ?", (pattern,)).fetchone()[0]
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    storage.DB_PATH = os.path.join(tmp, "bench.sqlite")
+    vector_index.vector_index = vector_index.VectorIndex(engine="exact")
+
+    segments = lecture_segments()
+    model, label = load_embedder([s["text"] for s in segments])
+    embed_module.get_model = lambda: model
+
+    chunks = chunk_segments(segments)
+    for i, chunk in enumerate(chunks):
+        chunk["chunk_id"] = i
+    embed_module.embed_chunks(chunks, source_name="lecture")
+
+    questions = fact_questions(segments)
+    print(f"{len(chunks)} chunks; {len(questions)} questions per set; embedder: {label}")
+    for set_name, qs in (("fact", questions), ("one rare word", one_word_questions(questions))):
+        evaluate(f"dense, {set_name}", qs, model, hybrid=False)
+        evaluate(f"hybrid, {set_name}", qs, model, hybrid=True)
+
+    with storage.connection() as conn:
+        fts = table_bytes(conn, f"{FTS_TABLE}%")
+        total = table_bytes(conn, "%")
+    print(f"FTS5 postings: {fts / 1024:.0f} KiB ({100 * fts / total:.0f}% of the database)")
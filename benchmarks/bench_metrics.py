@@ -0,0 +1,52 @@
+"""
+Benchmark: per-call cost of the metrics layer, enabled vs METRICS_ENABLED=0.
+
+Decorates a trivial function with metrics.timed() both ways and times
+calls and counter increments. Disabled, timed() must return the function
+itself, so the cost is exactly zero.
+
+Usage:
+    python benchmarks/bench_metrics.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import metrics
+
+
+def noop(x):
+    return x
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    metrics.ENABLED = False
+    disabled = metrics.timed("bench")(noop)
+    assert disabled is noop
+    disabled_incr = per_call_ns(lambda i: metrics.cache_result("bench", True), calls)
+
+    metrics.ENABLED = True
+    enabled = metrics.timed("bench")(noop)
+    enabled_incr = per_call_ns(lambda i: metrics.cache_result("bench", True), calls)
+
+    base = per_call_ns(noop, calls)
+    print(f"undecorated call   : {base:7.0f} ns")
+    print(f"timed(), disabled  : {per_call_ns(disabled, calls):7.0f} ns (same function object)")
+    print(f"timed(), enabled   : {per_call_ns(enabled, calls):7.0f} ns")
+    print(f"cache_result() off : {disabled_incr:7.0f} ns")
+    print(f"cache_result() on  : {enabled_incr:7.0f} ns")
+
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"render /metrics    : {(time.perf_counter() - start) * 1000:7.2f} ms, {len(text.splitlines())} lines")
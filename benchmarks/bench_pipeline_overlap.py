@@ -0,0 +1,97 @@
+"""
+Check + benchmark: the summary and chunk+embed stages of
+process_youtube_video overlap instead of running back to back.
+
+Download and transcription are stubbed, the summary runs the real
+generate_structured_summary against FakeGroq (network-style sleeps) and
+embed_chunks is replaced by ~EMBED_SECONDS of NumPy work (CPU-bound, like
+the ONNX model). Runs the pipeline with PIPELINE_STAGE_WORKERS=1 (the old
+sequential order) and with the default, and asserts that in the concurrent
+run the two stages' intervals overlap and the wall-clock is close to
+max(summary, embed) rather than the sum.
+
+Usage:
+    python benchmarks/bench_pipeline_overlap.py
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend import video_processing, pipeline, ingest_cache, checkpoints
+from benchmarks.fake_groq import FakeGroq
+
+URL = "https://www.youtube.com/watch?v=overlapTest"
+EMBED_SECONDS = 1.5
+# One summary request of ~1.5s
+LATENCY = {"prefill_latency": 1.0, "prompt_char_latency": 0.0, "token_latency": 0.01}
+
+
+def fake_transcript(audio_path, attempt_translation=False, checkpoint=None):
+    segments = [
+        {"time": f"[00:{i * 4:02d}]", "text": f"Sentence {i} of the test video.", "start": i * 4.0, "end": i * 4.0 + 4.0}
+        for i in range(15)
+    ]
+    return {"full_text": " ".join(s["text"] for s in segments), "segments": segments}
+
+
+def fake_embed_chunks(chunks_data, source_name="unknown", batch_size=None):
+    m = np.random.default_rng(0).standard_normal((256, 256)).astype(np.float32)
+    deadline = time.perf_counter() + EMBED_SECONDS
+    while time.perf_counter() < deadline:
+        m = np.tanh(m @ m)
+
+
+def install_fakes():
+    video_processing.extract_audio = lambda url, stats=None: "audio/overlapTest.ogg"
+    video_processing.transcribe_audio = fake_transcript
+    video_processing.embed_chunks = fake_embed_chunks
+    video_processing.load_source = lambda video_id: ([], np.zeros((0, 384), dtype=np.float32))
+    video_processing.client = FakeGroq(**LATENCY)
+    ingest_cache.CACHE_DIR = tempfile.mkdtemp(prefix="ingest_cache_")
+    checkpoints.CHECKPOINT_DIR = tempfile.mkdtemp(prefix="checkpoints_")
+
+
+def run(stage_workers):
+    pipeline.STAGE_WORKERS = stage_workers
+    ingest_cache.evict(0)
+    spans = {}
+
+    def progress(stage, status, **info):
+        now = time.perf_counter()
+        if status == "running":
+            spans[stage] = [now, None]
+        elif status == "done":
+            spans[stage][1] = now
+
+    start = time.perf_counter()
+    result = video_processing.process_youtube_video(URL, progress=progress)
+    total = time.perf_counter() - start
+    assert "error" not in result and result["title"] != "Error", result
+    return total, spans
+
+
+if __name__ == "__main__":
+    install_fakes()
+
+    sequential, seq_spans = run(1)
+    concurrent, spans = run(pipeline.STAGE_WORKERS if pipeline.STAGE_WORKERS > 1 else 4)
+
+    summary_s = spans["summarize"][1] - spans["summarize"][0]
+    embed_s = spans["embed"][1] - spans["embed"][0]
+    overlap = min(spans["summarize"][1], spans["embed"][1]) - max(spans["summarize"][0], spans["embed"][0])
+
+    print(f"summarize {summary_s:.2f}s, embed {embed_s:.2f}s")
+    print(f"sequential stages : {sequential:.2f}s")
+    print(f"concurrent stages : {concurrent:.2f}s (overlap {overlap:.2f}s)")
+
+    # The sequential run really is back to back...
+    assert seq_spans["embed"][0] >= seq_spans["summarize"][1]
+    # ...and the concurrent one runs them side by side
+    assert overlap > 0.8 * min(summary_s, embed_s), overlap
+    assert concurrent < sequential - 0.8 * min(summary_s, embed_s), (concurrent, sequential)
+    print("OK: summary and chunk+embed overlap")
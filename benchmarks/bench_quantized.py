@@ -0,0 +1,109 @@
+"""
+Benchmark: quantized vector scan (int8) + float32 re-rank vs the
+plain float32 scan.
+
+Builds a throwaway database of random 384-dim vectors with a little cluster
+structure (so near neighbours exist, like real chunk embeddings), then for
+each VECTOR_QUANTIZATION setting reports the size of the data a scan
+reads, the disk used (SQLite file + segment files), scan throughput and
+recall@k of the final hits against the exact float32 top-k.
+
+Usage:
+    python benchmarks/bench_quantized.py [rows]
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import quantize, storage
+from backend.vector_index import VectorIndex
+
+DIM = 384
+TOP_K = 5
+QUERIES = 50
+CLUSTERS = 200
+
+
+def build_db(path, n, rng):
+    centers = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, CLUSTERS, n)] + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE embeddings (
+            id INTEGER PRIMARY KEY,
+            source TEXT,
+            chunk_id INTEGER,
+            text TEXT,
+            vector BLOB
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO embeddings (source, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
+        ((f"video{i // 500:05d}", i % 500, f"chunk {i}", vectors[i].tobytes()) for i in range(n))
+    )
+    conn.commit()
+    conn.close()
+    return centers
+
+
+def disk_bytes(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    directory = storage.segments_dir(db_path)
+    files = [db_path] + [os.path.join(directory, f) for f in os.listdir(directory)]
+    return sum(os.path.getsize(f) for f in files)
+
+
+def run(n):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "base.sqlite")
+        centers = build_db(base_path, n, rng)
+        queries = centers[rng.integers(0, CLUSTERS, QUERIES)] + 0.6 * rng.standard_normal((QUERIES, DIM))
+        queries = queries.astype(np.float32)
+
+        exact = None
+        print(f"{n} rows x {DIM} dims, top-{TOP_K}, {quantize.RERANK_CANDIDATES} re-rank candidates")
+        for kind in ("none", "int8"):
+            # A fresh copy per setting, written the way an ingest with it would
+            db_path = os.path.join(tmp, f"{kind}.sqlite")
+            shutil.copy(base_path, db_path)
+            quantize.QUANTIZATION = kind
+            index = VectorIndex(db_path, engine="exact", quantization=kind)
+            start = time.perf_counter()
+            len(index)  # first touch moves the vectors to segment files and maps them
+            load_s = time.perf_counter() - start
+
+            state = index._snapshot()
+            scanned_bytes = (sum(seg.codes.nbytes for seg in state.segments)
+                             + (state.scales.nbytes if state.scales is not None else 0))
+
+            # Scan alone (no re-rank), then the full search
+            start = time.perf_counter()
+            for q in queries:
+                index._scores(state, q / np.linalg.norm(q))
+            scan_s = (time.perf_counter() - start) / QUERIES
+
+            start = time.perf_counter()
+            ids = [[hit["id"] for hit in index.search_hits(q, TOP_K)] for q in queries]
+            search_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+            if exact is None:
+                exact = ids
+            recall = np.mean([len(set(a) & set(b)) / TOP_K for a, b in zip(ids, exact)])
+            print(f"  {kind:>7} | scanned {scanned_bytes / 2**20:7.1f} MB | disk {disk_bytes(db_path) / 2**20:7.1f} MB "
+                  f"| scan {n / scan_s / 1e6:6.1f} M rows/s | search {search_ms:6.2f} ms | recall@{TOP_K} {recall:.3f} "
+                  f"| load {load_s:.1f}s")
+            if kind != "none":
+                assert recall >= 0.98, f"{kind} recall {recall}"
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,106 @@
+"""
+Benchmark: cold start and first-query latency of the embedding model.
+
+Each scenario runs in a fresh interpreter:
+  lazy     - import the app, then the first query loads the model (old behaviour)
+  preload  - import the app, run the startup warm-up, then the first query
+  worker   - model lives in `python -m backend.embed_worker`; the app process
+             only holds a socket client (EMBED_WORKER_ADDRESS)
+
+Reports import time, startup (warm-up) time, first and second query latency
+and the peak RSS of the app process.
+
+Needs the FastEmbed model in fastembed_cache (or network access to fetch it).
+
+Usage:
+    python benchmarks/bench_startup.py [threads]
+"""
+import os
+import sys
+import json
+import time
+import secrets
+import socket
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_ADDRESS = "127.0.0.1:8799"
+
+SCENARIO = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import backend.app as app
+imported = time.perf_counter() - start
+
+startup = 0.0
+if sys.argv[1] in ("preload", "worker"):
+    start = time.perf_counter()
+    app.preload()
+    startup = time.perf_counter() - start
+    if not app.model_ready():
+        raise SystemExit(f"model unavailable: {app.model_status['error']}")
+
+from backend.search_and_qa import embed_query
+start = time.perf_counter()
+embed_query("what is the main idea of the video?")
+first = time.perf_counter() - start
+start = time.perf_counter()
+embed_query("and how does the second part work?")
+second = time.perf_counter() - start
+
+print(json.dumps({
+    "import": imported, "startup": startup, "first": first, "second": second,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def run(scenario, env):
+    result = subprocess.run(
+        [sys.executable, "-c", SCENARIO, scenario],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        print(f"{scenario:>8}: failed\n{result.stderr.strip()[-400:] or result.stdout.strip()[-400:]}")
+        return None
+    return json.loads(lines[-1])
+
+
+def wait_for_port(address, process, timeout=300):
+    host, port = address.rsplit(":", 1)
+    deadline = time.time() + timeout
+    while time.time() < deadline and process.poll() is None:
+        try:
+            socket.create_connection((host, int(port)), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+if __name__ == "__main__":
+    env = dict(os.environ, GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "bench"), MODEL_PRELOAD="0",
+               EMBED_WORKER_KEY=os.environ.get("EMBED_WORKER_KEY") or secrets.token_hex(16))
+    if len(sys.argv) > 1:
+        env["EMBED_THREADS"] = sys.argv[1]
+    print(f"EMBED_THREADS={env.get('EMBED_THREADS', '1')}")
+
+    results = {"lazy": run("lazy", env), "preload": run("preload", env)}
+
+    worker = subprocess.Popen([sys.executable, "-m", "backend.embed_worker"], cwd=ROOT_DIR,
+                              env=dict(env, EMBED_WORKER_ADDRESS=WORKER_ADDRESS))
+    try:
+        if wait_for_port(WORKER_ADDRESS, worker):
+            results["worker"] = run("worker", dict(env, EMBED_WORKER_ADDRESS=WORKER_ADDRESS))
+        else:
+            print("  worker: did not start")
+    finally:
+        worker.terminate()
+        worker.wait()
+
+    for name, r in results.items():
+        if r:
+            print(f"{name:>8}: import {r['import']:5.2f}s | startup {r['startup']:5.2f}s "
+                  f"| first query {1000 * r['first']:7.1f} ms | second {1000 * r['second']:6.1f} ms "
+                  f"| app RSS {r['rss_mb']:5.0f} MB")
@@ -0,0 +1,115 @@
+"""
+Load test: concurrent reads while an ingest holds a long write transaction.
+
+A writer thread re-ingests videos through embed_chunks with a slow fake
+model, so each video's transaction stays open for a while. Reader threads
+meanwhile run the DB-backed read paths: BM25 lexical search, load_source and
+a full VectorIndex reload. Reports read latency percentiles with and without
+the writer, and fails if any read errored (e.g. "database is locked") or
+waited on the writer.
+
+Usage:
+    python benchmarks/bench_storage.py [seconds] [readers]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import storage, vector_index
+from backend import embed_chunks as embed_module
+from backend.lexical_index import search_lexical
+
+DIM = 384
+VIDEOS = 20
+CHUNKS_PER_VIDEO = 200
+WORDS = "alpha beta gamma delta epsilon zeta theta kappa lambda sigma omega".split()
+
+
+class SlowModel:
+    # ~0.5s per 200-chunk video: the write transaction stays open meanwhile
+    def embed(self, texts, batch_size=256):
+        rng = np.random.default_rng(len(texts))
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            time.sleep(0.0025 * len(batch))
+            yield from rng.standard_normal((len(batch), DIM)).astype(np.float32)
+
+
+def chunks_for(video):
+    rng = np.random.default_rng(video)
+    return [
+        {"chunk_id": i, "text": " ".join(rng.choice(WORDS, 40)) + f" video{video} part{i}"}
+        for i in range(CHUNKS_PER_VIDEO)
+    ]
+
+
+def reader(stop, latencies, errors):
+    index = vector_index.VectorIndex(engine="exact")
+    rng = np.random.default_rng(threading.get_ident() % 2**32)
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if i % 10 == 0:
+                index.invalidate()
+                len(index)              # full reload of the matrix
+            elif i % 2:
+                search_lexical(f"{rng.choice(WORDS)} video{rng.integers(VIDEOS)}", 10)
+            else:
+                embed_module.load_source(f"video{rng.integers(VIDEOS)}")
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def writer(stop, count):
+    video = 0
+    while not stop.is_set():
+        embed_module.embed_chunks(chunks_for(video % VIDEOS), source_name=f"video{video % VIDEOS}")
+        video += 1
+        count[0] += 1
+
+
+def run(seconds, readers, with_writer):
+    stop = threading.Event()
+    latencies, errors, ingested = [], [], [0]
+    threads = [threading.Thread(target=reader, args=(stop, latencies, errors)) for _ in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer, args=(stop, ingested)))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    ms = np.array(latencies) * 1000
+    label = "reads during ingest" if with_writer else "reads, idle"
+    print(f"{label:>20}: {len(ms):6d} reads | p50 {np.percentile(ms, 50):6.2f} ms "
+          f"| p99 {np.percentile(ms, 99):7.2f} ms | max {ms.max():7.2f} ms "
+          f"| {ingested[0]} videos ingested | {len(errors)} errors")
+    return ms, errors
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    embed_module.get_model = lambda: SlowModel()
+    for video in range(VIDEOS):
+        embed_module.embed_chunks(chunks_for(video), source_name=f"video{video}")
+
+    idle, _ = run(seconds, readers, with_writer=False)
+    busy, errors = run(seconds, readers, with_writer=True)
+
+    assert not errors, errors[:3]
+    # A blocked reader would wait for a whole video's transaction (~500 ms)
+    assert np.percentile(busy, 99) < 250, "reads waited on the writer"
+    print("OK: no read errors and no read waited for the ingest transaction")
@@ -0,0 +1,98 @@
+"""
+Benchmark: time-to-first-token of /ask/stream vs the blocking /ask answer.
+
+Uses FakeGroq (fixed prefill delay + per-token delay) so it runs offline.
+Measures generate_answer vs stream_answer directly, then the first SSE
+event through the FastAPI app with search() stubbed out.
+
+Usage:
+    python benchmarks/bench_stream_answer.py
+"""
+import os
+import sys
+import time
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend import llm_answer
+from benchmarks.fake_groq import FakeGroq, FakeAsyncGroq
+
+CONTEXT = ["Chunk about the first topic.", "Chunk about the second topic."]
+QUESTION = "What is this video about?"
+
+
+def bench_functions(fake):
+    start = time.perf_counter()
+    answer = llm_answer.generate_answer(QUESTION, CONTEXT, groq_client=fake)
+    blocking_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = None
+    pieces = []
+    for piece in llm_answer.stream_answer(QUESTION, CONTEXT, groq_client=fake):
+        if first is None:
+            first = time.perf_counter() - start
+        pieces.append(piece)
+    total_s = time.perf_counter() - start
+
+    assert "".join(pieces) == answer
+    print(f"generate_answer : full answer after {blocking_s * 1000:7.1f} ms")
+    print(f"stream_answer   : first token after {first * 1000:7.1f} ms, last after {total_s * 1000:7.1f} ms")
+
+
+def serve(app):
+    # Real server in a thread: TestClient buffers the whole body, hiding TTFB
+    import socket
+    import threading
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def bench_endpoint(fake):
+    import httpx
+    from backend import app as app_module
+
+    import numpy as np
+    app_module.embed_query = lambda question: np.ones(384, dtype=np.float32)
+    async_fake = FakeAsyncGroq(prefill_latency=fake.prefill_latency, token_latency=fake.token_latency)
+    app_module.search_hits = lambda question, video_ids=None, query_vec=None: [
+        {"score": 1.0, "text": text, "video_id": "bench", "chunk_id": i, "start": 0.0, "end": 1.0}
+        for i, text in enumerate(CONTEXT)
+    ]
+    app_module.get_answer_cache().threshold = 2.0  # never hit: measure the LLM path
+    app_module.astream_answer = lambda q, ctx: llm_answer.astream_answer(q, ctx, groq_client=async_fake)
+    server, base_url = serve(app_module.app)
+
+    start = time.perf_counter()
+    first = None
+    tokens = 0
+    with httpx.stream("POST", f"{base_url}/ask/stream", json={"question": QUESTION}, timeout=30) as response:
+        for line in response.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if "token" in event:
+                tokens += 1
+                if first is None:
+                    first = time.perf_counter() - start
+    total_s = time.perf_counter() - start
+    server.should_exit = True
+    print(f"/ask/stream     : first event after {first * 1000:7.1f} ms, {tokens} tokens in {total_s * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    fake = FakeGroq()
+    bench_functions(fake)
+    bench_endpoint(fake)
@@ -0,0 +1,63 @@
+"""
+Benchmark: map-reduce structured summary over long transcripts.
+
+Builds synthetic transcripts (~900 chars per minute of video, one segment
+every 4s) and summarizes them with FakeGroq in JSON mode, whose latency grows
+with the prompt length. Reports wall-clock time per video length and worker
+count, and checks that the window prompts together cover every segment (the
+old summary saw only the first 20k chars) and that the result has the
+{"title", "summary", "topics"} shape.
+
+Usage:
+    python benchmarks/bench_summary.py [minutes ...]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+from backend.video_processing import generate_structured_summary, SUMMARY_WINDOW_CHARS
+from benchmarks.fake_groq import FakeGroq
+
+WORKERS = [1, 4, 8]
+# ~1s for a full 20k-char window
+LATENCY = {"prefill_latency": 0.3, "prompt_char_latency": 0.00003, "token_latency": 0.01}
+
+
+def make_segments(minutes):
+    segments = []
+    for i in range(int(minutes * 15)):
+        text = f" Sentence {i:05d} adds one more detail of the lecture topic."
+        segments.append({"start": i * 4.0, "end": i * 4.0 + 4.0, "text": text})
+    return segments
+
+
+def check(structure, segments, prompts):
+    assert set(structure) >= {"title", "summary", "topics"}, structure
+    assert structure["title"] != "Error"
+    assert all("subtopics" in topic for topic in structure["topics"])
+    seen = "".join(prompts)
+    missing = [s for s in segments if s["text"].strip() not in seen]
+    assert not missing, f"{len(missing)} segments never sent, first: {missing[0]['text']}"
+
+
+if __name__ == "__main__":
+    lengths = [float(a) for a in sys.argv[1:]] or [20, 60, 120, 240]
+    print(f"Window: {SUMMARY_WINDOW_CHARS} chars")
+
+    for minutes in lengths:
+        segments = make_segments(minutes)
+        text = " ".join(s["text"].strip() for s in segments)
+        coverage = min(1.0, SUMMARY_WINDOW_CHARS / len(text))
+        print(f"{minutes:5.0f} min, {len(text) / 1000:6.0f}k chars (a single truncated request saw {coverage:4.0%})")
+
+        for workers in WORKERS:
+            fake = FakeGroq(**LATENCY)
+            start = time.perf_counter()
+            structure = generate_structured_summary(text, segments=segments, groq_client=fake, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            check(structure, segments, fake.prompts)
+            print(f"        {workers} workers: {elapsed:6.2f}s, {fake.calls:3d} LLM calls, "
+                  f"{len(structure['topics'])} topics")
@@ -0,0 +1,70 @@
+"""
+Benchmark: single-request vs windowed parallel transcription.
+
+Generates a synthetic MP3 with ffmpeg and runs transcribe_audio against
+FakeGroq, whose latency grows with the uploaded audio length. Also checks
+that the stitched segments are in order and cover the audio exactly once.
+
+Usage:
+    python benchmarks/bench_transcribe.py [minutes]
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.audio_extract import find_ffmpeg
+from backend.transcribe import transcribe_audio, probe_duration
+from benchmarks.fake_groq import FakeGroq
+
+
+def make_audio(path, seconds):
+    subprocess.run(
+        [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-ac", "1", "-b:a", "32k", path],
+        check=True
+    )
+
+
+def check_stitching(segments, duration):
+    starts = [s["start"] for s in segments]
+    assert starts == sorted(starts), "segments out of order"
+    for prev, cur in zip(segments, segments[1:]):
+        # No duplicated overlap and no hole bigger than one fake segment
+        assert cur["start"] >= prev["start"] + 0.5, (prev, cur)
+        assert cur["start"] - prev["end"] < 5, (prev, cur)
+    assert segments[-1]["end"] >= duration - 5
+
+
+def run(minutes):
+    seconds = minutes * 60
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_path = os.path.join(tmp, "bench.mp3")
+        make_audio(audio_path, seconds)
+        duration = probe_duration(audio_path)
+        size_mb = os.path.getsize(audio_path) / 1e6
+
+        fake = FakeGroq()
+        start = time.perf_counter()
+        whole = transcribe_audio(audio_path, groq_client=fake, window_seconds=0)
+        whole_s = time.perf_counter() - start
+
+        fake = FakeGroq()
+        start = time.perf_counter()
+        windowed = transcribe_audio(audio_path, groq_client=fake, window_seconds=300, max_workers=4)
+        windowed_s = time.perf_counter() - start
+
+        check_stitching(windowed["segments"], duration)
+
+    print(f"{minutes} min audio ({size_mb:.1f} MB):")
+    print(f"  single request : {whole_s:6.2f}s, {len(whole['segments'])} segments")
+    print(f"  windowed (4x)  : {windowed_s:6.2f}s, {len(windowed['segments'])} segments, "
+          f"{fake.calls} requests, {fake.audio_seconds - duration:.0f}s overlap re-sent")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,133 @@
+"""
+Benchmark + check: the shared upstream client (backend.groq_clients) vs
+plain groq SDK clients, against a local fake Groq HTTP server that allows
+10 requests per second per model and answers the rest with 429 +
+retry-after.
+
+  burst      40 different chat requests at once: how many are lost
+             (raise) with the SDK's own retries off / on, and with the
+             upstream client (rate limiter + retry-after backoff)
+  coalescing 20 identical requests at once: upstream calls made
+  async      the same burst through the AsyncGroq wrapper
+  pooling    TCP connections opened for 50 sequential requests
+
+Usage:
+    python benchmarks/bench_upstream.py
+"""
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+import httpx
+from groq import Groq, AsyncGroq
+
+from backend import groq_clients
+from benchmarks.fake_groq_server import FakeGroqServer
+
+MODEL = "llama-3.3-70b-versatile"
+LIMIT_PER_SECOND = 10
+BURST = 40
+
+
+def ask(client, prompt):
+    try:
+        response = client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": prompt}])
+        return response.choices[0].message.content
+    except Exception as e:
+        return e
+
+
+def burst(client, prompts):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        answers = list(pool.map(lambda p: ask(client, p), prompts))
+    return answers, time.perf_counter() - start
+
+
+def report(label, server, answers, seconds):
+    lost = sum(isinstance(a, Exception) for a in answers)
+    print(f"  {label:<34} lost {lost:2d}/{len(answers)} | {seconds:5.2f}s | "
+          f"server: {server.counts['requests']:3d} requests, {server.counts['rate_limited']:3d} x 429, "
+          f"{server.counts['connections']:2d} connections")
+    return lost
+
+
+def upstream_client(server):
+    http_client = httpx.Client(limits=groq_clients._limits())
+    return groq_clients.UpstreamClient(Groq(api_key="x", base_url=server.url, http_client=http_client,
+                                            max_retries=0))
+
+
+async def async_burst(server, prompts):
+    client = groq_clients.UpstreamClient(AsyncGroq(api_key="x", base_url=server.url, max_retries=0))
+
+    async def one(prompt):
+        try:
+            response = await client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": prompt}])
+            return response.choices[0].message.content
+        except Exception as e:
+            return e
+
+    start = time.perf_counter()
+    answers = await asyncio.gather(*(one(p) for p in prompts))
+    seconds = time.perf_counter() - start
+    await client.close()
+    return answers, seconds
+
+
+if __name__ == "__main__":
+    server = FakeGroqServer(latency=0.2, limit=LIMIT_PER_SECOND, window=1.0).start()
+    # The client's limiter knows the model's real limit, as GROQ_RATE_LIMITS would configure
+    groq_clients.RATE_LIMITS = {MODEL: LIMIT_PER_SECOND * 60}
+    groq_clients.RATE_BURST_SECONDS = 1
+    prompts = [f"Question {i}?" for i in range(BURST)]
+    print(f"Fake Groq: {LIMIT_PER_SECOND} requests/s per model, 0.2s latency; burst of {BURST}")
+
+    for label, client in [
+        ("groq SDK, max_retries=0", Groq(api_key="x", base_url=server.url, max_retries=0)),
+        ("groq SDK, default max_retries=2", Groq(api_key="x", base_url=server.url)),
+    ]:
+        server.reset()
+        report(label, server, *burst(client, prompts))
+
+    server.reset()
+    groq_clients._buckets.clear()
+    client = upstream_client(server)
+    lost = report("upstream client (limiter + retry)", server, *burst(client, prompts))
+    assert lost == 0, "upstream client lost requests"
+
+    # Without the limiter, only retry-after backoff keeps work from being lost
+    server.reset()
+    groq_clients.RATE_LIMITS = {}
+    lost = report("upstream client (retry only)", server, *burst(upstream_client(server), prompts))
+    assert lost == 0, "retries alone lost requests"
+    groq_clients.RATE_LIMITS = {MODEL: LIMIT_PER_SECOND * 60}
+
+    print("Coalescing:")
+    server.reset()
+    groq_clients._buckets.clear()
+    answers, seconds = burst(client, ["Same question?"] * 20)
+    report("20 identical requests", server, answers, seconds)
+    assert server.counts["requests"] == 1 and len(set(answers)) == 1, server.counts
+
+    print("Async:")
+    server.reset()
+    groq_clients._buckets.clear()
+    answers, seconds = asyncio.run(async_burst(server, prompts))
+    lost = report("AsyncGroq upstream client", server, answers, seconds)
+    assert lost == 0
+
+    print("Pooling:")
+    server.reset()
+    server.limit = None
+    client = upstream_client(server)
+    for i in range(50):
+        ask(client, f"Sequential {i}?")
+    print(f"  50 sequential requests over {server.counts['connections']} connection(s)")
+    assert server.counts["connections"] == 1, server.counts
+    server.stop()
@@ -0,0 +1,102 @@
+"""
+Benchmark: resident VectorIndex vs the old per-row cosine loop in search().
+
+Builds throwaway SQLite files with random 384-dim vectors (bge-small size)
+and times only the scoring part, so no embedding model is needed. The
+last run spreads the rows over 3000 videos of 40 chunks, i.e. 3000 small
+segment files, the shape of a large library.
+
+Usage:
+    python benchmarks/bench_vector_index.py [1000 10000 100000]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.vector_index import VectorIndex
+
+DIM = 384
+TOP_K = 3
+QUERIES = 20
+
+
+def build_db(path, n, rng, videos=1):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE embeddings (
+            id INTEGER PRIMARY KEY,
+            source TEXT,
+            chunk_id INTEGER,
+            text TEXT,
+            vector BLOB
+        )
+    """)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    cur.executemany(
+        "INSERT INTO embeddings (source, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
+        ((f"video{i * videos // n}", i, f"chunk {i}", vectors[i].tobytes()) for i in range(n))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_search(db_path, query_vec):
+    # Copy of the pre-index search(): full SELECT + per-row cosine + full sort
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("SELECT text, vector FROM embeddings")
+    rows = cur.fetchall()
+
+    scored = []
+    for text, blob in rows:
+        vec = np.frombuffer(blob, dtype=np.float32)
+        score = np.dot(query_vec, vec) / (np.linalg.norm(query_vec) * np.linalg.norm(vec))
+        scored.append((score, text))
+
+    conn.close()
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return scored[:TOP_K]
+
+
+def run(n, videos=1):
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        build_db(db_path, n, rng, videos)
+
+        start = time.perf_counter()
+        for q in queries:
+            legacy = legacy_search(db_path, q)
+        legacy_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        index = VectorIndex(db_path)
+        start = time.perf_counter()
+        len(index)  # first touch loads the matrix
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for q in queries:
+            fast = index.search(q, TOP_K)
+        index_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        # Same winners as the old implementation
+        assert [t for _, t in legacy] == [t for _, t in fast], (legacy, fast)
+
+    print(f"{n:>7} chunks in {videos:>4} video(s) | loop: {legacy_ms:9.2f} ms/query | index: {index_ms:7.3f} ms/query "
+          f"| speedup: {legacy_ms / index_ms:7.1f}x | one-time load: {load_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 100000]
+    for n in sizes:
+        run(n)
+    if len(sys.argv) == 1:
+        run(120000, videos=3000)
@@ -0,0 +1,137 @@
+"""
+Benchmark: process memory of a search worker with memory-mapped vector
+segments vs the resident float32 matrix the index used to load.
+
+Builds a throwaway database of random 384-dim vectors, written through
+SegmentWriter into the shared segment files, then starts two worker
+processes, like two uvicorn workers, that each load the VectorIndex and run
+searches. Each reports its private (anonymous) memory growth, the
+file-backed pages it maps and the file descriptors it opened; with both
+alive, the proportional share (Pss) shows the segment pages are counted
+once across workers, not once per worker. Runs twice: large videos, then
+thousands of small ones, where open descriptors must still follow the
+number of segment files, not of videos.
+
+Checks that each worker holds at most two descriptors per segment file
+(plus SQLite's own), and that its private growth stays under a quarter of the
+resident matrix, plus BASELINE_MB for what a worker allocates at any size
+(scan buffer, SQLite cache, numpy temporaries). Without that allowance
+small row counts would fail on the constant alone.
+
+Linux only (reads /proc/self/status and smaps_rollup).
+
+Usage:
+    python benchmarks/bench_vector_segments.py [rows] [small_videos]
+"""
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+DIM = 384
+ROWS_PER_VIDEO = 500
+SMALL_VIDEO_ROWS = 40
+QUERIES = 20
+# Private memory a worker grows by whatever the row count (~1.3 MB measured)
+BASELINE_MB = 4
+# Descriptors a worker opens besides the segment maps (SQLite db, -wal, -shm per connection)
+BASELINE_FDS = 12
+
+
+def memory():
+    # kB figures of this process: private heap vs mapped files, and the
+    # file pages' proportional share (divided among processes mapping them)
+    fields = {}
+    for path in ("/proc/self/status", "/proc/self/smaps_rollup"):
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[key] = int(value.split()[0])
+    return fields
+
+
+def build(db_path, n, rows_per_video):
+    from backend import storage
+    from backend import vector_segments
+
+    rng = np.random.default_rng(0)
+    directory = storage.segments_dir(db_path)
+    connect = lambda: storage.connection(db_path)
+    for video in range(0, n, rows_per_video):
+        rows = min(rows_per_video, n - video)
+        source = f"video{video // rows_per_video:05d}"
+        name, offset = vector_segments.write_segment(directory, rng.standard_normal((rows, DIM)), connect)
+        with storage.connection(db_path) as conn:
+            conn.executemany(
+                "INSERT INTO embeddings (source, chunk_id, text, segment, segment_row) VALUES (?, ?, ?, ?, ?)",
+                ((source, i, f"chunk {video + i}", name, offset + i) for i in range(rows))
+            )
+            conn.commit()
+    with storage.connection(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM vector_segments").fetchone()[0]
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def worker(db_path, barrier, results):
+    from backend.vector_index import VectorIndex
+
+    before, fds = memory(), open_fds()
+    index = VectorIndex(db_path, engine="exact")
+    rng = np.random.default_rng(os.getpid())
+    start = time.perf_counter()
+    for q in rng.standard_normal((QUERIES, DIM)).astype(np.float32):
+        index.search_hits(q, 5)
+    ms = (time.perf_counter() - start) * 1000 / QUERIES
+    barrier.wait()          # both workers have touched every segment page
+    after, fds = memory(), open_fds() - fds
+    barrier.wait()          # keep the maps alive until both have measured
+    results.put({
+        "anon_mb": (after["RssAnon"] - before["RssAnon"]) / 1024,
+        "file_mb": (after["RssFile"] - before["RssFile"]) / 1024,
+        "pss_file_mb": after.get("Pss_File", 0) / 1024,
+        "fds": fds,
+        "ms": ms,
+    })
+
+
+def run(n, rows_per_video):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        segments = build(db_path, n, rows_per_video)
+
+        ctx = multiprocessing.get_context("spawn")
+        barrier, results = ctx.Barrier(2), ctx.Queue()
+        workers = [ctx.Process(target=worker, args=(db_path, barrier, results)) for _ in range(2)]
+        for p in workers:
+            p.start()
+        reports = [results.get() for _ in workers]
+        for p in workers:
+            p.join()
+
+    videos = -(-n // rows_per_video)
+    resident_mb = n * DIM * 4 / 2**20
+    print(f"{n} rows x {DIM} dims, {videos} videos in {segments} segment files; "
+          f"a resident float32 matrix would be {resident_mb:.1f} MB per worker")
+    for i, r in enumerate(reports):
+        print(f"  worker {i}: private +{r['anon_mb']:6.1f} MB | mapped segment pages +{r['file_mb']:6.1f} MB "
+              f"(Pss of all file pages {r['pss_file_mb']:6.1f} MB) | +{r['fds']} fds | search {r['ms']:.2f} ms")
+    limit_mb = BASELINE_MB + resident_mb / 4
+    print(f"  private growth limit {limit_mb:.1f} MB per worker")
+    assert all(r["anon_mb"] < limit_mb for r in reports), reports
+    assert all(r["fds"] <= 2 * segments + BASELINE_FDS for r in reports), reports
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    small_videos = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    run(n, ROWS_PER_VIDEO)
+    run(small_videos * SMALL_VIDEO_ROWS, SMALL_VIDEO_ROWS)
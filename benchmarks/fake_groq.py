@@ -0,0 +1,150 @@
+"""
+In-process stand-ins for the Groq client, for benchmarks and offline checks.
+
+Only the calls the backend makes are implemented. Latency is simulated with
+time.sleep so thread-pool concurrency behaves like real network waits
+(asyncio.sleep in FakeAsyncGroq, like an awaited HTTP call).
+"""
+import os
+import sys
+import time
+import json
+import asyncio
+import threading
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.transcribe import probe_duration
+
+
+class _FakeTranscriptions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, file, model, response_format):
+        name, handle = file
+        duration = probe_duration(handle.name) or 0.0
+        self.owner._record(duration)
+
+        # Upload + inference time grows with the amount of audio
+        time.sleep(self.owner.base_latency + duration * self.owner.seconds_per_audio_second)
+
+        # One segment every segment_seconds of audio, relative to this file
+        segments = []
+        t = 0.0
+        step = self.owner.segment_seconds
+        while t < duration:
+            end = min(t + step, duration)
+            segments.append({"start": t, "end": end, "text": f" words at {t:.0f}s of {name}."})
+            t = end
+        return SimpleNamespace(
+            text="".join(s["text"] for s in segments),
+            segments=segments,
+        )
+
+
+class _FakeChatCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, response_format=None, **kwargs):
+        self.owner._record(0.0)
+        prompt = messages[-1]["content"]
+        if response_format and response_format.get("type") == "json_object":
+            # Structured summary: a small topic tree naming the request it came from
+            self.owner.prompts.append(prompt)
+            content = json.dumps(self.owner.topic_tree(prompt))
+        else:
+            content = self.owner.answer
+        words = content.split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+        if stream:
+            return self._stream(tokens)
+
+        # Non-streaming: the caller sees nothing until the last token is generated
+        time.sleep(self.owner.prefill_latency + self.owner.prompt_char_latency * len(prompt)
+                   + self.owner.token_latency * len(tokens))
+        message = SimpleNamespace(content="".join(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, tokens):
+        time.sleep(self.owner.prefill_latency)
+        for token in tokens:
+            time.sleep(self.owner.token_latency)
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeGroq:
+    """
+    Mimics groq.Groq().audio.{transcriptions,translations}.create and
+    groq.Groq().chat.completions.create (plain, stream=True, and JSON mode,
+    which returns a topic tree).
+    """
+
+    def __init__(self, base_latency=0.3, seconds_per_audio_second=0.002, segment_seconds=4.0,
+                 prefill_latency=0.2, token_latency=0.01, answer=None, prompt_char_latency=0.0):
+        self.base_latency = base_latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.segment_seconds = segment_seconds
+        self.prefill_latency = prefill_latency
+        self.token_latency = token_latency
+        self.answer = answer or " ".join(["The video explains the topic step by step."] * 20)
+        self.prompt_char_latency = prompt_char_latency
+        self.prompts = []
+        self.calls = 0
+        self.audio_seconds = 0.0
+        self._lock = threading.Lock()
+        transcriptions = _FakeTranscriptions(self)
+        self.audio = SimpleNamespace(transcriptions=transcriptions, translations=transcriptions)
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(self))
+
+    def topic_tree(self, prompt):
+        with self._lock:
+            n = len(self.prompts)
+        return {
+            "title": f"Video {n}",
+            "summary": f"Summary of request {n} ({len(prompt)} chars).",
+            "topics": [{"title": f"Topic {n}", "subtopics": [{"name": f"Point {n}", "summary": "One sentence."}]}],
+        }
+
+    def _record(self, duration):
+        with self._lock:
+            self.calls += 1
+            self.audio_seconds += duration
+
+
+class _FakeAsyncChatCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        self.owner._record(0.0)
+        words = self.owner.answer.split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+        if stream:
+            await asyncio.sleep(self.owner.prefill_latency)
+            return self._stream(tokens)
+
+        await asyncio.sleep(self.owner.prefill_latency + self.owner.token_latency * len(tokens))
+        message = SimpleNamespace(content="".join(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self, tokens):
+        for token in tokens:
+            await asyncio.sleep(self.owner.token_latency)
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeAsyncGroq(FakeGroq):
+    """
+    Mimics groq.AsyncGroq().chat.completions.create (plain and stream=True).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=_FakeAsyncChatCompletions(self))
@@ -0,0 +1,136 @@
+"""
+A local HTTP stand-in for the Groq API, for exercising the real groq SDK
+and backend.groq_clients end to end (connection pooling, retries, 429s).
+
+Serves POST /openai/v1/chat/completions and
+/openai/v1/audio/{transcriptions,translations} over HTTP/1.1 keep-alive.
+Each request waits latency seconds. More than limit requests per model
+within window seconds get a 429 with a retry-after header, like Groq's
+per-model rate limits.
+
+    server = FakeGroqServer(latency=0.2, limit=10, window=1.0).start()
+    client = Groq(api_key="x", base_url=server.url)
+    ...
+    server.stop()
+"""
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, so pooled clients reuse connections
+
+    def setup(self):
+        super().setup()
+        self.server.owner._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        owner = self.server.owner
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.endswith("/chat/completions"):
+            request = json.loads(body)
+            model = request.get("model")
+        elif "/audio/" in self.path:
+            request = None
+            model = "whisper-large-v3"
+        else:
+            self._send(404, {"error": {"message": f"no route {self.path}"}})
+            return
+
+        retry_after = owner._admit(model)
+        if retry_after is not None:
+            self._send(429, {"error": {
+                "message": f"Rate limit reached for model `{model}`. Please try again in {retry_after:.2f}s.",
+                "type": "requests", "code": "rate_limit_exceeded",
+            }}, {"retry-after": str(math.ceil(retry_after))})
+            return
+
+        time.sleep(owner.latency)
+        owner._count("completed")
+        if request is None:
+            self._send(200, {"text": " Fake transcript.", "segments": [
+                {"id": 0, "start": 0.0, "end": 4.0, "text": " Fake transcript."}
+            ]})
+            return
+
+        prompt = request["messages"][-1]["content"]
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps({"title": f"Video {digest}", "summary": "Fake summary.", "topics": []})
+        else:
+            content = f"Answer {digest}."
+        self._send(200, {
+            "id": f"chatcmpl-{digest}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 4,
+                      "total_tokens": len(prompt) // 4 + 4},
+        })
+
+
+class FakeGroqServer:
+    def __init__(self, latency=0.2, limit=None, window=1.0, port=0):
+        self.latency = latency
+        self.limit = limit          # requests per model per window; None = unlimited
+        self.window = window
+        self.counts = {"requests": 0, "completed": 0, "rate_limited": 0, "connections": 0}
+        self._lock = threading.Lock()
+        self._recent = {}           # model -> deque of admitted request times
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _admit(self, model):
+        # None if the request may run, else seconds until the window has room
+        with self._lock:
+            self.counts["requests"] += 1
+            if self.limit is None:
+                return None
+            now = time.monotonic()
+            recent = self._recent.setdefault(model, deque())
+            while recent and recent[0] <= now - self.window:
+                recent.popleft()
+            if len(recent) >= self.limit:
+                self.counts["rate_limited"] += 1
+                return recent[0] + self.window - now
+            recent.append(now)
+            return None
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+            self._recent.clear()
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="fake-groq").start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
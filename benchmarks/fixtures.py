@@ -0,0 +1,57 @@
+"""
+Deterministic transcript fixtures for the benchmarks.
+
+lecture_segments() builds a Whisper-like list of timed segments: a series of
+topics, each made of common filler speech plus one unique "fact" phrase per
+segment (two invented words). fact_questions() returns questions about some
+of those facts together with the phrase that answers them, so retrieval
+quality can be scored without labelled data.
+"""
+import random
+
+FILLER = (
+    "so basically what we are going to look at now is how this works in practice and "
+    "you can see that the idea here is really simple once you think about it for a moment "
+    "because every step builds on the previous one and that is why we spend time on it"
+).split()
+
+SYLLABLES = ["ka", "zor", "bel", "tri", "mon", "vex", "lu", "qua", "dri", "sen", "pho", "gar"]
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(3))
+
+
+def lecture_segments(topics=40, segments_per_topic=12, seed=0):
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for topic in range(topics):
+        topic_word = _word(rng)
+        for _ in range(segments_per_topic):
+            fact = f"{_word(rng)} {_word(rng)}"
+            words = rng.sample(FILLER, rng.randint(10, 22))
+            words.insert(rng.randint(0, len(words)), topic_word)
+            words.insert(rng.randint(0, len(words)), fact)
+            duration = round(len(words) * 0.4, 2)
+            segments.append({
+                "text": " " + " ".join(words) + ".",
+                "start": round(t, 2),
+                "end": round(t + duration, 2),
+                "fact": fact,
+            })
+            t += duration
+    return segments
+
+
+def fact_questions(segments, count=100, seed=1):
+    rng = random.Random(seed)
+    picked = rng.sample(segments, min(count, len(segments)))
+    return [
+        {"question": f"what did the speaker say about {s['fact']}?", "fact": s["fact"], "start": s["start"]}
+        for s in picked
+    ]
+
+
+def full_text(segments):
+    return "".join(s["text"] for s in segments)
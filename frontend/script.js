@@ -17,6 +17,8 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 let isBackendOnline = false;
+// Video id of the last processed video; /ask is scoped to it
+let currentVideoId = null;
 
 async function checkBackendHealth() {
     const statusBadge = document.getElementById('connectionStatus');
@@ -83,9 +85,10 @@ async function processVideo() {
             throw new Error(`Server Error: ${response.status} ${response.statusText}`);
         }
 
-        const data = await response.json();
-        if (data.error) throw new Error(data.error);
+        const job = await response.json();
+        if (job.error) throw new Error(job.error);
 
+        const data = await waitForJob(job.job_id);
         renderResults(data);
 
     } catch (error) {
@@ -108,6 +111,32 @@ async function processVideo() {
     }
 }
 
+// /process_video only queues the work; poll the job until it finishes
+const JOB_POLL_MS = 2000;
+
+async function waitForJob(jobId) {
+    while (true) {
+        const res = await fetch(`${API_BASE}/jobs/${jobId}`);
+        if (!res.ok) {
+            throw new Error(`Server Error: ${res.status} ${res.statusText}`);
+        }
+
+        const job = await res.json();
+        if (job.status === 'done') return job.result;
+        if (job.status === 'failed') throw new Error(job.error || "Processing failed.");
+
+        showJobProgress(job.stages);
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_MS));
+    }
+}
+
+function showJobProgress(stages) {
+    const running = Object.entries(stages || {}).find(([, s]) => s.status === 'running');
+    if (running) {
+        document.querySelector('.loading-text').innerText = `STAGE: ${running[0].toUpperCase()}...`;
+    }
+}
+
 async function sendChat() {
     const input = document.getElementById('chatInput');
     const box = document.getElementById('chatBox');
@@ -129,10 +158,10 @@ async function sendChat() {
     btn.disabled = true;
 
     try {
-        const response = await fetch(`${API_BASE}/ask`, {
+        const response = await fetch(`${API_BASE}/ask/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question: txt })
+            body: JSON.stringify({ question: txt, video_id: currentVideoId })
         });
 
         if (!response.ok) {
@@ -140,8 +169,21 @@ async function sendChat() {
             throw new Error(errorData.error || `Server ${response.status}: ${response.statusText}`);
         }
 
-        const data = await response.json();
-        addMessage(data.answer, 'ai');
+        // Render tokens as they arrive instead of waiting for the full answer
+        const msg = addMessage('', 'ai');
+        let answer = '';
+        await readEvents(response, event => {
+            if (event.error) throw new Error(event.error);
+            if (event.token) {
+                answer += event.token;
+                setMessageText(msg, answer, 'ai');
+                box.scrollTop = box.scrollHeight;
+            }
+            if (event.done && event.sources) {
+                addSourceLinks(msg, event.sources);
+                box.scrollTop = box.scrollHeight;
+            }
+        });
 
     } catch (e) {
         console.error("Chat Error:", e);
@@ -153,6 +195,30 @@ async function sendChat() {
 
 // --- HELPER FUNCTIONS ---
 
+// Parses a text/event-stream body and calls onEvent with each JSON `data:` payload
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            const data = raw.split('\n')
+                .filter(line => line.startsWith('data:'))
+                .map(line => line.slice(5).trim())
+                .join('');
+            if (data) onEvent(JSON.parse(data));
+        }
+    }
+}
+
 function setLoading(isLoading) {
     const btn = document.getElementById('processBtn');
     const indicator = document.getElementById('loadingState');
@@ -171,6 +237,7 @@ function setLoading(isLoading) {
 }
 
 function renderResults(data) {
+    currentVideoId = data.video_id || null;
     document.getElementById('resultsArea').style.display = 'block';
     document.getElementById('videoTitle').innerText = data.title || "Unknown Title";
     document.getElementById('mainSummary').innerText = data.summary || "No summary provided.";
@@ -221,14 +288,32 @@ function addMessage(text, sender) {
     const box = document.getElementById('chatBox');
     const div = document.createElement('div');
     div.className = `msg ${sender}`;
+    setMessageText(div, text, sender);
 
+    box.appendChild(div);
+    box.scrollTop = box.scrollHeight;
+    return div;
+}
+
+// "Jump to" links for the moments of the video the answer was built from
+function addSourceLinks(div, sources) {
+    const links = sources
+        .filter(s => s.video_id && s.start !== null && s.start !== undefined)
+        .map(s => {
+            const t = Math.floor(s.start);
+            const label = `${String(Math.floor(t / 60)).padStart(2, '0')}:${String(t % 60).padStart(2, '0')}`;
+            return `<a href="https://youtu.be/${s.video_id}?t=${t}" target="_blank" rel="noopener">[${label}]</a>`;
+        });
+    if (links.length) {
+        div.insertAdjacentHTML('beforeend', `<div class="msg-sources">${links.join(' ')}</div>`);
+    }
+}
+
+function setMessageText(div, text, sender) {
     // Allow basic bold formatting
     div.innerHTML = sender === 'ai'
         ? `<strong>AI Buddy:</strong> ${text.replace(/\n/g, '<br>')}`
         : text;
-
-    box.appendChild(div);
-    box.scrollTop = box.scrollHeight;
 }
 
 let factInterval;
@@ -16,10 +16,19 @@ def test_process():
     start = time.time()
     try:
         response = requests.post(f"{API_URL}/process_video", json={"url": VIDEO_URL})
-        duration = time.time() - start
         
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code == 202:
+            job_id = response.json()["job_id"]
+            while True:
+                job = requests.get(f"{API_URL}/jobs/{job_id}").json()
+                if job["status"] in ("done", "failed"):
+                    break
+                time.sleep(2)
+            duration = time.time() - start
+            if job["status"] == "failed":
+                print(f"   FAILED: {job['error']}")
+                return False
+            data = job["result"]
             print(f"   SUCCESS! (took {duration:.1f}s)")
             print(f"   Title: {data.get('title', 'N/A')}")
             print(f"   Summary: {data.get('summary', 'N/A')[:100]}...")